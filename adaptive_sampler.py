@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Adaptive, success-rate-driven choice of COF ingredients.
+
+Instead of fixed weights (e.g. "30% H"), each dimension of a candidate –
+topology, core per symmetry, connector pair, R-group – is a multi-armed
+bandit. Every arm keeps a Beta(successes + 1, failures + 1) posterior over
+its build success rate, and arms are picked by Thompson sampling (or UCB1).
+Statistics are updated from real build outcomes and persisted as JSON, so
+later runs start from what earlier runs learned.
+
+Knobs:
+  strategy     "thompson" (default), "ucb" or "uniform"
+  exploration  >1 widens the Thompson posteriors / UCB bonus (more
+               exploration), <1 narrows them (more exploitation)
+  epsilon      probability of a uniform pick regardless of statistics,
+               so every arm keeps being visited
+"""
+
+import json
+import math
+import os
+import random
+from typing import Dict, List, Optional
+
+SAMPLER_STATS = os.path.join(".cof_cache", "sampler_stats.json")
+
+
+class AdaptiveSampler:
+    def __init__(
+        self,
+        path: Optional[str] = SAMPLER_STATS,
+        strategy: str = "thompson",
+        exploration: float = 1.0,
+        epsilon: float = 0.05,
+    ):
+        if strategy not in ("thompson", "ucb", "uniform"):
+            raise ValueError(f"Unknown strategy {strategy}")
+
+        self.path = path
+        self.strategy = strategy
+        self.exploration = exploration
+        self.epsilon = epsilon
+        # dimension -> arm -> [successes, failures]
+        self.stats: Dict[str, Dict[str, List[int]]] = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.stats = json.load(f).get("stats", {})
+            except (OSError, ValueError):
+                self.stats = {}
+
+    def _counts(self, dimension: str, arm: str) -> List[int]:
+        return self.stats.get(dimension, {}).get(arm, [0, 0])
+
+    def choose(self, dimension: str, arms: List, rng=random):
+        """Pick one arm of a dimension. Arms may be any value with a stable str()."""
+        if not arms:
+            raise ValueError(f"No arms to choose from for {dimension}")
+        if len(arms) == 1 or self.strategy == "uniform" or rng.random() < self.epsilon:
+            return rng.choice(arms)
+
+        if self.strategy == "ucb":
+            total = sum(sum(self._counts(dimension, str(a))) for a in arms) + 1
+            best, best_score = None, -math.inf
+            for arm in arms:
+                s, f = self._counts(dimension, str(arm))
+                n = s + f
+                if n == 0:
+                    return arm  # try every arm once
+                score = s / n + self.exploration * math.sqrt(2 * math.log(total) / n)
+                if score > best_score:
+                    best, best_score = arm, score
+            return best
+
+        # Thompson sampling; dividing the counts by exploration flattens the posterior
+        scale = max(self.exploration, 1e-6)
+        best, best_draw = None, -1.0
+        for arm in arms:
+            s, f = self._counts(dimension, str(arm))
+            draw = rng.betavariate(s / scale + 1, f / scale + 1)
+            if draw > best_draw:
+                best, best_draw = arm, draw
+        return best
+
+    def update(self, choices: Dict[str, List], success: bool):
+        """
+        Credit one build outcome to every arm that produced it.
+        choices: dimension -> list of arms used (an arm may repeat, e.g. R-groups).
+        """
+        col = 0 if success else 1
+        for dimension, arms in choices.items():
+            dim_stats = self.stats.setdefault(dimension, {})
+            for arm in set(map(str, arms)):
+                dim_stats.setdefault(arm, [0, 0])[col] += 1
+
+    def success_rate(self, dimension: str, arm) -> float:
+        """Posterior mean success rate of an arm."""
+        s, f = self._counts(dimension, str(arm))
+        return (s + 1) / (s + f + 2)
+
+    def save(self):
+        if not self.path:
+            return
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"strategy": self.strategy, "stats": self.stats}, f, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Reproducible offline benchmarks for the COF generator and structure pipeline.
+
+Everything runs with fixed seeds inside a scratch directory, against
+fixtures taken from the repo itself:
+  - building_blocks/*.csv   catalog for the name validator / v2 generator, and
+                            a seeded subset of T3/S4 blocks saved with
+                            pyCOFBuilder so work.COFGenerator has a library,
+  - valid_cofs/*.cif        structures for CIF read/write throughput, and the
+                            file the stub Framework "saves".
+
+Benchmarks:
+  library          NameValidator / v2 generator init, work.COFGenerator cold
+                   (no cache) and warm (library cache) start
+  candidates       names/s for work.random_cof_name, v2 generate_candidate,
+                   DesignSpace decoding and NameValidator.validate_many
+  builds           builds/s per topology through work.build_and_save (to the
+                   --targets outputs), with the stub backend (pipeline
+                   overhead only) and/or pyCOFBuilder
+  cif_io           CIF read/write files/s, MB/s and atoms/s with ase, and
+                   reads with cif_reader's fast P1 path
+
+Each benchmark also reports the process peak RSS after it ran, and the
+Python-heap peak (tracemalloc) when --trace-memory is given.
+
+Usage:
+    python benchmark.py -o bench.json
+    python benchmark.py --backend stub pycofbuilder --only builds
+    python benchmark.py -o new.json --compare old.json
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+VALID_COFS_DIR = os.path.join(REPO_DIR, "valid_cofs")
+
+SEED = 1234
+BENCHMARKS = ["library", "candidates", "builds", "cif_io"]
+BACKENDS = ["stub", "pycofbuilder"]
+
+# Cores per symmetry saved as fixture building blocks (x CHO/NH2 connectors)
+FIXTURE_CORES = 4
+FIXTURE_SYMMETRIES = ["T3", "S4"]
+FIXTURE_CONNECTORS = ["CHO", "NH2"]
+
+
+# =======================================
+# HELPERS
+# =======================================
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _repeat(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run fn() `repeat` times with the same seed; return best/median wall time."""
+    times = []
+    for _ in range(repeat):
+        random.seed(SEED)
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"best_s": round(min(times), 6), "median_s": round(statistics.median(times), 6)}
+
+
+def _rate(n: int, seconds: float) -> float:
+    return round(n / seconds, 2) if seconds > 0 else float("inf")
+
+
+@contextlib.contextmanager
+def _chdir(path: str):
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+# =======================================
+# STUB FRAMEWORK BACKEND
+# =======================================
+
+class StubFramework:
+    """
+    Drop-in for pcb.Framework that skips the chemistry: names are only split
+    into their four parts, and the "built" structure is a fixture from
+    valid_cofs/ (cellMatrix / atom_types / atom_pos, as on a real Framework),
+    so structure_export writes it like any other build. save() writes the
+    fixture CIF verbatim. Timing a build with this backend measures the
+    generator's own overhead (sampling, bookkeeping, export, file I/O)
+    separately from pyCOFBuilder.
+    """
+
+    fixture_cif: bytes = b""
+    cellMatrix = None
+    atom_types: List[str] = []
+    atom_pos = None
+
+    @classmethod
+    def load_fixture(cls, path: str):
+        from cif_reader import read_cif
+
+        with open(path, "rb") as f:
+            cls.fixture_cif = f.read()
+        cif = read_cif(path)
+        cls.cellMatrix = cif.cell
+        cls.atom_types = cif.symbols.tolist()
+        cls.atom_pos = cif.positions
+
+    def __init__(self, name: str = "", **kwargs):
+        if name and len(name.split("-")) != 4:
+            raise ValueError(f"Invalid COF name {name}")
+        self.name = name
+
+    def save(self, fmt: str = "cif", supercell=(1, 1, 1), save_dir: str = ".", **kwargs):
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, f"{self.name}.{fmt}"), "wb") as f:
+            f.write(self.fixture_cif)
+
+
+class _StubPCB:
+    """Stands in for the pycofbuilder module: Framework is stubbed, the rest is real."""
+
+    def __init__(self, real):
+        self._real = real
+        self.Framework = StubFramework
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+
+@contextlib.contextmanager
+def framework_backend(backend: str, *modules):
+    """Temporarily point the `pcb` global of the given modules at a backend."""
+    if backend == "pycofbuilder":
+        yield
+        return
+    if backend != "stub":
+        raise ValueError(f"Unknown backend {backend}")
+
+    originals = [module.pcb for module in modules]
+    try:
+        for module, real in zip(modules, originals):
+            module.pcb = _StubPCB(real)
+        yield
+    finally:
+        for module, real in zip(modules, originals):
+            module.pcb = real
+
+
+# =======================================
+# FIXTURES
+# =======================================
+
+def fixture_cif_paths(limit: Optional[int] = None) -> List[str]:
+    paths = sorted(glob.glob(os.path.join(VALID_COFS_DIR, "*.cif")))
+    return paths[:limit] if limit else paths
+
+
+def fixture_block_names(validator) -> List[str]:
+    """Seeded subset of catalog cores as fully H-substituted building blocks."""
+    import work
+
+    rng = random.Random(SEED)
+    whitelist = {"T3": work.T3_CORES, "S4": work.S4_CORES}
+    names = []
+    for symm in FIXTURE_SYMMETRIES:
+        cores = sorted(set(whitelist[symm]) & set(validator.cores.get(symm, {})))
+        for core in rng.sample(cores, min(FIXTURE_CORES, len(cores))):
+            r_groups = ["H"] * validator.r_site_count(symm, core)
+            for connector in FIXTURE_CONNECTORS:
+                names.append("_".join([symm, core, connector] + r_groups))
+    return names
+
+
+def save_fixture_blocks(names: List[str]) -> List[str]:
+    """Save building blocks to ./out/building_blocks (where work.COFGenerator looks)."""
+    from pycofbuilder.building_block import BuildingBlock
+
+    saved = []
+    for name in names:
+        try:
+            BuildingBlock(name=name, log_level="error").save()
+            saved.append(name)
+        except Exception as e:
+            _log(f"    fixture block {name} skipped: {e}")
+    return saved
+
+
+def _work_generator(cache_path: Optional[str]):
+    import work
+
+    with contextlib.redirect_stdout(sys.stderr):
+        return work.COFGenerator(
+            L2_cores=work.L2_CORES,
+            T3_cores=work.T3_CORES,
+            S4_cores=work.S4_CORES,
+            H6_cores=work.H6_CORES,
+            q_connectors=work.Q_CONNECTORS,
+            r_groups=work.R_GROUPS,
+            out_dir="out",
+            seed=SEED,
+            cache_path=cache_path,
+            failure_cache_path=None,
+        )
+
+
+# =======================================
+# BENCHMARKS
+# =======================================
+
+def bench_library(ctx: dict, args) -> dict:
+    from cof_validator import NameValidator
+    import random_cof_generator_v2 as v2
+
+    cache_path = os.path.join(ctx["scratch"], "block_library.json")
+    result = {
+        "validator_init": _repeat(NameValidator, args.repeat),
+        "v2_generator_init": _repeat(lambda: v2.COFGenerator(), args.repeat),
+        "fixture_blocks": len(ctx["blocks"]),
+    }
+
+    def cold():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return _work_generator(cache_path)
+
+    result["work_cold_start"] = _repeat(cold, args.repeat)
+    result["work_warm_start"] = _repeat(lambda: _work_generator(cache_path), args.repeat)
+    ctx["work_generator"] = _work_generator(cache_path)
+    return result
+
+
+def bench_candidates(ctx: dict, args) -> dict:
+    from cof_validator import NameValidator
+    import random_cof_generator_v2 as v2
+
+    n = args.candidates
+    gen = ctx.get("work_generator") or _work_generator(None)
+    v2_gen = v2.COFGenerator()
+    space = gen.design_space()
+    validator = NameValidator()
+    names = [v2_gen.generate_candidate() for _ in range(n)]
+
+    result = {"n": n, "design_space_size": len(space)}
+    for label, fn in [
+        ("work_random_cof_name", lambda: [gen.random_cof_name() for _ in range(n)]),
+        ("v2_generate_candidate", lambda: [v2_gen.generate_candidate() for _ in range(n)]),
+        ("design_space_sample", lambda: space.sample(min(n, len(space)), seed=SEED)),
+        ("validate_many", lambda: validator.validate_many(names)),
+    ]:
+        timing = _repeat(fn, args.repeat)
+        timing["per_s"] = _rate(n, timing["best_s"])
+        result[label] = timing
+    return result
+
+
+def bench_builds(ctx: dict, args) -> dict:
+    import work
+    from stage_timer import StageTimer, summarize
+    from structure_export import parse_target
+
+    gen = ctx.get("work_generator") or _work_generator(None)
+    StubFramework.load_fixture(fixture_cif_paths()[0])
+    targets = [parse_target(t) for t in args.targets]
+
+    result = {}
+    for backend in args.backend:
+        per_topology = {}
+        for topology in gen.design_space().topologies:
+            space = gen.design_space([topology])
+            names = space.sample(min(args.builds, len(space)), seed=SEED)
+            out_dir = os.path.join(ctx["scratch"], f"builds_{backend}", topology)
+            records = []
+            n_ok = 0
+
+            with framework_backend(backend, work):
+                start = time.perf_counter()
+                for name in names:
+                    timer = StageTimer()
+                    with contextlib.redirect_stdout(sys.stderr):
+                        ok, _ = work.build_and_save(name, out_dir, timer=timer, targets=targets)
+                    n_ok += ok
+                    records.append(timer.as_record())
+                elapsed = time.perf_counter() - start
+
+            per_topology[topology] = {
+                "n": len(names),
+                "n_success": n_ok,
+                "elapsed_s": round(elapsed, 6),
+                "builds_per_s": _rate(len(names), elapsed),
+                "stages_p50_s": {stage: round(s["p50"], 6) for stage, s in summarize(records).items()},
+            }
+            _log(f"    {backend:<13}{topology:<6}{per_topology[topology]['builds_per_s']:>10} builds/s")
+        result[backend] = per_topology
+    return result
+
+
+def bench_cif_io(ctx: dict, args) -> dict:
+    from ase.io import read, write
+    from cif_reader import read_p1_cif
+
+    paths = fixture_cif_paths(args.cif_files)
+    n_bytes = sum(os.path.getsize(p) for p in paths)
+    out_dir = os.path.join(ctx["scratch"], "cif_io")
+    os.makedirs(out_dir, exist_ok=True)
+    structures = []
+
+    def read_all():
+        structures[:] = [read(p, format="cif") for p in paths]
+
+    def write_all():
+        for k, atoms in enumerate(structures):
+            write(os.path.join(out_dir, f"{k}.cif"), atoms, format="cif")
+
+    def read_all_fast():
+        for p in paths:
+            read_p1_cif(p)
+
+    read_t = _repeat(read_all, args.repeat)
+    write_t = _repeat(write_all, args.repeat)
+    read_fast_t = _repeat(read_all_fast, args.repeat)
+    n_atoms = sum(len(a) for a in structures)
+    written = sum(os.path.getsize(os.path.join(out_dir, f"{k}.cif")) for k in range(len(structures)))
+
+    for timing, size in ((read_t, n_bytes), (write_t, written), (read_fast_t, n_bytes)):
+        timing["files_per_s"] = _rate(len(paths), timing["best_s"])
+        timing["mb_per_s"] = _rate(size / 1e6, timing["best_s"])
+        timing["atoms_per_s"] = _rate(n_atoms, timing["best_s"])
+    return {"n_files": len(paths), "n_atoms": n_atoms, "mb": round(n_bytes / 1e6, 3),
+            "read": read_t, "write": write_t, "read_fast": read_fast_t}
+
+
+BENCH_FUNCS = {
+    "library": bench_library,
+    "candidates": bench_candidates,
+    "builds": bench_builds,
+    "cif_io": bench_cif_io,
+}
+
+
+# =======================================
+# RUN / COMPARE
+# =======================================
+
+def run(args) -> dict:
+    sys.path.insert(0, REPO_DIR)
+    from cof_validator import NameValidator
+
+    results = {}
+    scratch = tempfile.mkdtemp(prefix="cof_bench_")
+    try:
+        with _chdir(scratch):
+            ctx = {"scratch": scratch, "blocks": []}
+            if {"library", "candidates", "builds"} & set(args.only):
+                _log(">>> Saving fixture building blocks ...")
+                with contextlib.redirect_stdout(sys.stderr):
+                    ctx["blocks"] = save_fixture_blocks(fixture_block_names(NameValidator()))
+
+            for name in BENCHMARKS:
+                if name not in args.only:
+                    continue
+                _log(f">>> {name}")
+                random.seed(SEED)
+                if args.trace_memory:
+                    tracemalloc.start()
+                start = time.perf_counter()
+                try:
+                    results[name] = BENCH_FUNCS[name](ctx, args)
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}"}
+                    _log(f"    failed: {e}")
+                results[name]["wall_s"] = round(time.perf_counter() - start, 3)
+                results[name]["peak_rss_mb"] = _peak_rss_mb()
+                if args.trace_memory:
+                    results[name]["peak_python_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+                    tracemalloc.stop()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    try:
+        import importlib.metadata
+        pcb_version = importlib.metadata.version("pycofbuilder")
+    except Exception:
+        pcb_version = None
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pycofbuilder": pcb_version,
+            "seed": SEED,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def _flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """
+    Rows "metric  old  new  ratio" for throughput (per_s) and time (best_s)
+    metrics present in both result sets. ratio > 1 is better in both cases.
+    """
+    old_flat, new_flat = _flatten(old["results"]), _flatten(new["results"])
+    rows = [f"{'metric':<58}{'old':>12}{'new':>12}{'ratio':>8}"]
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        a, b = old_flat[key], new_flat[key]
+        if key.endswith("per_s"):
+            ratio = b / a if a else float("nan")
+        elif key.endswith("best_s"):
+            ratio = a / b if b else float("nan")
+        else:
+            continue
+        rows.append(f"{key:<58}{a:>12.4g}{b:>12.4g}{ratio:>8.2f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["stub"],
+                        help="Framework backend(s) for the builds benchmark.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per micro-benchmark (best and median reported).")
+    parser.add_argument("--candidates", type=int, default=20000, help="Names generated per candidate benchmark.")
+    parser.add_argument("--builds", type=int, default=20, help="Builds per topology and backend.")
+    parser.add_argument("--targets", nargs="+", default=["cif"], metavar="FMT[:AxBxC]",
+                        help="Outputs written per build (e.g. cif cif:2x2x1 poscar).")
+    parser.add_argument("--cif-files", type=int, default=16, help="Number of valid_cofs/ fixtures (0 = all).")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report Python-heap peaks (slows timings).")
+    parser.add_argument("-o", "--output", help="Write JSON results here (default: stdout).")
+    parser.add_argument("--compare", help="Previous JSON results to compare against.")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        _log(f">>> Results saved to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        _log("\n".join(compare(baseline, report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Fast reader for P1 framework CIFs.
+
+pyCOFBuilder, structure_export and the curated sets (valid_cofs/,
+public/cifs/) all write the same simple layout: one data block, cell
+parameters, an identity-only symmetry loop and a `loop_ _atom_site_*`
+table in P1. ase.io.read() runs its general CIF grammar over every line
+(~1.5 s for a 700-atom file); here the atom table is split in one call
+and converted column-wise with numpy:
+
+    cif = read_cif("valid_cofs/19411N2.cif")
+    cif.cell, cif.symbols, cif.frac           # (3, 3), (n,), (n, 3)
+    atoms = cif.to_atoms()
+
+read_p1_cif() raises CifFormatError for anything outside that layout
+(symmetry operators, several data blocks, quoted or commented atom rows,
+values with uncertainties, ...); read_cif() then falls back to ase.
+Files ending in .gz are decompressed transparently; mmap=True parses a
+plain file straight from a memory map instead of reading it into memory.
+"""
+
+import gzip
+import mmap as _mmap
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class CifFormatError(ValueError):
+    """The file is not a single-block P1 CIF the fast path understands."""
+
+
+class CifData(NamedTuple):
+    name: str             # data block name
+    cell: np.ndarray      # (3, 3) lattice rows, Angstrom
+    symbols: np.ndarray   # (n,) element symbols
+    frac: np.ndarray      # (n, 3) float64 fractional coordinates (not wrapped)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.frac @ self.cell
+
+    @property
+    def numbers(self) -> np.ndarray:
+        from ase.data import atomic_numbers
+
+        return np.array([atomic_numbers[s] for s in self.symbols.tolist()], dtype=int)
+
+    def to_atoms(self):
+        from ase import Atoms
+
+        return Atoms(symbols=self.symbols.tolist(), scaled_positions=self.frac, cell=self.cell, pbc=True)
+
+
+# =======================================
+# CELL
+# =======================================
+
+def cellpar_to_cell(a, b, c, alpha, beta, gamma) -> np.ndarray:
+    """
+    Lattice rows from cell parameters, a along x and b in the xy plane
+    (the same convention as ase.geometry.cellpar_to_cell).
+    """
+    def cos_sin(angle):
+        # Exact zeros for right angles, so orthogonal cells stay orthogonal
+        if abs(angle - 90.0) < 1e-10:
+            return 0.0, 1.0
+        rad = np.radians(angle)
+        return np.cos(rad), np.sin(rad)
+
+    cos_alpha, _ = cos_sin(alpha)
+    cos_beta, _ = cos_sin(beta)
+    cos_gamma, sin_gamma = cos_sin(gamma)
+    cx = cos_beta
+    cy = (cos_alpha - cos_beta * cos_gamma) / sin_gamma
+    cz = np.sqrt(max(1.0 - cx * cx - cy * cy, 0.0))
+    return np.array([
+        [a, 0.0, 0.0],
+        [b * cos_gamma, b * sin_gamma, 0.0],
+        [c * cx, c * cy, c * cz],
+    ])
+
+
+# =======================================
+# FAST P1 PATH
+# =======================================
+
+_DATA_RE = re.compile(rb"^[ \t]*data_(\S*)", re.MULTILINE)
+_CELL_RE = {
+    key: re.compile(rb"^[ \t]*_cell_" + key.encode() + rb"[ \t]+([-+0-9.eE]+)[ \t]*(?:#.*)?\r?$", re.MULTILINE)
+    for key in ("length_a", "length_b", "length_c", "angle_alpha", "angle_beta", "angle_gamma")
+}
+_LOOP_RE = re.compile(rb"^[ \t]*loop_[ \t]*\r?\n((?:[ \t]*_\S+[ \t]*\r?\n)+)", re.MULTILINE)
+_BLOCK_END_RE = re.compile(rb"^[ \t]*(?:loop_|_|data_|;)", re.MULTILINE)
+_SYMOP_TAGS = (b"_symmetry_equiv_pos_as_xyz", b"_space_group_symop_operation_xyz")
+_SPACE_GROUP_RE = re.compile(
+    rb"^[ \t]*_(?:space_group_name_H-M_alt|symmetry_space_group_name_H-M|space_group_IT_number|"
+    rb"symmetry_Int_Tables_number)[ \t]+(.+?)[ \t]*\r?$",
+    re.MULTILINE,
+)
+_ELEMENT_RE = re.compile(r"^([A-Z][a-z]?)")
+
+
+def _loops(text: bytes) -> List[Tuple[List[bytes], bytes]]:
+    """(tags, body) for every loop_ in the block; body stops at the next item or loop."""
+    loops = []
+    for match in _LOOP_RE.finditer(text):
+        tags = match.group(1).split()
+        end = _BLOCK_END_RE.search(text, match.end())
+        loops.append((tags, text[match.end():end.start() if end else len(text)]))
+    return loops
+
+
+def _check_p1(text: bytes, loops):
+    for value in _SPACE_GROUP_RE.findall(text):
+        value = value.strip(b"'\"").replace(b" ", b"")
+        if value not in (b"P1", b"1"):
+            raise CifFormatError(f"space group {value.decode(errors='replace')} is not P1")
+    for tags, body in loops:
+        if not any(tag in _SYMOP_TAGS for tag in tags):
+            continue
+        if len(tags) != 1:
+            raise CifFormatError("symmetry loop with extra columns")
+        ops = [op.strip().strip(b"'\"").replace(b" ", b"").lower() for op in body.splitlines() if op.strip()]
+        if any(op != b"x,y,z" for op in ops):
+            raise CifFormatError("symmetry operators other than the identity")
+
+
+def _clean_symbols(raw: np.ndarray) -> np.ndarray:
+    """Element symbols from type_symbol/label values ("C", "C12", "O2-", ...)."""
+    from ase.data import atomic_numbers
+
+    unique, inverse = np.unique(raw, return_inverse=True)
+    cleaned = []
+    for value in unique.tolist():
+        match = _ELEMENT_RE.match(value.decode(errors="replace"))
+        if not match or match.group(1) not in atomic_numbers:
+            raise CifFormatError(f"no element in atom type {value!r}")
+        cleaned.append(match.group(1))
+    return np.array(cleaned)[inverse.reshape(-1)]
+
+
+def parse_p1_cif(text: bytes) -> CifData:
+    """Parse the bytes of a P1 CIF (see read_p1_cif)."""
+    blocks = _DATA_RE.findall(text)
+    if len(blocks) != 1:
+        raise CifFormatError(f"expected one data block, found {len(blocks)}")
+
+    cellpar = []
+    for key, pattern in _CELL_RE.items():
+        found = pattern.findall(text)
+        if len(found) != 1:
+            raise CifFormatError(f"_cell_{key} missing, repeated or not a plain number")
+        cellpar.append(float(found[0]))
+
+    loops = _loops(text)
+    _check_p1(text, loops)
+    atom_loops = [(tags, body) for tags, body in loops if b"_atom_site_fract_x" in tags]
+    if len(atom_loops) != 1:
+        raise CifFormatError("no single _atom_site loop with fractional coordinates")
+    tags, body = atom_loops[0]
+    if any(c in body for c in (b"'", b'"', b"#", b"(", b"?")):
+        raise CifFormatError("quoted, commented or uncertain values in the atom loop")
+
+    tokens = body.split()
+    if not tokens or len(tokens) % len(tags) != 0:
+        raise CifFormatError(f"{len(tokens)} atom-site values for {len(tags)} columns")
+    table = np.array(tokens, dtype=bytes).reshape(-1, len(tags))
+
+    columns = [tags.index(b"_atom_site_fract_" + axis) for axis in (b"x", b"y", b"z")]
+    try:
+        frac = table[:, columns].astype(np.float64)
+    except ValueError as e:
+        raise CifFormatError(f"bad coordinate: {e}")
+    symbol_tag = b"_atom_site_type_symbol" if b"_atom_site_type_symbol" in tags else b"_atom_site_label"
+    if symbol_tag not in tags:
+        raise CifFormatError("atom loop has neither type_symbol nor label")
+    symbols = _clean_symbols(table[:, tags.index(symbol_tag)])
+
+    return CifData(name=blocks[0].decode(errors="replace"), cell=cellpar_to_cell(*cellpar), symbols=symbols, frac=frac)
+
+
+def read_p1_cif(path: str, mmap: bool = False) -> CifData:
+    """
+    Read a single-block P1 CIF with the fast path only; raises
+    CifFormatError if the file needs a full CIF parser.
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            return parse_p1_cif(f.read())
+    with open(path, "rb") as f:
+        if not mmap:
+            return parse_p1_cif(f.read())
+        with _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ) as view:
+            return parse_p1_cif(view)
+
+
+# =======================================
+# WITH FALLBACK
+# =======================================
+
+def _read_with_ase(path: str) -> CifData:
+    from ase.io import read
+
+    if path.endswith(".gz"):
+        import io
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            atoms = read(io.StringIO(f.read()), format="cif")
+    else:
+        atoms = read(path, format="cif")
+    return CifData(
+        name=atoms.info.get("name", ""),
+        cell=np.array(atoms.cell[:]),
+        symbols=np.array(atoms.get_chemical_symbols()),
+        frac=atoms.get_scaled_positions(wrap=False),
+    )
+
+
+def read_cif(path: str, mmap: bool = False, fallback: bool = True) -> CifData:
+    """
+    Read a CIF (first data block) with the fast P1 path, falling back to
+    ase.io.read for layouts it does not handle (unless fallback=False).
+    With symmetry, ase expands the asymmetric unit to the full P1 cell.
+    """
+    try:
+        return read_p1_cif(path, mmap=mmap)
+    except CifFormatError:
+        if not fallback:
+            raise
+    return _read_with_ase(path)
+
+
+def read_cifs(paths: List[str], mmap: bool = False, fallback: bool = True) -> List[Optional[CifData]]:
+    """read_cif() over many files; unreadable files give None instead of raising."""
+    results = []
+    for path in paths:
+        try:
+            results.append(read_cif(path, mmap=mmap, fallback=fallback))
+        except Exception:
+            results.append(None)
+    return results
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Offline validator for pyCOFBuilder COF names.
+
+pyCOFBuilder only tells us a name is malformed after we pay for
+pcb.Framework(name). This module checks a name such as
+
+    S4_PORP_CHO_I_H-L2_BDTP_NH2_CN_H_H_H_H-SQL_A-AA
+
+against the catalog in building_blocks/*.csv instead:
+  1. symmetry / core code must exist in <SYMM>.csv,
+  2. connector must exist in connection_groups.csv,
+  3. every R token must exist in functional_groups.csv,
+  4. there must be no more R tokens than the core has R sites
+     (the distinct R1..Rn labels in the CXSMILES |$...$| block),
+  5. net and stacking must be known, and the building blocks must have the
+     connectivity the net expects.
+
+Building-block verdicts are memoised, so bulk validation is dominated by a
+few dict lookups per name.
+
+Usage:
+    python cof_validator.py NAME [NAME ...]
+    python cof_validator.py < names.txt
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+BUILDING_BLOCKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "building_blocks")
+
+# Number of connection points (Q sites) implied by each symmetry prefix
+SYMMETRY_CONNECTIVITY = {"L2": 2, "T3": 3, "S4": 4, "H6": 6}
+
+# Connectivity pyCOFBuilder requires of (BB1, BB2) for each net
+NET_CONNECTIVITY: Dict[str, Tuple[int, int]] = {
+    "HCB": (3, 3),
+    "HCB_A": (3, 2),
+    "SQL": (4, 4),
+    "SQL_A": (4, 2),
+    "KGD": (6, 3),
+    "HXL_A": (6, 2),
+    "FXT": (4, 4),
+    "FXT_A": (4, 2),
+    "DIA": (4, 4),
+    "DIA_A": (4, 2),
+    "BOR": (4, 3),
+    "LON": (4, 4),
+    "LON_A": (4, 2),
+}
+
+# 2D nets use named stackings, 3D nets use an interpenetration count
+STACKING_2D = ["A", "AA", "AB1", "AB2", "AAl", "AAt", "ABC1", "ABC2"]
+STACKING_3D = [str(i) for i in range(1, 16)]
+NETS_3D = {"DIA", "DIA_A", "BOR", "LON", "LON_A"}
+
+
+def read_catalog_csv(path: str) -> List[Tuple[str, str]]:
+    """
+    Read one building_blocks/*.csv file and return [(code, smiles), ...].
+
+    The files are ';'-separated, but the CXSMILES label block itself also
+    uses ';', so only the first three separators are column breaks.
+    """
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        next(f, None)  # header: index;Name;Code;SMILES
+        for line in f:
+            parts = line.rstrip("\n").split(";", 3)
+            if len(parts) < 4:
+                continue
+            rows.append((parts[2].strip(), parts[3].strip()))
+    return rows
+
+
+def site_labels(smiles: str) -> List[str]:
+    """Return the per-atom labels from a CXSMILES `|$...$|` block (empty if absent)."""
+    start = smiles.find("$")
+    end = smiles.rfind("$")
+    if start < 0 or end <= start:
+        return []
+    return smiles[start + 1:end].split(";")
+
+
+def count_sites(smiles: str) -> Tuple[int, int]:
+    """Return (number of Q sites, number of distinct R sites) of a core SMILES."""
+    labels = site_labels(smiles)
+    n_q = sum(1 for label in labels if label == "Q")
+    n_r = len({label for label in labels if label.startswith("R")})
+    return n_q, n_r
+
+
+class NameValidator:
+    """
+    Catalog of symmetries, cores, connectors and R-groups built from
+    building_blocks/*.csv, with fast checks for building-block and COF names.
+    """
+
+    def __init__(self, bb_dir: str = BUILDING_BLOCKS_DIR):
+        # symmetry -> core code -> (Q sites, R sites)
+        self.cores: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for symm in SYMMETRY_CONNECTIVITY:
+            path = os.path.join(bb_dir, f"{symm}.csv")
+            if not os.path.exists(path):
+                continue
+            self.cores[symm] = {code: count_sites(smiles) for code, smiles in read_catalog_csv(path)}
+
+        self.connectors = {code for code, _ in read_catalog_csv(os.path.join(bb_dir, "connection_groups.csv"))}
+        self.func_groups = {code for code, _ in read_catalog_csv(os.path.join(bb_dir, "functional_groups.csv"))}
+
+        # building-block name -> (connectivity or None, error or None)
+        self._bb_cache: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+
+    def r_site_count(self, symmetry: str, core: str) -> int:
+        """Number of distinct R sites on a core (KeyError if the core is unknown)."""
+        return self.cores[symmetry][core][1]
+
+    def check_building_block(self, bb_name: str) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Check a single building-block name like L2_BENZ_NH2_H_H.
+        Returns (connectivity, None) when valid, (None, reason) otherwise.
+        """
+        cached = self._bb_cache.get(bb_name)
+        if cached is not None:
+            return cached
+
+        result = self._check_building_block(bb_name)
+        self._bb_cache[bb_name] = result
+        return result
+
+    def _check_building_block(self, bb_name: str) -> Tuple[Optional[int], Optional[str]]:
+        parts = bb_name.split("_")
+        if len(parts) < 3:
+            return None, f"{bb_name}: expected SYMM_CORE_CONNECTOR[_R...]"
+
+        symm, core, connector, r_groups = parts[0], parts[1], parts[2], parts[3:]
+
+        symm_cores = self.cores.get(symm)
+        if symm_cores is None:
+            return None, f"{bb_name}: unknown symmetry {symm} (known: {', '.join(self.cores)})"
+
+        sites = symm_cores.get(core)
+        if sites is None:
+            return None, f"{bb_name}: core {core} does not exist with {symm} symmetry"
+
+        if connector not in self.connectors:
+            return None, f"{bb_name}: unknown connector {connector}"
+
+        for r in r_groups:
+            if r not in self.func_groups:
+                return None, f"{bb_name}: unknown functional group {r}"
+
+        n_q, n_r = sites
+        if len(r_groups) > n_r:
+            return None, f"{bb_name}: {len(r_groups)} R groups given but core {core} has {n_r} R sites"
+
+        if n_q != SYMMETRY_CONNECTIVITY[symm]:
+            return None, f"{bb_name}: core {core} has {n_q} Q sites, {symm} needs {SYMMETRY_CONNECTIVITY[symm]}"
+
+        return n_q, None
+
+    def validate(self, cof_name: str) -> Tuple[bool, Optional[str]]:
+        """
+        Validate a full COF name BB1-BB2-NET-STACKING.
+        Returns (is_valid, reason_or_None).
+        """
+        parts = cof_name.split("-")
+        if len(parts) != 4:
+            return False, "name must have the form BB1-BB2-NET-STACKING"
+
+        bb1, bb2, net, stacking = parts
+
+        required = NET_CONNECTIVITY.get(net)
+        if required is None:
+            return False, f"unknown net {net}"
+
+        if stacking not in (STACKING_3D if net in NETS_3D else STACKING_2D):
+            return False, f"stacking {stacking} is not available for {net}"
+
+        conn1, err = self.check_building_block(bb1)
+        if err:
+            return False, err
+        conn2, err = self.check_building_block(bb2)
+        if err:
+            return False, err
+
+        if (conn1, conn2) != required:
+            return False, f"{net} needs connectivity {required}, got ({conn1}, {conn2})"
+
+        return True, None
+
+    def is_valid(self, cof_name: str) -> bool:
+        return self.validate(cof_name)[0]
+
+    def validate_many(self, cof_names: Iterable[str]) -> List[Tuple[str, bool, Optional[str]]]:
+        """Validate many names; returns [(name, is_valid, reason), ...]."""
+        validate = self.validate
+        return [(name, *validate(name)) for name in cof_names]
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or [line.strip() for line in sys.stdin if line.strip()]
+    validator = NameValidator()
+    n_bad = 0
+    for name, ok, reason in validator.validate_many(names):
+        if ok:
+            print(f"OK       {name}")
+        else:
+            n_bad += 1
+            print(f"INVALID  {name}: {reason}")
+    sys.exit(1 if n_bad else 0)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Geometric porosity descriptors computed straight from a structure.
+
+The curated COFs come with zeo++ outputs (Density, POAV, ASA, ...) from
+the AiiDA workflows in full.ipynb; generated structures have none. This
+module computes the same quantities locally, with numpy and per-element
+KD-trees over the periodic images (neighbors.padded_images):
+
+  - density (g/cm^3),
+  - accessible volume AV: grid points where the centre of a probe sphere
+    fits without overlapping any atom (periodic distance grid),
+  - probe-occupiable accessible volume POAV: grid points covered by some
+    probe placed in AV (what zeo++ -volpo reports),
+  - accessible surface area ASA: Monte-Carlo points on the atom spheres
+    inflated by the probe radius that lie outside every other inflated
+    sphere (zeo++ -sa).
+
+Keys follow zeo++'s names and units (AV_A^3, AV_Volume_fraction,
+AV_cm^3/g, ...). Pockets the probe cannot reach from outside are not
+excluded here, so AV/POAV/ASA are upper bounds on zeo++'s accessible
+values for frameworks with closed cages; 1D COF channels are unaffected.
+Atom radii are vdW radii (ase.data.vdw_radii, H as in zeo++'s table).
+
+    d = describe(cell, symbols, frac)          # one structure
+    rows = describe_cifs(paths, workers=8)     # many, in parallel
+
+CLI:
+    python descriptors.py valid_cofs/*.cif -o descriptors.csv --workers 8
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from neighbors import padded_images
+
+# N2-sized probe, as in the zeo++ runs behind the curated set
+PROBE_RADIUS = 1.86
+GRID_SPACING = 0.4        # Angstrom between distance-grid points
+SA_SAMPLES = 500          # Monte-Carlo points per atom for the surface area
+SEED = 0
+
+RADII_OVERRIDES = {"H": 1.09}
+AMU_TO_G = 1.66053907e-24
+A3_TO_CM3 = 1e-24
+A2_TO_M2 = 1e-20
+
+
+# =======================================
+# HELPERS
+# =======================================
+
+def atom_radii(symbols) -> np.ndarray:
+    from ase.data import atomic_numbers, vdw_radii
+
+    symbols = np.asarray(symbols)
+    unique, inverse = np.unique(symbols, return_inverse=True)
+    radii = []
+    for s in unique.tolist():
+        r = RADII_OVERRIDES.get(s, vdw_radii[atomic_numbers[s]])
+        radii.append(2.0 if np.isnan(r) else r)
+    return np.array(radii)[inverse.reshape(-1)]
+
+
+def _element_trees(cell, frac, radii, reach):
+    """One (cKDTree, radius) per distinct radius over the atoms and their images within reach."""
+    from scipy.spatial import cKDTree
+
+    points, index, _ = padded_images(cell, frac, reach)
+    trees = []
+    for r in np.unique(radii):
+        mask = radii[index] == r
+        trees.append((cKDTree(points[mask]), r))
+    return trees
+
+
+def _surface_distance(trees, points, reach) -> np.ndarray:
+    """Distance from each point to the nearest atom surface (inf beyond reach)."""
+    dist = np.full(len(points), np.inf)
+    for tree, r in trees:
+        d, _ = tree.query(points, distance_upper_bound=reach + r)
+        np.minimum(dist, d - r, out=dist)
+    return dist
+
+
+def grid_shape(cell, spacing: float = GRID_SPACING) -> Tuple[int, int, int]:
+    """
+    Points along a, b and c for a grid with at most `spacing` between
+    points, rounded up to sizes with small prime factors so that FFTs over
+    the grid (pore_size.pore_size_distribution) stay fast.
+    """
+    from scipy.fft import next_fast_len
+
+    lengths = np.linalg.norm(np.asarray(cell, dtype=float), axis=1)
+    return tuple(next_fast_len(int(k)) for k in np.maximum(np.ceil(lengths / spacing).astype(int), 1))
+
+
+def grid_points(cell, spacing: float = GRID_SPACING) -> np.ndarray:
+    """Fractional coordinates of that grid, flattened in C order of grid_shape()."""
+    axes = [(np.arange(k) + 0.5) / k for k in grid_shape(cell, spacing)]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), -1).reshape(-1, 3)
+
+
+def distance_grid(cell, symbols, frac, spacing: float = GRID_SPACING,
+                  reach: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grid points (fractional, see grid_points) and the distance from each to
+    the nearest atom surface. Distances above `reach` come back as inf.
+    reach=None makes every distance exact: the search starts at the cell's
+    inscribed radius and doubles for the points still beyond it, so the
+    images are padded only as far as the largest grid distance needs.
+    """
+    cell = np.asarray(cell, dtype=float)
+    frac = np.asarray(frac, dtype=float)
+    radii = atom_radii(symbols)
+    grid = grid_points(cell, spacing)
+    points = grid @ cell
+    if reach is not None:
+        return grid, _surface_distance(_element_trees(cell, frac, radii, reach + radii.max()), points, reach)
+
+    reach = 0.5 / np.linalg.norm(np.linalg.inv(cell).T, axis=1).max()      # half the smallest interplanar spacing
+    dist = np.full(len(points), np.inf)
+    todo = np.arange(len(points))
+    while len(todo):
+        dist[todo] = _surface_distance(_element_trees(cell, frac, radii, reach + radii.max()), points[todo], reach)
+        todo = todo[np.isinf(dist[todo])]
+        reach *= 2
+    return grid, dist
+
+
+def _sphere_points(n: int, rng) -> np.ndarray:
+    v = rng.normal(size=(n, 3))
+    return v / np.linalg.norm(v, axis=1)[:, None]
+
+
+# =======================================
+# DESCRIPTORS
+# =======================================
+
+def density(cell, symbols) -> float:
+    """Crystal density in g/cm^3."""
+    from ase.data import atomic_masses, atomic_numbers
+
+    mass = sum(atomic_masses[atomic_numbers[s]] for s in np.asarray(symbols).tolist())
+    return mass * AMU_TO_G / (abs(np.linalg.det(cell)) * A3_TO_CM3)
+
+
+def void_fractions(cell, symbols, frac, probe_radius: float = PROBE_RADIUS,
+                   spacing: float = GRID_SPACING) -> Dict[str, float]:
+    """
+    Accessible (probe centre) and probe-occupiable volume fractions on a
+    periodic grid. Returns {"av": .., "poav": ..}.
+    """
+    from scipy.spatial import cKDTree
+
+    cell = np.asarray(cell, dtype=float)
+    grid, surface = distance_grid(cell, symbols, frac, spacing, reach=2 * probe_radius + spacing)
+    accessible = surface > probe_radius
+    if probe_radius <= 0 or not accessible.any():
+        return {"av": float(accessible.mean()), "poav": float(accessible.mean())}
+
+    # Outside every atom but not a probe centre: occupiable if a probe centre lies within
+    # probe_radius. Such a centre is at most 2 * probe_radius from an atom surface, so
+    # centres deeper inside the pore need not be searched.
+    shell = (surface > 0) & ~accessible
+    near = accessible & (surface <= 2 * probe_radius + spacing)
+    centres, _, _ = padded_images(cell, grid[near], probe_radius)
+    d, _ = cKDTree(centres).query(grid[shell] @ cell, distance_upper_bound=probe_radius)
+    occupiable = accessible.sum() + np.count_nonzero(np.isfinite(d))
+    return {"av": float(accessible.mean()), "poav": float(occupiable / len(grid))}
+
+
+def accessible_surface_area(cell, symbols, frac, probe_radius: float = PROBE_RADIUS,
+                            samples: int = SA_SAMPLES, seed: int = SEED) -> float:
+    """Monte-Carlo probe-accessible surface area in A^2 per cell."""
+    cell = np.asarray(cell, dtype=float)
+    frac = np.asarray(frac, dtype=float) % 1.0
+    radii = atom_radii(symbols) + probe_radius
+    trees = _element_trees(cell, frac, radii, 2 * radii.max())
+
+    rng = np.random.default_rng(seed)
+    centres = frac @ cell
+    area = 0.0
+    # Batches of atoms keep the sample arrays small for large cells
+    batch = max(1, 200000 // samples)
+    for start in range(0, len(centres), batch):
+        stop = min(start + batch, len(centres))
+        r = radii[start:stop, None, None]
+        points = (centres[start:stop, None, :] + r * _sphere_points(samples, rng)[None, :, :]).reshape(-1, 3)
+        # Tolerance so a point does not count as buried in its own sphere
+        buried = _surface_distance(trees, points, 0.0) < -1e-6
+        fraction = 1.0 - buried.reshape(stop - start, samples).mean(axis=1)
+        area += float(np.sum(4.0 * np.pi * radii[start:stop] ** 2 * fraction))
+    return area
+
+
+def describe(cell, symbols, frac=None, positions=None, probe_radius: float = PROBE_RADIUS,
+             spacing: float = GRID_SPACING, samples: int = SA_SAMPLES) -> Dict[str, float]:
+    """All descriptors of one structure, keyed like zeo++'s outputs."""
+    cell = np.asarray(cell, dtype=float)
+    if frac is None:
+        frac = np.linalg.solve(cell.T, np.asarray(positions, dtype=float).T).T
+    volume = abs(np.linalg.det(cell))
+    rho = density(cell, symbols)
+    mass_g = rho * volume * A3_TO_CM3
+    fractions = void_fractions(cell, symbols, frac, probe_radius, spacing)
+    asa = accessible_surface_area(cell, symbols, frac, probe_radius, samples)
+
+    result = {"Density": rho, "Unitcell_volume": volume}
+    for key, vf in (("AV", fractions["av"]), ("POAV", fractions["poav"])):
+        result[f"{key}_A^3"] = vf * volume
+        result[f"{key}_Volume_fraction"] = vf
+        result[f"{key}_cm^3/g"] = vf * volume * A3_TO_CM3 / mass_g
+    result["ASA_A^2"] = asa
+    result["ASA_m^2/cm^3"] = asa * A2_TO_M2 / (volume * A3_TO_CM3)
+    result["ASA_m^2/g"] = asa * A2_TO_M2 / mass_g
+    return {key: round(float(value), 6) for key, value in result.items()}
+
+
+# =======================================
+# MANY STRUCTURES
+# =======================================
+
+def describe_cif(path: str, **kwargs) -> Dict[str, object]:
+    from cif_reader import read_cif
+
+    try:
+        cif = read_cif(path)
+        return {"path": path, **describe(cif.cell, cif.symbols, cif.frac, **kwargs)}
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+
+def _describe_cif_kwargs(args):
+    path, kwargs = args
+    return describe_cif(path, **kwargs)
+
+
+def describe_cifs(paths: List[str], workers: Optional[int] = None, **kwargs) -> List[Dict[str, object]]:
+    """describe_cif() over many files, in a process pool when workers > 1; rows keep the input order."""
+    workers = workers or 1
+    if workers == 1:
+        return [describe_cif(path, **kwargs) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_describe_cif_kwargs, [(path, kwargs) for path in paths], chunksize=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Density, void fraction and accessible surface area of CIFs.")
+    parser.add_argument("cifs", nargs="+")
+    parser.add_argument("-o", "--output", help="CSV file (default: print to stdout).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel worker processes.")
+    parser.add_argument("--probe", type=float, default=PROBE_RADIUS, help="Probe radius (A).")
+    parser.add_argument("--spacing", type=float, default=GRID_SPACING, help="Void-fraction grid spacing (A).")
+    parser.add_argument("--samples", type=int, default=SA_SAMPLES, help="Surface samples per atom.")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    rows = describe_cifs(args.cifs, workers=args.workers, probe_radius=args.probe, spacing=args.spacing,
+                         samples=args.samples)
+    df = pd.DataFrame(rows)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Indexable combinatorial design space of COF names.
+
+The space is every (BB1, BB2, topology, stacking) combination allowed by a
+COFGenerator's blocks_by_connectivity / topology_rules / stacking_by_topology.
+Nothing is materialised: each index decodes straight into a name in O(1),
+so a space with millions of entries costs only the block lists.
+
+    space = DesignSpace(gen.blocks_by_connectivity, gen.topology_rules,
+                        gen.stacking_by_topology, topologies=["SQL"])
+    len(space)                     # exact size
+    space[12345]                   # -> "S4_..-S4_..-SQL-AA"
+    space.index_of(name)           # inverse of space[i]
+    for name in space.shard(3, 32, seed=7): ...   # machine 3 of 32
+    space.sample(1000, seed=7)     # uniform, without replacement
+
+When both nodes of a topology have the same connectivity, only unordered
+pairs of distinct blocks are enumerated: BB1-BB2 and BB2-BB1 are the same
+framework.
+"""
+
+import bisect
+from math import isqrt
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finaliser – a cheap, well-distributed integer hash."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class Permutation:
+    """
+    Pseudo-random bijection of range(n) with O(1) memory.
+
+    A balanced Feistel network over the smallest even bit-width covering n,
+    plus cycle walking to stay inside range(n). Each lookup takes O(1)
+    expected time, since the Feistel domain is less than 4n.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n: int, seed: int = 0):
+        self.n = n
+        half_bits = max(1, ((max(n - 1, 1)).bit_length() + 1) // 2)
+        self._half_bits = half_bits
+        self._half_mask = (1 << half_bits) - 1
+        self._keys = [_mix64(seed * self.ROUNDS + r) for r in range(self.ROUNDS)]
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _feistel(self, x: int) -> int:
+        left, right = x >> self._half_bits, x & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix64(right ^ key) & self._half_mask)
+        return (left << self._half_bits) | right
+
+    def __getitem__(self, i: int) -> int:
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        x = self._feistel(i)
+        while x >= self.n:
+            x = self._feistel(x)
+        return x
+
+
+class _Strided:
+    """Lazy view base[start::step] of any sequence supporting len() and []."""
+
+    def __init__(self, base: Sequence[int], start: int, step: int):
+        self.base, self.start, self.step = base, start, step
+
+    def __len__(self) -> int:
+        return max(0, (len(self.base) - self.start + self.step - 1) // self.step)
+
+    def __getitem__(self, i: int) -> int:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.base[self.start + i * self.step]
+
+
+class IndexView:
+    """Lazy sequence of COF names: space[indices[k]] for k in range(len(indices))."""
+
+    def __init__(self, space: "DesignSpace", indices: Sequence[int]):
+        self.space = space
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, k: int) -> str:
+        return self.space[self.indices[k]]
+
+    def __iter__(self) -> Iterator[str]:
+        for k in range(len(self.indices)):
+            yield self.space[self.indices[k]]
+
+    def shard(self, i: int, n: int) -> "IndexView":
+        """Every n-th entry starting at i; shards 0..n-1 partition the view."""
+        if not 0 <= i < n:
+            raise ValueError(f"shard index {i} not in range(0, {n})")
+        return IndexView(self.space, _Strided(self.indices, i, n))
+
+
+class DesignSpace:
+    """
+    Exact, lazily decoded set of COF names.
+
+    blocks_by_connectivity: connectivity -> [building-block names]
+    topology_rules: topology -> (connectivity of BB1, connectivity of BB2)
+    stacking_by_topology: topology -> [stacking names]
+    topologies: restrict to these topologies (default: all in topology_rules)
+    """
+
+    def __init__(
+        self,
+        blocks_by_connectivity: Dict[int, List[str]],
+        topology_rules: Dict[str, Tuple[int, int]],
+        stacking_by_topology: Dict[str, List[str]],
+        topologies: Optional[List[str]] = None,
+    ):
+        self.blocks_by_connectivity = {c: list(names) for c, names in blocks_by_connectivity.items()}
+        # name -> position, per connectivity, for index_of()
+        self._block_pos = {
+            c: {name: k for k, name in enumerate(names)}
+            for c, names in self.blocks_by_connectivity.items()
+        }
+
+        self.topologies: List[str] = []
+        # (topology, c1, c2, BB1 list, BB2 list, same connectivity?, stackings)
+        self._parts: List[Tuple[str, int, int, List[str], List[str], bool, List[str]]] = []
+        self._offsets: List[int] = []
+        size = 0
+
+        for topo in topologies or list(topology_rules):
+            if topo not in topology_rules:
+                raise ValueError(f"Unknown topology {topo}")
+            c1, c2 = topology_rules[topo]
+            list1 = self.blocks_by_connectivity.get(c1, [])
+            list2 = self.blocks_by_connectivity.get(c2, [])
+            stackings = list(stacking_by_topology.get(topo, []))
+            same = c1 == c2
+            n_pairs = len(list1) * (len(list1) - 1) // 2 if same else len(list1) * len(list2)
+            n = n_pairs * len(stackings)
+            if n == 0:
+                continue
+
+            self.topologies.append(topo)
+            self._parts.append((topo, c1, c2, list1, list2, same, stackings))
+            self._offsets.append(size)
+            size += n
+
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def size_by_topology(self) -> Dict[str, int]:
+        bounds = self._offsets + [self.size]
+        return {topo: bounds[k + 1] - bounds[k] for k, topo in enumerate(self.topologies)}
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+
+        k = bisect.bisect_right(self._offsets, index) - 1
+        topo, _, _, list1, list2, same, stackings = self._parts[k]
+        local = index - self._offsets[k]
+        pair, s = divmod(local, len(stackings))
+
+        if same:
+            # unordered pair i < j, enumerated as pair = j*(j-1)/2 + i
+            j = (1 + isqrt(1 + 8 * pair)) // 2
+            i = pair - j * (j - 1) // 2
+            bb1, bb2 = list1[i], list1[j]
+        else:
+            i, j = divmod(pair, len(list2))
+            bb1, bb2 = list1[i], list2[j]
+
+        return f"{bb1}-{bb2}-{topo}-{stackings[s]}"
+
+    def index_of(self, cof_name: str) -> int:
+        """Inverse of __getitem__ (ValueError if the name is not in the space)."""
+        try:
+            bb1, bb2, topo, stacking = cof_name.split("-")
+            k = self.topologies.index(topo)
+        except ValueError:
+            raise ValueError(f"{cof_name} is not in this design space") from None
+
+        _, c1, c2, list1, list2, same, stackings = self._parts[k]
+        i = self._block_pos[c1].get(bb1)
+        j = self._block_pos[c2].get(bb2)
+        if i is None or j is None or stacking not in stackings:
+            raise ValueError(f"{cof_name} is not in this design space")
+
+        if same:
+            if i == j:
+                raise ValueError(f"{cof_name} is not in this design space")
+            i, j = min(i, j), max(i, j)
+            pair = j * (j - 1) // 2 + i
+        else:
+            pair = i * len(list2) + j
+
+        return self._offsets[k] + pair * len(stackings) + stackings.index(stacking)
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.size):
+            yield self[index]
+
+    def permuted(self, seed: int = 0) -> IndexView:
+        """All names in a seeded pseudo-random order (each exactly once)."""
+        return IndexView(self, Permutation(self.size, seed))
+
+    def shard(self, i: int, n: int, seed: Optional[int] = None) -> IndexView:
+        """
+        Shard i of n. Shards are disjoint and together cover the space.
+        With a seed, each shard is a random (but reproducible) slice.
+        """
+        base = self.permuted(seed) if seed is not None else IndexView(self, range(self.size))
+        return base.shard(i, n)
+
+    def sample(self, k: int, seed: int = 0) -> List[str]:
+        """k distinct names drawn uniformly without replacement."""
+        if k > self.size:
+            raise ValueError(f"Cannot sample {k} names from a space of {self.size}")
+        perm = Permutation(self.size, seed)
+        return [self[perm[m]] for m in range(k)]
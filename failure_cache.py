@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Persistent negative cache of COF combinations that failed to build.
+
+Every failed pcb.Framework build costs as much as a successful one, and the
+random samplers happily draw the same bad combination again. This cache
+remembers failures across runs, keyed by the canonical
+(BB1, BB2, net, stacking) tuple, together with a coarse error class.
+
+Only deterministic failures are cached (atoms too close, wrong connectivity,
+incompatible connection groups, invalid names). Anything else, e.g. a disk
+error, is treated as transient and may be retried.
+
+Entries are appended as JSON lines to .cof_cache/failed_cofs.jsonl. Entries
+written by a different pyCOFBuilder version, or older than the optional TTL,
+are ignored on load.
+"""
+
+import importlib.metadata
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from cof_validator import NET_CONNECTIVITY
+
+try:
+    PCB_VERSION = importlib.metadata.version("pycofbuilder")
+except importlib.metadata.PackageNotFoundError:
+    PCB_VERSION = "unknown"
+
+FAILURE_CACHE = os.path.join(".cof_cache", "failed_cofs.jsonl")
+
+# (substring of the error message, error class) – first match wins
+ERROR_CLASSES = [
+    ("closer than", "atoms_too_close"),
+    ("connectivity should be", "bb_connectivity"),
+    ("not compatible with", "connection_group"),
+    ("Invalid COF name", "invalid_name"),
+    ("name is invalid", "invalid_name"),
+    ("not in the available list", "invalid_name"),
+    ("must be in the format", "invalid_name"),
+]
+
+
+def classify_error(message: Optional[str]) -> str:
+    """Map an error message from a failed build to a coarse error class."""
+    message = message or ""
+    for needle, error_class in ERROR_CLASSES:
+        if needle in message:
+            return error_class
+    return "other"
+
+
+def canonical_key(cof_name: str) -> Tuple[str, str, str, str]:
+    """
+    Canonical (BB1, BB2, net, stacking) tuple for a COF name.
+    For nets whose two nodes have the same connectivity (HCB, SQL, ...) the
+    building blocks are interchangeable, so the pair is sorted.
+    """
+    bb1, bb2, net, stacking = cof_name.split("-")
+    c1, c2 = NET_CONNECTIVITY.get(net, (None, None))
+    if c1 is not None and c1 == c2 and bb2 < bb1:
+        bb1, bb2 = bb2, bb1
+    return bb1, bb2, net, stacking
+
+
+class FailureCache:
+    """
+    Known-bad COF combinations shared across runs.
+
+    path: JSON-lines file to load from and append to (None keeps it in memory).
+    ttl_s: forget entries older than this many seconds (None = never).
+    pcb_version: only entries recorded with this pyCOFBuilder version count.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = FAILURE_CACHE,
+        ttl_s: Optional[float] = None,
+        pcb_version: str = PCB_VERSION,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.pcb_version = pcb_version
+        self.entries: Dict[Tuple[str, str, str, str], dict] = {}
+        self._load()
+
+    def _is_current(self, entry: dict) -> bool:
+        if entry.get("pycofbuilder") != self.pcb_version:
+            return False
+        if self.ttl_s is not None and time.time() - entry.get("time", 0) > self.ttl_s:
+            return False
+        return True
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = tuple(entry["key"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn write from an interrupted run
+                if self._is_current(entry):
+                    self.entries[key] = entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, cof_name: str) -> Optional[dict]:
+        """Return the cached failure entry for a COF name, or None."""
+        try:
+            key = canonical_key(cof_name)
+        except ValueError:
+            return None
+        entry = self.entries.get(key)
+        if entry is not None and self.ttl_s is not None and not self._is_current(entry):
+            del self.entries[key]
+            return None
+        return entry
+
+    def is_known_bad(self, cof_name: str) -> bool:
+        return self.lookup(cof_name) is not None
+
+    def record(self, cof_name: str, error: Optional[str]) -> Optional[str]:
+        """
+        Remember a failed build. Returns the error class if it was cached,
+        or None for transient ("other") errors that are not worth caching.
+        """
+        error_class = classify_error(error)
+        if error_class == "other":
+            return None
+
+        try:
+            key = canonical_key(cof_name)
+        except ValueError:
+            return None
+
+        entry = {
+            "key": list(key),
+            "error_class": error_class,
+            "error": (error or "")[:300],
+            "pycofbuilder": self.pcb_version,
+            "time": time.time(),
+        }
+        self.entries[key] = entry
+
+        if self.path:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+        return error_class
+
+    def clear(self):
+        """Forget every entry, on disk as well."""
+        self.entries.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Structure fingerprints and near-duplicate detection for COF libraries.
+
+Names say nothing about identity: batch_generate can build the same
+framework under two names, and the web app copies valid_cofs/ entries
+into generated_cofs/ as cof-<timestamp>.cif. A fingerprint describes the
+structure itself:
+
+  - reduced formula (Hill order, divided by the gcd of the counts),
+  - Minkowski-reduced cell parameters and volume per atom,
+  - a smoothed periodic radial distribution function g(r) (pair counts from
+    a KD-tree over the periodic images, so no per-pair Python loop).
+
+g(r) and the volume per atom are the same for a cell and any supercell of
+it, and do not depend on the choice of cell or the atom order.
+
+FingerprintIndex hashes fingerprints into buckets keyed by formula and
+volume-per-atom bin, so a lookup compares against a handful of entries
+(the bin and its two neighbours), not the whole library. The bins are
+log-spaced and one relative tolerance wide, so the neighbours cover the
+tolerance at any volume per atom. Within those,
+the reduced cell parameters are checked before g(r): equal-sized cells
+must agree in lengths and angles, and cells of different size must be
+integer multiples of each other (a supercell). Fingerprints of CIF files
+are cached in .cof_cache/fingerprints.jsonl and only recomputed when a
+file changes; scan() compacts the cache to one line per file that still
+exists unchanged.
+
+CLI:
+    python fingerprint.py scan [DIR ...]      # default: generated_cofs valid_cofs public/cifs
+    python fingerprint.py check CIF [CIF ...]
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+from functools import reduce
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+FINGERPRINT_CACHE = os.path.join(".cof_cache", "fingerprints.jsonl")
+LIBRARY_DIRS = ["generated_cofs", "valid_cofs", os.path.join("public", "cifs")]
+
+# g(r) sampling (Angstrom)
+RDF_RMAX = 8.0
+RDF_BIN = 0.05
+RDF_SIGMA = 0.1
+
+# Duplicate tolerances: relative volume per atom, relative cell lengths,
+# cell angles (deg) and g(r) distance (0..1)
+VPA_TOL = 0.03
+CELL_TOL = 0.03
+ANGLE_TOL = 2.0
+RDF_TOL = 0.05
+
+
+class Fingerprint(NamedTuple):
+    formula: str
+    n_atoms: int
+    cellpar: Tuple[float, ...]   # reduced a <= b <= c (A), alpha, beta, gamma (deg, folded to <= 90)
+    volume_per_atom: float
+    rdf: np.ndarray              # g(r) on RDF bins
+
+    def to_dict(self) -> dict:
+        return {
+            "formula": self.formula,
+            "n_atoms": self.n_atoms,
+            "cellpar": [round(x, 4) for x in self.cellpar],
+            "volume_per_atom": round(self.volume_per_atom, 4),
+            "rdf": np.round(self.rdf, 4).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Fingerprint":
+        return cls(
+            formula=data["formula"],
+            n_atoms=int(data["n_atoms"]),
+            cellpar=tuple(data["cellpar"]),
+            volume_per_atom=float(data["volume_per_atom"]),
+            rdf=np.asarray(data["rdf"], dtype=np.float64),
+        )
+
+
+# =======================================
+# FINGERPRINT
+# =======================================
+
+def reduced_formula(symbols: Iterable[str]) -> str:
+    """Hill-order formula divided by the gcd of the counts (C6H4N2 -> C3H2N)."""
+    elements, counts = np.unique(np.asarray(list(symbols)), return_counts=True)
+    counts = counts // reduce(math.gcd, counts.tolist())
+    by_element = dict(zip(elements.tolist(), counts.tolist()))
+    order = sorted(by_element)
+    if "C" in by_element:
+        order = ["C"] + (["H"] if "H" in by_element else []) + [e for e in order if e not in ("C", "H")]
+    return "".join(f"{e}{by_element[e] if by_element[e] > 1 else ''}" for e in order)
+
+
+def reduced_cellpar(cell: np.ndarray) -> Tuple[float, ...]:
+    """Cell parameters of the Minkowski-reduced cell, lengths sorted, angles folded to <= 90."""
+    from ase.geometry import minkowski_reduce
+
+    rcell, _ = minkowski_reduce(np.asarray(cell, dtype=float))
+    rcell = rcell[np.argsort(np.linalg.norm(rcell, axis=1), kind="stable")]
+    lengths = np.linalg.norm(rcell, axis=1)
+    angles = []
+    for i, j in ((1, 2), (0, 2), (0, 1)):
+        cos = abs(np.dot(rcell[i], rcell[j])) / (lengths[i] * lengths[j])
+        angles.append(float(np.degrees(np.arccos(min(cos, 1.0)))))
+    return tuple(float(x) for x in lengths) + tuple(angles)
+
+
+def rdf(cell: np.ndarray, frac: np.ndarray, r_max: float = RDF_RMAX, bin_width: float = RDF_BIN,
+        sigma: float = RDF_SIGMA) -> np.ndarray:
+    """
+    Total g(r) of a periodic structure, Gaussian-smoothed, on bins of
+    bin_width up to r_max. Pairs are counted with cKDTree.count_neighbors
+    between the unit cell and every periodic image within r_max of it.
+    """
+    from scipy.spatial import cKDTree
+
+    cell = np.asarray(cell, dtype=float)
+    frac = np.asarray(frac, dtype=float) % 1.0
+    n = len(frac)
+    volume = abs(np.linalg.det(cell))
+
+    # Images needed along each axis: r_max over the interplanar spacing
+    spacing = 1.0 / np.linalg.norm(np.linalg.inv(cell).T, axis=1)
+    reps = np.ceil(r_max / spacing).astype(int)
+    shifts = np.stack(np.meshgrid(*[np.arange(-k, k + 1) for k in reps], indexing="ij"), -1).reshape(-1, 3)
+    images = ((frac[None, :, :] + shifts[:, None, :]).reshape(-1, 3)) @ cell
+
+    edges = np.arange(0.0, r_max + bin_width / 2, bin_width)
+    cumulative = cKDTree(images).count_neighbors(cKDTree(frac @ cell), edges)
+    counts = np.diff(cumulative).astype(float)  # self-pairs (r = 0) fall before the first bin
+
+    r = 0.5 * (edges[1:] + edges[:-1])
+    shell = 4.0 * np.pi * r * r * bin_width
+    g = counts / (n * (n / volume) * shell)
+
+    if sigma > 0:
+        half = int(np.ceil(3 * sigma / bin_width))
+        kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * bin_width / sigma) ** 2)
+        g = np.convolve(g, kernel / kernel.sum(), mode="same")
+    return g
+
+
+def fingerprint(cell, symbols, frac) -> Fingerprint:
+    """Fingerprint of a structure (lattice rows, element symbols, fractional coordinates)."""
+    cell = np.asarray(cell, dtype=float)
+    symbols = np.asarray(symbols)
+    return Fingerprint(
+        formula=reduced_formula(symbols.tolist()),
+        n_atoms=len(symbols),
+        cellpar=reduced_cellpar(cell),
+        volume_per_atom=float(abs(np.linalg.det(cell)) / len(symbols)),
+        rdf=rdf(cell, frac),
+    )
+
+
+def fingerprint_cif(path: str) -> Fingerprint:
+    from cif_reader import read_cif
+
+    cif = read_cif(path)
+    return fingerprint(cif.cell, cif.symbols, cif.frac)
+
+
+def rdf_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Normalised L1 distance between two g(r) curves: 0 identical, 1 disjoint."""
+    total = np.abs(a).sum() + np.abs(b).sum()
+    return float(np.abs(a - b).sum() / total) if total > 0 else 0.0
+
+
+# =======================================
+# INDEX
+# =======================================
+
+def file_stamp(path: str) -> list:
+    """[size, mtime_ns] of a file, to tell whether a cached fingerprint is stale."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _bucket(formula: str, volume_per_atom: float, vpa_tol: float, shift: int = 0) -> str:
+    # Bins of width -log(1 - vpa_tol) in log(volume per atom): anything within vpa_tol
+    # (relative) of a value lies in its bin or one of the two next to it
+    return f"{formula}|{math.floor(math.log(volume_per_atom) / -math.log1p(-vpa_tol)) + shift}"
+
+
+def cells_match(a: Fingerprint, b: Fingerprint, cell_tol: float = CELL_TOL, angle_tol: float = ANGLE_TOL) -> bool:
+    """
+    Reduced-cell pre-filter: cells with as many atoms must have the same
+    lengths (to cell_tol) and angles (to angle_tol, compared sorted, since
+    near-equal lengths may swap); otherwise one atom count must be a
+    multiple of the other, as for a supercell.
+    """
+    if a.n_atoms != b.n_atoms:
+        small, large = sorted((a.n_atoms, b.n_atoms))
+        return small > 0 and large % small == 0
+    la, lb = np.asarray(a.cellpar[:3]), np.asarray(b.cellpar[:3])
+    if np.any(np.abs(la - lb) > cell_tol * lb):
+        return False
+    return bool(np.all(np.abs(np.sort(a.cellpar[3:]) - np.sort(b.cellpar[3:])) <= angle_tol))
+
+
+def _stale(key: str, stamp) -> bool:
+    """Whether a file-backed entry's file is gone or has changed since it was fingerprinted."""
+    if stamp is None:
+        return False
+    try:
+        return file_stamp(key) != list(stamp)
+    except OSError:
+        return True
+
+
+class FingerprintIndex:
+    """
+    Hashed index of fingerprints keyed by an arbitrary string (a CIF path,
+    a COF name, ...). With a cache path, entries added through add() are
+    appended there as JSON lines and loaded on the next start.
+    """
+
+    def __init__(self, path: Optional[str] = FINGERPRINT_CACHE, vpa_tol: float = VPA_TOL, rdf_tol: float = RDF_TOL):
+        self.path = path
+        self.vpa_tol = vpa_tol
+        self.rdf_tol = rdf_tol
+        self.entries: Dict[str, Fingerprint] = {}
+        self._stamps: Dict[str, Optional[list]] = {}
+        self._buckets: Dict[str, List[str]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    fp = Fingerprint.from_dict(entry["fingerprint"])
+                except (ValueError, KeyError):
+                    continue  # torn or foreign line
+                self._insert(entry["key"], fp, entry.get("stamp"))
+
+    def _remove(self, key: str):
+        old = self.entries.pop(key)
+        self._stamps.pop(key, None)
+        self._buckets[_bucket(old.formula, old.volume_per_atom, self.vpa_tol)].remove(key)
+
+    def _insert(self, key: str, fp: Fingerprint, stamp=None):
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = fp
+        self._stamps[key] = stamp
+        self._buckets.setdefault(_bucket(fp.formula, fp.volume_per_atom, self.vpa_tol), []).append(key)
+
+    def add(self, key: str, fp: Fingerprint, stamp=None):
+        """Index fp under key (replacing any previous entry) and persist it."""
+        self._insert(key, fp, stamp)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "stamp": stamp, "fingerprint": fp.to_dict()}) + "\n")
+
+    def find(self, fp: Fingerprint, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(key, g(r) distance) of every near-duplicate of fp, closest first."""
+        matches = []
+        for shift in (-1, 0, 1):
+            for key in self._buckets.get(_bucket(fp.formula, fp.volume_per_atom, self.vpa_tol, shift), ()):
+                if key == exclude:
+                    continue
+                other = self.entries[key]
+                if abs(other.volume_per_atom - fp.volume_per_atom) > self.vpa_tol * fp.volume_per_atom:
+                    continue
+                if not cells_match(fp, other):
+                    continue
+                distance = rdf_distance(fp.rdf, other.rdf)
+                if distance <= self.rdf_tol:
+                    matches.append((key, distance))
+        return sorted(matches, key=lambda m: m[1])
+
+    def duplicate_of(self, fp: Fingerprint, exclude: Optional[str] = None) -> Optional[str]:
+        """Key of the closest near-duplicate already indexed, or None."""
+        matches = self.find(fp, exclude=exclude)
+        return matches[0][0] if matches else None
+
+    # -----------------------------
+    # CIF files
+    # -----------------------------
+
+    def add_cif(self, path: str) -> Fingerprint:
+        """Fingerprint a CIF under its path, reusing the cached entry if the file is unchanged."""
+        stamp = file_stamp(path)
+        if path in self.entries and self._stamps.get(path) == stamp:
+            return self.entries[path]
+        fp = fingerprint_cif(path)
+        self.add(path, fp, stamp=stamp)
+        return fp
+
+    def scan(self, dirs: Iterable[str] = LIBRARY_DIRS, verbose: bool = False) -> List[Tuple[str, str]]:
+        """
+        Index every *.cif / *.cif.gz under dirs and return (path, duplicate_of)
+        for each file that duplicates one indexed before it (sorted order).
+        The cache is compacted before and after.
+        """
+        paths = []
+        for d in dirs:
+            paths += sorted(glob.glob(os.path.join(d, "*.cif")) + glob.glob(os.path.join(d, "*.cif.gz")))
+
+        self.compact()  # forget deleted/changed files before reporting duplicates of them
+        duplicates = []
+        pending = set(paths)
+        for path in paths:
+            pending.discard(path)
+            try:
+                fp = self.add_cif(path)
+            except Exception as e:
+                if verbose:
+                    print(f"Skipping {path}: {e}")
+                continue
+            # Report each file against one seen before it (in this scan or a previous run)
+            earlier = [key for key, _ in self.find(fp, exclude=path) if key not in pending]
+            if earlier:
+                duplicates.append((path, earlier[0]))
+        self.compact()
+        return duplicates
+
+    def compact(self) -> int:
+        """
+        Drop entries of files that were deleted or changed since they were
+        fingerprinted, and rewrite the cache with one line per entry (the
+        appends keep every older version). Returns the number dropped.
+        """
+        stale = [key for key, stamp in self._stamps.items() if _stale(key, stamp)]
+        for key in stale:
+            self._remove(key)
+        if self.path and os.path.exists(self.path):
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, fp in self.entries.items():
+                    f.write(json.dumps({"key": key, "stamp": self._stamps.get(key), "fingerprint": fp.to_dict()}) + "\n")
+            os.replace(tmp_path, self.path)
+        return len(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint COF structures and flag near-duplicates.")
+    parser.add_argument("--cache", default=FINGERPRINT_CACHE, help="Fingerprint cache (JSON lines).")
+    parser.add_argument("--rdf-tol", type=float, default=RDF_TOL, help="Max g(r) distance for a duplicate (0..1).")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_scan = sub.add_parser("scan", help="Index library directories and list duplicates.")
+    p_scan.add_argument("dirs", nargs="*", default=LIBRARY_DIRS)
+    p_check = sub.add_parser("check", help="Look CIF files up in the index.")
+    p_check.add_argument("cifs", nargs="+")
+    args = parser.parse_args()
+
+    index = FingerprintIndex(args.cache, rdf_tol=args.rdf_tol)
+    if args.cmd == "scan":
+        duplicates = index.scan(args.dirs, verbose=True)
+        for path, original in duplicates:
+            print(f"{path}  duplicates  {original}")
+        print(f">>> {len(index)} structures indexed, {len(duplicates)} duplicates")
+    else:
+        for path in args.cifs:
+            matches = index.find(fingerprint_cif(path), exclude=path)
+            print(f"{path}: " + (", ".join(f"{key} ({d:.3f})" for key, d in matches) if matches else "unique"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Cheap UFF-style force field to pre-relax structures before xTB.
+
+Raw pyCOFBuilder geometries start the GFN1-xTB relaxation at fmax ~150
+eV/A (opt.log), and the first BFGS steps, at several seconds each, go
+into undoing distorted bonds and angles. A classical pre-relaxation
+removes most of that in well under a second:
+
+  - atom types from element and coordination (C_3/C_R/C_1, N_3/N_R/N_1,
+    O_3/O_R/O_2, ...), bonds from covalent radii,
+  - UFF harmonic bonds (rest length with bond-order and electronegativity
+    corrections, k = 664.12 Z_i Z_j / r^3),
+  - UFF cosine-harmonic angles,
+  - UFF Lennard-Jones between atoms not bonded 1-2 or 1-3, over a periodic
+    Verlet list (neighbors.neighbor_list at cutoff + skin, rebuilt only
+    when atoms or the cell have moved more than the skin allows).
+
+Torsions and inversions are left to xTB. Every term is written in terms
+of interatomic vectors (with their periodic shifts), so forces and the
+stress for the cell filter come out of the same gradient arrays; no
+step loops over atoms in Python.
+
+    stats = prerelax(atoms)    # in place, FIRE on positions and cell
+    atoms.calc = UFFCalculator()
+
+relax.py runs it ahead of the xTB stage with --prerelax. `compare`
+relaxes each CIF with and without it and reports the xTB steps saved:
+
+    python forcefield.py compare valid_cofs/*.cif --workers 4 --threads 4
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from ase.calculators.calculator import Calculator, all_changes
+
+from neighbors import neighbor_list
+
+KCAL_TO_EV = 0.0433641
+
+# UFF parameters (Rappe et al. 1992): bond radius r (A), angle theta0 (deg),
+# LJ distance x (A) and well depth D (kcal/mol), effective charge Z
+UFF_TYPES = {
+    "H_": (0.354, 180.0, 2.886, 0.044, 0.712),
+    "B_2": (0.828, 120.0, 4.083, 0.180, 1.755),
+    "B_3": (0.838, 109.47, 4.083, 0.180, 1.755),
+    "C_1": (0.706, 180.0, 3.851, 0.105, 1.912),
+    "C_R": (0.729, 120.0, 3.851, 0.105, 1.912),
+    "C_3": (0.757, 109.47, 3.851, 0.105, 1.912),
+    "N_1": (0.656, 180.0, 3.660, 0.069, 2.544),
+    "N_R": (0.699, 120.0, 3.660, 0.069, 2.544),
+    "N_3": (0.700, 106.7, 3.660, 0.069, 2.544),
+    "O_2": (0.634, 120.0, 3.500, 0.060, 2.300),
+    "O_R": (0.680, 110.0, 3.500, 0.060, 2.300),
+    "O_3": (0.658, 104.51, 3.500, 0.060, 2.300),
+    "F_": (0.668, 180.0, 3.364, 0.050, 1.735),
+    "Si3": (1.117, 109.47, 4.295, 0.402, 2.323),
+    "P_3": (1.101, 93.8, 4.147, 0.305, 2.863),
+    "S_2": (0.854, 120.0, 4.035, 0.274, 2.703),
+    "S_3": (1.064, 92.1, 4.035, 0.274, 2.703),
+    "Cl": (1.044, 180.0, 3.947, 0.227, 2.348),
+    "Br": (1.192, 180.0, 4.189, 0.251, 2.519),
+    "I_": (1.382, 180.0, 4.500, 0.339, 2.650),
+}
+
+# GMP electronegativities for the bond-length correction
+ELECTRONEGATIVITY = {"H": 4.528, "B": 5.110, "C": 5.343, "N": 6.899, "O": 8.741, "F": 10.874,
+                     "Si": 4.168, "P": 5.463, "S": 6.928, "Cl": 8.564, "Br": 7.790, "I": 6.822}
+
+BOND_SCALE = 1.2      # bonded if closer than this times the sum of covalent radii
+LJ_CUTOFF = 8.0       # A
+LJ_SKIN = 1.0         # A, Verlet-list margin
+
+PRERELAX_FMAX = 0.5   # eV/A: close enough for xTB to take over
+PRERELAX_STEPS = 300
+
+_SHIFT_RANGE = 33     # shifts are encoded in [-16, 16] per axis for pair keys
+
+
+# =======================================
+# ATOM TYPES
+# =======================================
+
+def _atom_type(symbol: str, degree: int, sp2_neighbour: bool) -> str:
+    if symbol == "H":
+        return "H_"
+    if symbol == "C":
+        return {4: "C_3", 3: "C_R"}.get(degree, "C_1" if degree <= 2 else "C_3")
+    if symbol == "N":
+        if degree <= 1:
+            return "N_1"
+        if degree == 2 or sp2_neighbour:
+            return "N_R"
+        return "N_3"
+    if symbol == "O":
+        if degree <= 1:
+            return "O_2"
+        return "O_R" if sp2_neighbour else "O_3"
+    if symbol == "B":
+        return "B_3" if degree >= 4 else "B_2"
+    if symbol == "S":
+        return "S_2" if degree <= 1 else "S_3"
+    if symbol == "Si":
+        return "Si3"
+    if symbol == "P":
+        return "P_3"
+    if symbol in ("F", "Cl", "Br", "I"):
+        return {"F": "F_", "I": "I_"}.get(symbol, symbol)
+    raise ValueError(f"No UFF type for element {symbol}")
+
+
+def atom_types(symbols, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """UFF type of each atom, given the directed bond list (i, j)."""
+    symbols = np.asarray(symbols).tolist()
+    degree = np.bincount(i, minlength=len(symbols))
+    sp2 = np.array([s in ("C", "B") and d == 3 for s, d in zip(symbols, degree)])
+    sp2_neighbour = np.bincount(i, weights=sp2[j], minlength=len(symbols)) > 0
+    return np.array([_atom_type(s, int(d), bool(n)) for s, d, n in zip(symbols, degree, sp2_neighbour)])
+
+
+RESONANT_TYPES = ["C_R", "N_R", "O_R", "B_2"]
+
+
+def _bond_order(type_i: np.ndarray, type_j: np.ndarray) -> np.ndarray:
+    """1 by default, 1.5 between resonant types, 2 to a terminal O/S, 3 between two linear types."""
+    order = np.ones(len(type_i))
+    order[np.isin(type_i, RESONANT_TYPES) & np.isin(type_j, RESONANT_TYPES)] = 1.5
+    order[np.isin(type_i, ["O_2", "S_2"]) | np.isin(type_j, ["O_2", "S_2"])] = 2.0
+    order[np.char.endswith(type_i, "_1") & np.char.endswith(type_j, "_1")] = 3.0
+    return order
+
+
+def _bond_rest_lengths(types, r, chi, a, b) -> np.ndarray:
+    """UFF rest length: radii plus bond-order correction minus electronegativity correction."""
+    order = _bond_order(types[a], types[b])
+    r_en = r[a] * r[b] * (np.sqrt(chi[a]) - np.sqrt(chi[b])) ** 2 / (chi[a] * r[a] + chi[b] * r[b])
+    return r[a] + r[b] - 0.1332 * (r[a] + r[b]) * np.log(order) - r_en
+
+
+# =======================================
+# FORCE FIELD
+# =======================================
+
+def _pair_keys(i, j, shift, n: int) -> np.ndarray:
+    s = np.asarray(shift, dtype=np.int64) + _SHIFT_RANGE // 2
+    return ((((np.asarray(i, dtype=np.int64) * n + j) * _SHIFT_RANGE + s[:, 0]) * _SHIFT_RANGE + s[:, 1])
+            * _SHIFT_RANGE + s[:, 2])
+
+
+def _positive_shift(shift: np.ndarray) -> np.ndarray:
+    """Whether each shift's first non-zero component is positive."""
+    first = np.argmax(shift != 0, axis=1)
+    return shift[np.arange(len(shift)), first] > 0
+
+
+def _scatter(n: int, index: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    return np.stack([np.bincount(index, weights=vectors[:, k], minlength=n) for k in range(3)], axis=1)
+
+
+class Topology(NamedTuple):
+    types: np.ndarray          # (n,) UFF type names
+    bonds: np.ndarray          # (nb, 2) atom indices, each bond once
+    bond_shift: np.ndarray     # (nb, 3) cell shift of the second atom
+    bond_r0: np.ndarray
+    bond_k: np.ndarray         # eV/A^2
+    angles: np.ndarray         # (na, 3) i, j (centre), k
+    angle_shift: np.ndarray    # (na, 2, 3) cell shifts of i and k relative to j
+    angle_cos0: np.ndarray
+    angle_k: np.ndarray        # eV
+    angle_linear: np.ndarray   # (na,) bool: E = k (1 + cos) instead of the cosine-harmonic form
+    lj_x: np.ndarray           # (n,) A
+    lj_d: np.ndarray           # (n,) eV
+    excluded: np.ndarray       # sorted keys (_pair_keys) of 1-2 and 1-3 pairs, both directions
+
+
+def build_topology(cell, symbols, positions) -> Topology:
+    """Bonds, angles and parameters of a structure, from its geometry."""
+    from ase.data import atomic_numbers, covalent_radii
+
+    symbols = np.asarray(symbols)
+    n = len(symbols)
+    radii = np.array([covalent_radii[atomic_numbers[s]] for s in symbols.tolist()])
+    i, j, d, shift = neighbor_list(cell, positions=positions, cutoff=2 * BOND_SCALE * radii.max())
+    bonded = d < BOND_SCALE * (radii[i] + radii[j])
+    i, j, shift = i[bonded], j[bonded], shift[bonded]
+
+    types = atom_types(symbols, i, j)
+    params = np.array([UFF_TYPES[t] for t in types.tolist()])
+    r, theta0, x, depth, z = params.T
+    chi = np.array([ELECTRONEGATIVITY[s] for s in symbols.tolist()])
+
+    # Each bond once: i < j, or an atom bonded to its own image with a "positive" shift
+    first = (i < j) | ((i == j) & _positive_shift(shift))
+    bi, bj, bshift = i[first], j[first], shift[first]
+    r0 = _bond_rest_lengths(types, r, chi, bi, bj)
+    bond_k = 664.12 * z[bi] * z[bj] / r0 ** 3 * KCAL_TO_EV
+
+    # Angles: every pair of bonds around a centre, from a (centre, slot) table of the directed bonds
+    order_by_centre = np.argsort(i, kind="stable")
+    centre, other, oshift = i[order_by_centre], j[order_by_centre], shift[order_by_centre]
+    degree = np.bincount(centre, minlength=n)
+    slot = np.arange(len(centre)) - np.repeat(np.cumsum(degree) - degree, degree)
+    table = np.full((n, max(int(degree.max(initial=0)), 1)), -1)
+    table[centre, slot] = np.arange(len(centre))
+    pairs = [(table[:, p], table[:, q]) for p in range(table.shape[1]) for q in range(p + 1, table.shape[1])]
+    if pairs:
+        a = np.concatenate([p for p, _ in pairs])
+        b = np.concatenate([q for _, q in pairs])
+        valid = (a >= 0) & (b >= 0)
+        a, b = a[valid], b[valid]
+    else:
+        a = b = np.zeros(0, dtype=int)
+    ai, aj, ak = other[a], centre[a], other[b]
+    angle_shift = np.stack([oshift[a], oshift[b]], axis=1)
+
+    r_ij = _bond_rest_lengths(types, r, chi, aj, ai)
+    r_jk = _bond_rest_lengths(types, r, chi, aj, ak)
+    theta = np.radians(theta0[aj])
+    cos0 = np.cos(theta)
+    r_ik2 = r_ij ** 2 + r_jk ** 2 - 2 * r_ij * r_jk * cos0
+    angle_k = (664.12 * z[ai] * z[ak] / r_ik2 ** 2.5
+               * (3 * r_ij * r_jk * (1 - cos0 ** 2) - r_ik2 * cos0) * KCAL_TO_EV)
+    linear = theta0[aj] > 179.0
+
+    excluded = np.concatenate([
+        _pair_keys(i, j, shift, n),
+        _pair_keys(ai, ak, angle_shift[:, 1] - angle_shift[:, 0], n),
+        _pair_keys(ak, ai, angle_shift[:, 0] - angle_shift[:, 1], n),
+    ])
+    return Topology(
+        types=types,
+        bonds=np.stack([bi, bj], axis=1),
+        bond_shift=bshift,
+        bond_r0=r0,
+        bond_k=bond_k,
+        angles=np.stack([ai, aj, ak], axis=1),
+        angle_shift=angle_shift,
+        angle_cos0=cos0,
+        angle_k=angle_k,
+        angle_linear=linear,
+        lj_x=x,
+        lj_d=depth * KCAL_TO_EV,
+        excluded=np.unique(excluded),
+    )
+
+
+class ForceField:
+    """Energy, forces and strain derivative of a fixed Topology, with a periodic Verlet list for LJ."""
+
+    def __init__(self, topology: Topology, cutoff: float = LJ_CUTOFF, skin: float = LJ_SKIN):
+        self.topology = topology
+        self.cutoff = cutoff
+        self.skin = skin
+        self._pairs = None
+        self._ref_positions = None
+        self._ref_cell = None
+        self.rebuilds = 0
+
+    def _lj_pairs(self, positions, cell):
+        """(i, j, shift) within cutoff + skin, minus 1-2/1-3 pairs; rebuilt when the skin is used up."""
+        if self._pairs is not None:
+            moved = np.linalg.norm(positions - self._ref_positions, axis=1).max()
+            strained = np.linalg.norm(cell - self._ref_cell, axis=1).max() * np.abs(self._pairs[2]).max(initial=0)
+            if 2 * moved + strained < self.skin:
+                return self._pairs
+
+        n = len(positions)
+        i, j, _, shift = neighbor_list(cell, positions=positions, cutoff=self.cutoff + self.skin)
+        keep = ~np.isin(_pair_keys(i, j, shift, n), self.topology.excluded, assume_unique=False)
+        self._pairs = (i[keep], j[keep], shift[keep])
+        self._ref_positions = positions.copy()
+        self._ref_cell = cell.copy()
+        self.rebuilds += 1
+        return self._pairs
+
+    def evaluate(self, positions, cell) -> Tuple[float, np.ndarray, np.ndarray]:
+        """Energy (eV), forces (eV/A) and dE/d(strain) (eV, 3x3) at these positions and cell."""
+        t = self.topology
+        positions = np.asarray(positions, dtype=float)
+        cell = np.asarray(cell, dtype=float)
+        n = len(positions)
+        grad = np.zeros((n, 3))
+        dstrain = np.zeros((3, 3))
+        energy = 0.0
+
+        def add_vector_gradient(a, b, v, g):
+            # v = r_b + shift - r_a; g = dE/dv
+            nonlocal grad, dstrain
+            grad += _scatter(n, b, g) - _scatter(n, a, g)
+            dstrain += g.T @ v
+
+        # Bonds
+        if len(t.bonds):
+            a, b = t.bonds.T
+            v = positions[b] + t.bond_shift @ cell - positions[a]
+            r = np.linalg.norm(v, axis=1)
+            stretch = r - t.bond_r0
+            energy += float(0.5 * np.sum(t.bond_k * stretch ** 2))
+            add_vector_gradient(a, b, v, (t.bond_k * stretch / r)[:, None] * v)
+
+        # Angles
+        if len(t.angles):
+            ai, aj, ak = t.angles.T
+            u = positions[ai] + t.angle_shift[:, 0] @ cell - positions[aj]
+            w = positions[ak] + t.angle_shift[:, 1] @ cell - positions[aj]
+            lu = np.linalg.norm(u, axis=1)
+            lw = np.linalg.norm(w, axis=1)
+            cos = np.einsum("ij,ij->i", u, w) / (lu * lw)
+            sin2 = np.maximum(1.0 - t.angle_cos0 ** 2, 1e-8)
+            harmonic = np.where(t.angle_linear, 0.0, t.angle_k / (2 * sin2) * (cos - t.angle_cos0) ** 2)
+            energy += float(np.sum(np.where(t.angle_linear, t.angle_k * (1.0 + cos), harmonic)))
+            de_dcos = np.where(t.angle_linear, t.angle_k, t.angle_k / sin2 * (cos - t.angle_cos0))
+            gu = de_dcos[:, None] * (w / (lu * lw)[:, None] - (cos / lu ** 2)[:, None] * u)
+            gw = de_dcos[:, None] * (u / (lu * lw)[:, None] - (cos / lw ** 2)[:, None] * w)
+            add_vector_gradient(aj, ai, u, gu)
+            add_vector_gradient(aj, ak, w, gw)
+
+        # Lennard-Jones; every pair appears in both directions, hence the halves
+        i, j, shift = self._lj_pairs(positions, cell)
+        if len(i):
+            v = positions[j] + shift @ cell - positions[i]
+            r = np.linalg.norm(v, axis=1)
+            inside = r < self.cutoff
+            i, j, v, r = i[inside], j[inside], v[inside], r[inside]
+            x = np.sqrt(t.lj_x[i] * t.lj_x[j])
+            depth = np.sqrt(t.lj_d[i] * t.lj_d[j])
+            s6 = (x / r) ** 6
+            energy += float(0.5 * np.sum(depth * (s6 * s6 - 2 * s6)))
+            de_dr = 12 * depth * (s6 - s6 * s6) / r
+            add_vector_gradient(i, j, v, 0.5 * (de_dr / r)[:, None] * v)
+
+        return energy, -grad, 0.5 * (dstrain + dstrain.T)
+
+
+# =======================================
+# ASE
+# =======================================
+
+class UFFCalculator(Calculator):
+    """ASE calculator for ForceField; the topology is fixed from the first structure it sees."""
+
+    implemented_properties = ["energy", "free_energy", "forces", "stress"]
+
+    def __init__(self, cutoff: float = LJ_CUTOFF, skin: float = LJ_SKIN, **kwargs):
+        super().__init__(**kwargs)
+        self.cutoff = cutoff
+        self.skin = skin
+        self.forcefield: Optional[ForceField] = None
+
+    def calculate(self, atoms=None, properties=("energy",), system_changes=None):
+        from ase.stress import full_3x3_to_voigt_6_stress
+
+        super().calculate(atoms, properties, system_changes or all_changes)
+        cell = np.asarray(self.atoms.cell)
+        positions = self.atoms.get_positions()
+        if self.forcefield is None:
+            topology = build_topology(cell, self.atoms.get_chemical_symbols(), positions)
+            self.forcefield = ForceField(topology, self.cutoff, self.skin)
+        energy, forces, dstrain = self.forcefield.evaluate(positions, cell)
+        self.results = {
+            "energy": energy,
+            "free_energy": energy,
+            "forces": forces,
+            "stress": full_3x3_to_voigt_6_stress(dstrain / abs(np.linalg.det(cell))),
+        }
+
+
+def prerelax(atoms, fmax: float = PRERELAX_FMAX, steps: int = PRERELAX_STEPS, relax_cell: bool = True) -> Dict[str, float]:
+    """
+    Relax atoms in place with the force field (FIRE, positions and cell)
+    and detach the calculator afterwards. Returns step count, time and
+    force-field energies/fmax before and after.
+    """
+    from ase.optimize import FIRE
+
+    from relax import cell_filter, max_force
+
+    start = time.perf_counter()
+    atoms.calc = UFFCalculator()
+    target = cell_filter(atoms) if relax_cell else atoms
+    energy0 = atoms.get_potential_energy()
+    fmax0 = max_force(target.get_forces())
+    opt = FIRE(target, logfile=None)
+    opt.run(fmax=fmax, steps=steps)
+    stats = {
+        "steps": opt.nsteps,
+        "time_s": round(time.perf_counter() - start, 3),
+        "energy_start": round(float(energy0), 4),
+        "energy_end": round(float(atoms.get_potential_energy()), 4),
+        "fmax_start": round(fmax0, 4),
+        "fmax_end": round(max_force(target.get_forces()), 4),
+        "neighbour_rebuilds": atoms.calc.forcefield.rebuilds,
+    }
+    atoms.calc = None
+    return stats
+
+
+# =======================================
+# COMPARISON
+# =======================================
+
+def compare(paths, root: str, workers: int = 1, threads: Optional[int] = None, **settings):
+    """
+    Relax every CIF with xTB twice, from the raw structure and after
+    prerelax(), and return one row per structure with the xTB steps saved.
+    """
+    from relax import compare_variants
+
+    rows = compare_variants(paths, root, {"raw": {"prerelax": False}, "prerelax": {"prerelax": True}},
+                            workers, threads, **settings)
+    for row in rows:
+        row["steps_saved"] = row["raw_steps"] - row["prerelax_steps"]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UFF-style pre-relaxation ahead of xTB.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="Pre-relax CIFs and write <name>_prerelaxed.cif next to them.")
+    p_run.add_argument("cifs", nargs="+")
+    p_run.add_argument("--fmax", type=float, default=PRERELAX_FMAX)
+    p_run.add_argument("--steps", type=int, default=PRERELAX_STEPS)
+    p_cmp = sub.add_parser("compare", help="xTB steps with and without pre-relaxation.")
+    p_cmp.add_argument("cifs", nargs="+")
+    p_cmp.add_argument("--root", default="relax_compare", help="Job queue directory for the comparison.")
+    p_cmp.add_argument("--workers", type=int, default=1)
+    p_cmp.add_argument("--threads", type=int)
+    p_cmp.add_argument("--max-steps", type=int, default=1000)
+    p_cmp.add_argument("-o", "--output", help="CSV file (default: print to stdout).")
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        from ase.io import write
+
+        from cif_reader import read_cif
+
+        for path in args.cifs:
+            atoms = read_cif(path).to_atoms()
+            stats = prerelax(atoms, fmax=args.fmax, steps=args.steps)
+            out = path.split(".cif")[0] + "_prerelaxed.cif"
+            write(out, atoms)
+            print(f"{out}: {stats}")
+        return
+
+    import pandas as pd
+
+    df = pd.DataFrame(compare(args.cifs, args.root, args.workers, args.threads, max_steps=args.max_steps))
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+    if len(df):
+        print(f"Mean xTB steps saved: {df['steps_saved'].mean():.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Periodic neighbour lists for triclinic cells, and a fast atom-clash screen.
+
+A KD-tree (scipy.spatial.cKDTree) is built over the atoms of the cell plus
+the periodic images that lie within `cutoff` of it. The padding is sized by
+the interplanar spacings, so skewed cells such as the 120 degree HCB cells
+in valid_cofs/ are handled exactly. Building the tree and querying all
+pairs costs a few milliseconds for a 1000-atom framework:
+
+    i, j, d, shift = neighbor_list(cell, frac, cutoff=3.0)
+
+    clashes = find_clashes(cell, symbols, frac)
+    check_clashes(cell, symbols, frac)    # raises ClashError
+
+A clash is a pair closer than max(MIN_DISTANCE, CLASH_SCALE * (r_i + r_j))
+with covalent radii r. That catches what pyCOFBuilder reports as "Atoms too
+close", plus clashes between stacked layers and across cell boundaries,
+which its single-layer check does not see. ClashError messages contain
+"closer than", so the failure cache classifies them as deterministic
+atoms_too_close failures.
+"""
+
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+# Clash thresholds (Angstrom): pyCOFBuilder's absolute minimum, and a
+# fraction of the covalent bond length for heavier pairs
+MIN_DISTANCE = 0.8
+CLASH_SCALE = 0.7
+
+
+class ClashError(ValueError):
+    pass
+
+
+class Clash(NamedTuple):
+    i: int
+    j: int
+    distance: float
+    threshold: float
+
+
+# =======================================
+# NEIGHBOUR LIST
+# =======================================
+
+def _as_frac(cell: np.ndarray, frac=None, positions=None) -> np.ndarray:
+    if frac is not None:
+        return np.asarray(frac, dtype=float).reshape(-1, 3)
+    return np.linalg.solve(cell.T, np.asarray(positions, dtype=float).reshape(-1, 3).T).T
+
+
+def padded_images(cell: np.ndarray, frac: np.ndarray, cutoff: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cartesian positions of the atoms (wrapped into the cell) and of every
+    periodic image within `cutoff` of the cell. Returns (positions, atom
+    index, integer shift) per point; the first len(frac) points are the
+    cell itself.
+    """
+    cell = np.asarray(cell, dtype=float)
+    frac = np.asarray(frac, dtype=float) % 1.0
+    n = len(frac)
+
+    # Padding along each axis, in fractional units: cutoff over the interplanar spacing
+    spacing = 1.0 / np.linalg.norm(np.linalg.inv(cell).T, axis=1)
+    pad = cutoff / spacing
+    reps = np.ceil(pad).astype(int)
+    shifts = np.stack(np.meshgrid(*[np.arange(-k, k + 1) for k in reps], indexing="ij"), -1).reshape(-1, 3)
+    shifts = shifts[np.argsort(np.abs(shifts).sum(axis=1), kind="stable")]  # (0, 0, 0) first
+
+    image_frac = frac[None, :, :] + shifts[:, None, :]
+    keep = np.all((image_frac >= -pad) & (image_frac < 1.0 + pad), axis=2).reshape(-1)
+    index = np.tile(np.arange(n), len(shifts))[keep]
+    image_shifts = np.repeat(shifts, n, axis=0)[keep]
+    return image_frac.reshape(-1, 3)[keep] @ cell, index, image_shifts
+
+
+def neighbor_list(
+    cell, frac=None, cutoff: float = 3.0, positions=None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    All pairs (i, j, shift) with |r_j + shift @ cell - r_i| <= cutoff, for
+    atoms given as fractional (frac) or Cartesian (positions) coordinates.
+    Every pair appears in both directions; an atom's own images count as
+    neighbours, the atom itself does not. Returns arrays i, j, distance and
+    shift (n_pairs x 3 integers).
+    """
+    from scipy.spatial import cKDTree
+
+    cell = np.asarray(cell, dtype=float)
+    frac = _as_frac(cell, frac, positions)
+    n = len(frac)
+    if n == 0:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, np.zeros(0), np.zeros((0, 3), dtype=int)
+
+    points, index, shifts = padded_images(cell, frac, cutoff)
+    pairs = cKDTree(points[:n]).sparse_distance_matrix(cKDTree(points), cutoff, output_type="ndarray")
+    i, k, d = pairs["i"], pairs["j"], pairs["v"]
+    not_self = k != i  # the first n points are the atoms themselves
+    i, k, d = i[not_self], k[not_self], d[not_self]
+
+    # Images were built from wrapped coordinates; express shifts for the input ones
+    wrap = np.floor(frac).astype(int)
+    j = index[k]
+    return i, j, d, shifts[k] - wrap[j] + wrap[i]
+
+
+# =======================================
+# CLASH SCREEN
+# =======================================
+
+def _covalent_radii(symbols) -> np.ndarray:
+    from ase.data import atomic_numbers, covalent_radii
+
+    symbols = np.asarray(symbols)
+    unique, inverse = np.unique(symbols, return_inverse=True)
+    radii = np.array([covalent_radii[atomic_numbers[s]] for s in unique.tolist()])
+    return radii[inverse.reshape(-1)]
+
+
+def find_clashes(
+    cell, symbols, frac=None, positions=None, scale: float = CLASH_SCALE, min_distance: float = MIN_DISTANCE
+) -> List[Clash]:
+    """Atom pairs (i < j, any periodic image) closer than their clash threshold, closest first."""
+    cell = np.asarray(cell, dtype=float)
+    radii = _covalent_radii(symbols)
+    if len(radii) == 0:
+        return []
+    cutoff = max(min_distance, 2 * scale * radii.max())
+    i, j, d, _ = neighbor_list(cell, _as_frac(cell, frac, positions), cutoff)
+
+    threshold = np.maximum(min_distance, scale * (radii[i] + radii[j]))
+    hit = (d < threshold) & (i <= j)
+    order = np.argsort(d[hit], kind="stable")
+    return [
+        Clash(int(a), int(b), float(dist), float(t))
+        for a, b, dist, t in zip(i[hit][order], j[hit][order], d[hit][order], threshold[hit][order])
+    ]
+
+
+def check_clashes(cell, symbols, frac=None, positions=None, **kwargs):
+    """Raise ClashError naming the closest clashing pair, if any."""
+    clashes = find_clashes(cell, symbols, frac=frac, positions=positions, **kwargs)
+    if clashes:
+        symbols = np.asarray(symbols)
+        c = clashes[0]
+        raise ClashError(
+            f"Atoms {c.i} ({symbols[c.i]}) and {c.j} ({symbols[c.j]}) are closer than "
+            f"{c.threshold:.2f} A ({c.distance:.3f} A; {len(clashes)} clashing pairs)"
+        )
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Trust-region BFGS for cell + position relaxations.
+
+Plain ase BFGS on ExpCellFilter (a.ipynb) caps the step at 0.2 A per
+atom but never checks the result: opt.log shows jumps from -15386 to
+-14633 eV (fmax 3997) that take several xTB evaluations to undo.
+TrustRegionBFGS keeps the BFGS model and adds:
+
+  - separate step bounds for atoms (A per atom) and for the cell rows of
+    the filter (strain), both scaled by one trust factor so the
+    quasi-Newton direction is kept,
+  - step rejection: if the energy rises, the step is undone (the
+    evaluation still counts as a step), the Hessian is left alone and the
+    trust factor shrinks four-fold,
+  - trust update from the ratio of actual to predicted energy decrease:
+    halved below 0.25, doubled above 0.75 when the step hit its bound,
+  - Hessian updates only when the curvature condition holds.
+
+All state lives in the plain attributes listed in STATE: relax.py
+checkpoints them, and with restart=<file> they are also written after
+every step and read back on start (like ase BFGS), so a resumed
+relaxation continues with the same model and trust factor.
+
+    opt = TrustRegionBFGS(ExpCellFilter(atoms), logfile="opt.log")
+    opt.run(fmax=0.05)
+
+benchmark relaxes CIFs with both optimizers through relax.py's queue and
+compares steps to convergence:
+
+    python optimizers.py benchmark valid_cofs/*.cif --workers 4 --threads 4
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+from ase.optimize.optimize import Optimizer
+
+MAXSTEP = 0.2          # A per atom, as ase BFGS
+MAXSTEP_CELL = 0.02    # strain per step
+ALPHA = 70.0           # initial Hessian, eV/A^2, as ase BFGS
+ENERGY_TOLERANCE = 1e-3  # eV of energy rise still accepted (SCF noise)
+MIN_TRUST = 1.0 / 64
+MAX_TRUST = 2.0
+
+OPTIMIZERS = ["bfgs", "trust"]
+
+
+class TrustRegionBFGS(Optimizer):
+    # Attributes carrying the optimizer state between steps
+    STATE = ("H", "pos0", "forces0", "e0", "predicted", "trust", "at_boundary", "rejected")
+
+    def __init__(self, atoms, restart=None, logfile="-", trajectory=None, maxstep: float = MAXSTEP,
+                 maxstep_cell: float = MAXSTEP_CELL, alpha: float = ALPHA, **kwargs):
+        self.maxstep = maxstep
+        self.maxstep_cell = maxstep_cell
+        self.alpha = alpha
+        super().__init__(atoms, restart=restart, logfile=logfile, trajectory=trajectory, **kwargs)
+
+    def initialize(self):
+        self.H = None
+        self.pos0 = None
+        self.forces0 = None
+        self.e0 = None
+        self.predicted = None
+        self.trust = 1.0
+        self.at_boundary = False
+        self.rejected = 0
+
+    def read(self):
+        """Restore the STATE attributes from the restart file (written by step())."""
+        self.initialize()
+        for name, value in self.load().items():
+            if name in self.STATE:
+                setattr(self, name, np.asarray(value) if isinstance(value, (list, np.ndarray)) else value)
+
+    def _split(self) -> int:
+        """Rows of the filter coordinates that are atoms; the rest are cell degrees of freedom."""
+        inner = getattr(self.atoms, "atoms", None)
+        return len(inner) if inner is not None else len(self.atoms)
+
+    def _cell_factor(self) -> float:
+        return float(getattr(self.atoms, "exp_cell_factor", getattr(self.atoms, "cell_factor", 1.0)))
+
+    def _update_hessian(self, dr: np.ndarray, df: np.ndarray):
+        a = np.dot(dr, df)
+        if np.abs(dr).max() < 1e-7 or a >= 0:
+            return  # no step, or curvature condition violated
+        dg = self.H @ dr
+        self.H -= np.outer(df, df) / a + np.outer(dg, dg) / np.dot(dr, dg)
+
+    def _bounded_step(self, f: np.ndarray) -> np.ndarray:
+        omega, V = np.linalg.eigh(self.H)
+        dx = (V @ (V.T @ f / np.abs(omega))).reshape(-1, 3)
+        n_atoms = self._split()
+        norms = np.linalg.norm(dx, axis=1)
+        scale = 1.0
+        if n_atoms and norms[:n_atoms].max() > 0:
+            scale = min(scale, self.maxstep * self.trust / norms[:n_atoms].max())
+        if len(dx) > n_atoms and norms[n_atoms:].max() > 0:
+            scale = min(scale, self.maxstep_cell * self._cell_factor() * self.trust / norms[n_atoms:].max())
+        self.at_boundary = scale < 1.0
+        return (dx * scale).reshape(-1)
+
+    def step(self, forces=None):
+        if forces is None:
+            forces = self.atoms.get_forces()
+        x = self.atoms.get_positions().reshape(-1)
+        f = np.asarray(forces).reshape(-1)
+        e = float(self.atoms.get_potential_energy())
+        if self.H is None:
+            self.H = np.eye(len(x)) * self.alpha
+
+        if self.pos0 is not None:
+            actual = self.e0 - e
+            if actual < -ENERGY_TOLERANCE:
+                # Reject: back to the last accepted point with a smaller trust region
+                self.rejected += 1
+                self.trust = max(self.trust * 0.25, MIN_TRUST)
+                x, f, e = self.pos0, self.forces0, self.e0
+            else:
+                self._update_hessian(x - self.pos0, f - self.forces0)
+                ratio = actual / self.predicted if self.predicted and self.predicted > 0 else 1.0
+                if ratio < 0.25:
+                    self.trust = max(self.trust * 0.5, MIN_TRUST)
+                elif ratio > 0.75 and self.at_boundary:
+                    self.trust = min(self.trust * 2.0, MAX_TRUST)
+
+        dx = self._bounded_step(f)
+        self.pos0, self.forces0, self.e0 = x.copy(), f.copy(), e
+        self.predicted = float(np.dot(f, dx) - 0.5 * dx @ self.H @ dx)
+        self.atoms.set_positions((x + dx).reshape(-1, 3))
+        self.dump({name: getattr(self, name) for name in self.STATE})
+
+
+def make_optimizer(name: str, filtered, logfile):
+    """Optimizer for relax.py's settings["optimizer"]."""
+    if name == "bfgs":
+        from ase.optimize import BFGS
+
+        return BFGS(filtered, logfile=logfile)
+    if name == "trust":
+        return TrustRegionBFGS(filtered, logfile=logfile)
+    raise ValueError(f"Unknown optimizer {name!r} (expected one of {OPTIMIZERS})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trust-region BFGS against plain BFGS on xTB relaxations.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_bench = sub.add_parser("benchmark", help="Steps to convergence with each optimizer.")
+    p_bench.add_argument("cifs", nargs="*", help="Default: valid_cofs/*.cif")
+    p_bench.add_argument("--root", default="relax_compare", help="Job queue directory for the benchmark.")
+    p_bench.add_argument("--workers", type=int, default=1)
+    p_bench.add_argument("--threads", type=int)
+    p_bench.add_argument("--max-steps", type=int, default=1000)
+    p_bench.add_argument("--prerelax", action="store_true", help="Pre-relax with the force field in both runs.")
+    p_bench.add_argument("-o", "--output", help="CSV file (default: print to stdout).")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    from relax import compare_variants
+
+    paths = args.cifs or sorted(glob.glob(os.path.join("valid_cofs", "*.cif")))
+    rows = compare_variants(paths, args.root, {"bfgs": {"optimizer": "bfgs"}, "trust": {"optimizer": "trust"}},
+                            args.workers, args.threads, max_steps=args.max_steps, prerelax=args.prerelax)
+    df = pd.DataFrame(rows)
+    if len(df):
+        df["steps_saved"] = df["bfgs_steps"] - df["trust_steps"]
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+    if len(df):
+        print(f"Median steps: bfgs {df['bfgs_steps'].median():.0f}, trust {df['trust_steps'].median():.0f}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Pore size distribution, largest cavity and pore-limiting diameters.
+
+Transport KPIs (H2 diffusivity, water flux, salt rejection) hinge on how
+wide a framework's cavities are and how narrow the windows between them
+get. This module computes both from the periodic distance grid of
+descriptors.distance_grid (distance from each grid point to the nearest
+atom surface, vdW radii):
+
+  - LCD: largest included sphere, twice the largest grid distance
+    (zeo++ Di),
+  - PSD: for every void point, the diameter of the largest sphere that
+    contains it and fits in the framework (the geometric PSD of zeo++
+    -psd), histogrammed as a fraction of the cell volume; each bin is one
+    periodic dilation of the grid, done by FFT,
+  - PLD along a, b and c: the largest sphere that can travel through the
+    periodic structure along that axis. Grid points where a sphere fits
+    are labelled into connected components (scipy.ndimage.label), and a
+    union-find over the components, with the cell shift of every
+    crossing of a cell face, finds components that wrap onto their own
+    periodic image. PLD is the bisection over sphere sizes for the largest
+    one that still percolates. "PLD" alone is the largest of the three
+    (zeo++ Df).
+
+Results are cached in .cof_cache/pore_sizes.jsonl under the structure's
+content hash (structure_store.content_hash) and the grid settings, so a
+structure met again under another name or path is not recomputed.
+
+    p = pore_sizes(cell, symbols, frac)              # one structure
+    rows = pore_sizes_cifs(paths, workers=8)         # many, cached, in parallel
+
+CLI:
+    python pore_size.py valid_cofs/*.cif -o pores.csv --psd psd.jsonl --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from descriptors import GRID_SPACING, distance_grid, grid_shape
+from neighbors import padded_images
+from structure_store import _symbols_to_numbers, content_hash
+
+PORE_CACHE = os.path.join(".cof_cache", "pore_sizes.jsonl")
+PSD_BIN = 0.5    # Angstrom, width of the pore-diameter bins
+
+
+class PoreSizes(NamedTuple):
+    lcd: float                  # largest cavity diameter (A)
+    pld: Tuple[float, ...]      # pore-limiting diameter along a, b, c (A); 0 if nothing percolates
+    psd_edges: np.ndarray       # pore-diameter bin edges (A)
+    psd: np.ndarray             # volume fraction of the cell per bin
+
+    def to_dict(self) -> dict:
+        return {
+            "LCD": round(self.lcd, 4),
+            "PLD": round(max(self.pld), 4),
+            "PLD_a": round(self.pld[0], 4),
+            "PLD_b": round(self.pld[1], 4),
+            "PLD_c": round(self.pld[2], 4),
+            "PSD_edges": np.round(self.psd_edges, 4).tolist(),
+            "PSD": np.round(self.psd, 6).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PoreSizes":
+        return cls(
+            lcd=float(data["LCD"]),
+            pld=(float(data["PLD_a"]), float(data["PLD_b"]), float(data["PLD_c"])),
+            psd_edges=np.asarray(data["PSD_edges"], dtype=np.float64),
+            psd=np.asarray(data["PSD"], dtype=np.float64),
+        )
+
+
+# =======================================
+# PORE SIZE DISTRIBUTION
+# =======================================
+
+def _offset_distances(cell, shape: Tuple[int, int, int], reach: float) -> np.ndarray:
+    """
+    Shortest periodic distance from grid point 0 to every grid point
+    (grid shape), inf beyond reach: the grid offsets within reach are
+    enumerated once and folded back onto the periodic grid.
+    """
+    shape = np.asarray(shape)
+    spacing = 1.0 / np.linalg.norm(np.linalg.inv(cell).T, axis=1)     # interplanar spacings
+    reps = np.ceil(reach / spacing * shape).astype(int)
+    offsets = np.stack(np.meshgrid(*[np.arange(-k, k + 1) for k in reps], indexing="ij"), -1).reshape(-1, 3)
+    d = np.linalg.norm((offsets / shape) @ cell, axis=1)
+    keep = d <= reach
+    flat = np.ravel_multi_index(tuple((offsets[keep] % shape).T), tuple(shape))
+    out = np.full(int(np.prod(shape)), np.inf)
+    np.minimum.at(out, flat, d[keep])
+    return out.reshape(tuple(shape))
+
+
+def pore_size_distribution(cell, grid, dist, bin_width: float = PSD_BIN) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram (edges, volume fraction) of the diameter of the largest
+    sphere covering each void grid point. grid holds fractional grid
+    points (grid_points order) and dist their distance to the nearest atom
+    surface.
+
+    A point is covered by a sphere of radius >= r iff it lies within r of
+    a grid point with dist >= r, i.e. it is in the dilation of the mask
+    dist >= r by a ball of radius r. On the periodic grid that dilation is
+    a circular convolution with the ball (grid offsets whose shortest
+    periodic distance is <= r), done by FFT, so each bin costs a few
+    FFTs of the grid. Radii are swept from large to small; a bin with no
+    new centres (r <= dist < r_prev) covers nothing new and is skipped.
+    """
+    from scipy import fft
+
+    cell = np.asarray(cell, dtype=float)
+    void = dist > 0
+    if not void.any():
+        return np.array([0.0, bin_width]), np.zeros(1)
+
+    shape = tuple(len(np.unique(grid[:, k])) for k in range(3))
+    dist_grid = dist.reshape(shape)
+    edges = np.arange(0.0, 2 * dist.max() + bin_width, bin_width)
+    offsets = _offset_distances(cell, shape, 0.5 * edges[-2])
+    covering = np.zeros(shape)
+    uncovered = void.reshape(shape).copy()
+    upper = np.inf
+    for lower in edges[-2:0:-1]:
+        r = 0.5 * lower
+        new_centres = np.any((dist_grid >= r) & (dist_grid < upper))
+        upper = r
+        if not new_centres:
+            continue
+        reached = fft.irfftn(fft.rfftn(dist_grid >= r) * fft.rfftn(offsets <= r), s=shape) > 0.5
+        covered = reached & uncovered
+        covering[covered] = lower
+        uncovered &= ~covered
+        if not uncovered.any():
+            break
+    # Whatever is left is covered only by spheres smaller than the first bin
+
+    counts, _ = np.histogram(covering.reshape(-1)[void], bins=edges)
+    return edges, counts / len(dist)
+
+
+# =======================================
+# PERCOLATION
+# =======================================
+
+def _find(parent, offset, x):
+    """Root of x and the cell shift of x relative to it, compressing the path."""
+    path = []
+    while parent[x] != x:
+        path.append(x)
+        x = parent[x]
+    root, shift = x, (0, 0, 0)
+    for node in reversed(path):
+        shift = tuple(a + b for a, b in zip(offset[node], shift))
+        parent[node], offset[node] = root, shift
+    return root, offset[path[0]] if path else shift
+
+
+def percolating_axes(open_grid: np.ndarray) -> Tuple[bool, bool, bool]:
+    """
+    Whether some connected region of the periodic boolean grid (6-neighbour
+    connectivity) wraps onto its own image along a, b and c.
+
+    Components of the grid without periodic wrapping come from
+    scipy.ndimage.label; the crossings of each cell face join them in a
+    union-find that tracks the cell shift of every component relative to
+    its root. Joining two parts of one root with a non-zero net shift means
+    the region is infinite along the axes where that shift is non-zero.
+    """
+    from scipy import ndimage
+
+    labels, n = ndimage.label(open_grid)
+    if n == 0:
+        return False, False, False
+
+    parent = list(range(n + 1))
+    offset = [(0, 0, 0)] * (n + 1)
+    wraps = [False, False, False]
+    for axis in range(3):
+        last, first = np.take(labels, -1, axis=axis), np.take(labels, 0, axis=axis)
+        both = (last > 0) & (first > 0)
+        if not both.any():
+            continue
+        step = tuple(int(k == axis) for k in range(3))
+        # Label `first` one cell over along `axis` touches label `last`
+        for u, v in np.unique(np.stack([last[both], first[both]], axis=1), axis=0).tolist():
+            ru, su = _find(parent, offset, u)
+            rv, sv = _find(parent, offset, v)
+            shift = tuple(s - b + a for s, a, b in zip(step, su, sv))
+            if ru == rv:
+                for k in range(3):
+                    wraps[k] = wraps[k] or shift[k] != 0
+            else:
+                parent[rv], offset[rv] = ru, shift
+    return tuple(wraps)
+
+
+def pore_limiting_diameters(dist_grid: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Largest sphere diameter that percolates along a, b and c through the
+    periodic distance grid (grid shape), by bisection over the distinct
+    grid distances.
+    """
+    values = np.unique(dist_grid[dist_grid > 0])
+    checked: Dict[int, Tuple[bool, bool, bool]] = {}
+
+    def axes_at(i):
+        if i not in checked:
+            checked[i] = percolating_axes(dist_grid >= values[i])
+        return checked[i]
+
+    pld = []
+    for axis in range(3):
+        if len(values) == 0 or not axes_at(0)[axis]:
+            pld.append(0.0)
+            continue
+        lo, hi = 0, len(values) - 1     # percolates at values[lo]; find the largest such index
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if axes_at(mid)[axis]:
+                lo = mid
+            else:
+                hi = mid - 1
+        pld.append(float(2 * values[lo]))
+    return tuple(pld)
+
+
+def pore_sizes(cell, symbols, frac=None, positions=None, spacing: float = GRID_SPACING,
+               bin_width: float = PSD_BIN) -> PoreSizes:
+    """LCD, PLD along each axis and PSD of one structure."""
+    cell = np.asarray(cell, dtype=float)
+    if frac is None:
+        frac = np.linalg.solve(cell.T, np.asarray(positions, dtype=float).T).T
+    grid, dist = distance_grid(cell, symbols, frac, spacing)
+    edges, psd = pore_size_distribution(cell, grid, dist, bin_width)
+    return PoreSizes(
+        lcd=float(2 * max(dist.max(), 0.0)),
+        pld=pore_limiting_diameters(dist.reshape(grid_shape(cell, spacing))),
+        psd_edges=edges,
+        psd=psd,
+    )
+
+
+# =======================================
+# CACHE
+# =======================================
+
+def structure_key(cell, symbols, frac, spacing: float = GRID_SPACING, bin_width: float = PSD_BIN) -> str:
+    """Cache key: content hash of the structure plus the grid settings the result depends on."""
+    return f"{content_hash(cell, _symbols_to_numbers(symbols), frac)}|{spacing:g}|{bin_width:g}"
+
+
+class PoreSizeCache:
+    """
+    PoreSizes keyed by structure_key(). With a path, new entries are
+    appended there as JSON lines and loaded on the next start.
+    """
+
+    def __init__(self, path: Optional[str] = PORE_CACHE):
+        self.path = path
+        self.entries: Dict[str, PoreSizes] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = PoreSizes.from_dict(entry["pores"])
+                except (ValueError, KeyError):
+                    continue  # torn or foreign line
+
+    def get(self, key: str) -> Optional[PoreSizes]:
+        return self.entries.get(key)
+
+    def add(self, key: str, pores: PoreSizes):
+        self.entries[key] = pores
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "pores": pores.to_dict()}) + "\n")
+
+    def pore_sizes(self, cell, symbols, frac=None, positions=None, spacing: float = GRID_SPACING,
+                   bin_width: float = PSD_BIN) -> PoreSizes:
+        """pore_sizes() of a structure, reusing the cached result for the same content and settings."""
+        cell = np.asarray(cell, dtype=float)
+        if frac is None:
+            frac = np.linalg.solve(cell.T, np.asarray(positions, dtype=float).T).T
+        key = structure_key(cell, symbols, frac, spacing, bin_width)
+        if key not in self.entries:
+            self.add(key, pore_sizes(cell, symbols, frac, spacing=spacing, bin_width=bin_width))
+        return self.entries[key]
+
+
+# =======================================
+# MANY STRUCTURES
+# =======================================
+
+def _pore_sizes_job(args):
+    key, cell, symbols, frac, spacing, bin_width = args
+    try:
+        return key, pore_sizes(cell, symbols, frac, spacing=spacing, bin_width=bin_width), None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def pore_sizes_cifs(paths: List[str], workers: Optional[int] = None, cache: Optional[PoreSizeCache] = None,
+                    spacing: float = GRID_SPACING, bin_width: float = PSD_BIN) -> List[Dict[str, object]]:
+    """
+    PoreSizes.to_dict() rows (plus "path") for many CIFs, in the input order.
+    Structures already in the cache, or repeated in paths, are computed
+    once; the rest run in a process pool when workers > 1.
+    """
+    from cif_reader import read_cif
+
+    rows: List[Dict[str, object]] = [{"path": path} for path in paths]
+    jobs, keys = {}, []
+    for row in rows:
+        try:
+            cif = read_cif(row["path"])
+        except Exception as e:
+            row["error"] = str(e)
+            keys.append(None)
+            continue
+        key = structure_key(cif.cell, cif.symbols, cif.frac, spacing, bin_width)
+        keys.append(key)
+        if (cache is None or key not in cache) and key not in jobs:
+            jobs[key] = (key, cif.cell, cif.symbols, cif.frac, spacing, bin_width)
+
+    workers = workers or 1
+    if workers == 1 or len(jobs) <= 1:
+        done = [_pore_sizes_job(job) for job in jobs.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_pore_sizes_job, jobs.values(), chunksize=1))
+
+    computed, errors = {}, {}
+    for key, pores, error in done:
+        if pores is None:
+            errors[key] = error
+            continue
+        computed[key] = pores
+        if cache is not None:
+            cache.add(key, pores)
+
+    for row, key in zip(rows, keys):
+        if key is None:
+            continue
+        pores = computed.get(key) or (cache.get(key) if cache is not None else None)
+        if pores is None:
+            row["error"] = errors.get(key, "not computed")
+        else:
+            row.update(pores.to_dict())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pore size distribution, LCD and PLD of CIFs.")
+    parser.add_argument("cifs", nargs="+")
+    parser.add_argument("-o", "--output", help="CSV of LCD/PLD per structure (default: print to stdout).")
+    parser.add_argument("--psd", help="Also write the full results, histograms included, as JSON lines.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel worker processes.")
+    parser.add_argument("--spacing", type=float, default=GRID_SPACING, help="Distance-grid spacing (A).")
+    parser.add_argument("--bin", type=float, default=PSD_BIN, help="PSD bin width (A of diameter).")
+    parser.add_argument("--cache", default=PORE_CACHE, help="Result cache (JSON lines).")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache.")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    cache = None if args.no_cache else PoreSizeCache(args.cache)
+    rows = pore_sizes_cifs(args.cifs, workers=args.workers, cache=cache, spacing=args.spacing, bin_width=args.bin)
+    if args.psd:
+        with open(args.psd, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    df = pd.DataFrame(rows).drop(columns=["PSD_edges", "PSD"], errors="ignore")
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
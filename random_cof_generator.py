@@ -6,29 +6,55 @@ import sys
 
 import pycofbuilder as pcb
 
+from cof_validator import NameValidator
+from neighbors import check_clashes
+from rng_streams import candidate_rng
+from structure_export import export_framework, parse_target
 
-l2_list = ['BENZ', 'DBA1', 'TPTA', 'TRZN', 'DICZ', 'TPAM', 'TPOB', 'TBBZ', 'DBA2', 'TPNY', 'BRZN', 'TPTZ', 'BTTP', 'TPBZ', 'STAR', 'STAR1']
-t3_list = ['PHEN', 'BENZ', 'HDZN', 'PYEN', 'INFL', 'NAPT', 'PTCD', '4IDT', 'BBTZ', 'DPEL', 'TIDA', 'DHPI', 'DPBY', 'PYTO', 'TIEN', 'DFFE', 'ANTR', '2BPD', 'DHSI', '3BPD', 'INTO', 'TPNY', 'BDTP', 'PYRN', 'BPYB', 'NDTP', 'INDE', 'DPDA', 'BDFN', 'IITT', 'BTPH', 'DPEY', '3IDT', 'BPNY', 'TPDI', 'TTPH']
+
+# L2 = linear, T3 = triangular (building_blocks/L2.csv, T3.csv)
+l2_list = ['PHEN', 'BENZ', 'HDZN', 'PYEN', 'INFL', 'NAPT', 'PTCD', '4IDT', 'BBTZ', 'DPEL', 'TIDA', 'DHPI', 'DPBY', 'PYTO', 'TIEN', 'DFFE', 'ANTR', '2BPD', 'DHSI', '3BPD', 'INTO', 'TPNY', 'BDTP', 'PYRN', 'BPYB', 'NDTP', 'INDE', 'DPDA', 'BDFN', 'IITT', 'BTPH', 'DPEY', '3IDT', 'BPNY', 'TPDI', 'TTPH']
+t3_list = ['BENZ', 'DBA1', 'TPTA', 'TRZN', 'DICZ', 'TPAM', 'TPOB', 'TBBZ', 'DBA2', 'TPNY', 'BRZN', 'TPTZ', 'BTTP', 'TPBZ', 'STAR', 'STAR1']
 s4_list = ['PTCA', 'PHPR', 'PORP']
 h6_list = ['HPCO', 'HECO']
 q_list = ['COOH', 'NHOH', 'NHNH2', 'Cl', 'CONHNH2', 'Br', 'CHO', 'BOH2', 'COCHCHOH', 'NH2', 'O', 'CHCN']
 r_list = ['COOH', 'F', 'Cl', 'OCOCH3', 'Ph', 'Br', 'NO', 'SH', 'CH3', 'OEt', 'EEPO', 'CN', 'tBu', 'SO3H', 'CHS', 'I', 'NO2', 'CHO', 'H', 'EMEPO', 'DMPE', 'MEPO', 'OProp', 'OEEPO', 'EPO', 'NH2', 'SO2H', 'O', 'OMe', 'OH']
 
 
+# Offline name checks against building_blocks/*.csv (cheap, no pycofbuilder calls)
+validator = NameValidator()
+
+
 class COFGenerator:
-    def __init__(self, l2_cores, t3_cores, s4_cores, func_groups):
+    def __init__(self, l2_cores, t3_cores, s4_cores, func_groups, catalog=None):
         """
         l2_cores: list of strings (e.g., ['BENZ', 'BPY', 'TH'])
         t3_cores: list of strings (e.g., ['BENZ', 'TPB'])
         s4_cores: list of strings (e.g., ['PORPH', 'PYRENE'])
         func_groups: list of strings (e.g., ['H', 'OH', 'OMe', 'F', 'CH3'])
+        catalog: NameValidator with the building_blocks catalog (module default if None)
         """
-        self.cores = {
-            'L2': l2_cores,
-            'T3': t3_cores,
-            'S4': s4_cores,
+        self.catalog = catalog or validator
+
+        # Only keep cores / R-groups that exist in the building_blocks catalog
+        self.cores = {}
+        for sym, codes in (('L2', l2_cores), ('T3', t3_cores), ('S4', s4_cores)):
+            known = self.catalog.cores.get(sym, {})
+            self.cores[sym] = [c for c in codes if c in known]
+            dropped = [c for c in codes if c not in known]
+            if dropped:
+                print(f"Skipping {sym} cores not in building_blocks/{sym}.csv: {dropped}", file=sys.stderr)
+        self.func_groups = [f for f in func_groups if f in self.catalog.func_groups]
+        dropped = [f for f in func_groups if f not in self.catalog.func_groups]
+        if dropped:
+            print(f"Skipping R-groups not in building_blocks/functional_groups.csv: {dropped}", file=sys.stderr)
+
+        # Distinct R sites per core: each name gets one R token per site
+        self.r_sites = {
+            (sym, core): self.catalog.r_site_count(sym, core)
+            for sym, codes in self.cores.items()
+            for core in codes
         }
-        self.func_groups = func_groups
 
         # Define valid connector pairs to ensure chemistry works (Imine, Boroxine, etc.)
         # Format: (Connector_A, Connector_B)
@@ -38,7 +64,10 @@ class COFGenerator:
             ('BOH2', 'BOH2'), # Boronic acid self-condensation (Boroxine)
         ]
 
-    def generate_candidate(self, topology=None):
+    def generate_candidate(self, topology=None, rng=None):
+        """rng: random.Random to draw from (default: the global random module)."""
+        rng = rng or random
+
         # 1. Topology & Symmetry Rules
         # Define which symmetries form which topology
         # ['HCB', 'HCB_A', 'SQL', 'SQL_A', 'KGD', 'HXL_A', 'FXT', 'FXT_A', 'DIA', 'DIA_A', 'BOR', 'LON', 'LON_A']
@@ -51,30 +80,30 @@ class COFGenerator:
         if topology and topology in topo_rules:
             selected_topo = topology
         else:
-            selected_topo = random.choice(list(topo_rules.keys()))
+            selected_topo = rng.choice(list(topo_rules.keys()))
 
         sym_a, sym_b = topo_rules[selected_topo]
 
         # 2. Select Cores (The "Blocks")
-        core_a = random.choice(self.cores[sym_a])
-        core_b = random.choice(self.cores[sym_b])
+        core_a = rng.choice(self.cores[sym_a])
+        core_b = rng.choice(self.cores[sym_b])
 
         # 3. Select Chemistry (Connectors)
-        conn_a, conn_b = random.choice(self.valid_linkages)
+        conn_a, conn_b = rng.choice(self.valid_linkages)
 
-        # 4. Select Functional Groups (Randomized for each node)
-        func_a = random.choice(self.func_groups)
-        func_b = random.choice(self.func_groups)
+        # 4. Select Functional Groups (Randomized for each R site of each node)
+        funcs_a = [rng.choice(self.func_groups) for _ in range(self.r_sites[(sym_a, core_a)])]
+        funcs_b = [rng.choice(self.func_groups) for _ in range(self.r_sites[(sym_b, core_b)])]
 
         # 5. Fixed Defaults for this builder style
         net = "A"
         stacking = "AA" 
 
         # 6. Construct the "AI Handoff" String
-        # Format: {Sym}_{Core}_{Conn}_{Func}-{Sym}_{Core}_{Conn}_{Func}-{Top}_{Net}-{Stack}
+        # Format: {Sym}_{Core}_{Conn}_{R1..Rn}-{Sym}_{Core}_{Conn}_{R1..Rn}-{Top}_{Net}-{Stack}
         
-        block_A_str = f"{sym_a}_{core_a}_{conn_a}_{func_a}"
-        block_B_str = f"{sym_b}_{core_b}_{conn_b}_{func_b}"
+        block_A_str = "_".join([sym_a, core_a, conn_a] + funcs_a)
+        block_B_str = "_".join([sym_b, core_b, conn_b] + funcs_b)
         structure_str = f"{selected_topo}_{net}-{stacking}"
         
         cof_string = f"{block_A_str}-{block_B_str}-{structure_str}"
@@ -89,28 +118,41 @@ def _log(message, verbose=True):
         print(message)
 
 
-def build_from_string(cof_string, output_dir="generated_cofs", supercell=None, verbose=True):
+def build_from_string(cof_string, output_dir="generated_cofs", supercell=None, verbose=True, exports=None,
+                      screen=True):
     """
     Takes the generated string and runs the pycofbuilder assembly.
     Returns a dict describing the result so callers can consume it programmatically.
+    exports: extra (format, supercell) outputs written from the same build,
+    e.g. ["cif:2x2x1", "poscar"]; their paths are listed in result["paths"].
+    screen: reject builds with clashing atoms (neighbors.check_clashes) before writing.
     """
     _log(f"\n--- PROCESSING: {cof_string} ---", verbose)
 
+    valid, reason = validator.validate(cof_string)
+    if not valid:
+        _log(f"   -> ❌ Invalid name: {reason}", verbose)
+        return {"ok": False, "error": f"Invalid COF name: {reason}", "cof_string": cof_string}
+
     try:
         cof = pcb.Framework(cof_string)
         _log("   -> Object created successfully.", verbose)
+        if screen:
+            check_clashes(cof.cellMatrix, cof.atom_types, positions=cof.atom_pos)
 
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
 
         cell = supercell if supercell else [1, 1, 1]
-        cof.save(fmt="cif", supercell=cell, save_dir=output_dir)
+        targets = [("cif", cell)] + [parse_target(t) for t in exports or []]
+        paths = export_framework(cof, targets, output_dir, name=cof_string)
 
-        filename = f"{cof_string}.cif"
-        saved_path = os.path.join(output_dir, filename)
+        saved_path = paths[0]
+        filename = os.path.basename(saved_path)
         _log(f"   -> ✅ Success! Saved to {saved_path}", verbose)
 
-        return {"ok": True, "path": saved_path, "filename": filename, "cof_string": cof_string, "supercell": cell}
+        return {"ok": True, "path": saved_path, "filename": filename, "cof_string": cof_string, "supercell": cell,
+                "paths": paths}
     except Exception as e:
         _log(f"   -> ❌ Error: {e}", verbose)
         return {"ok": False, "error": str(e), "cof_string": cof_string}
@@ -118,20 +160,25 @@ def build_from_string(cof_string, output_dir="generated_cofs", supercell=None, v
 
 FALLBACK_STRINGS = [
     # Known-good combos to guarantee success if random picks fail repeatedly
-    "S4_PORP_CHO_I_H-L2_BDTP_NH2_CN_H_H_H_H-SQL_A-AA",
+    "S4_PORP_CHO_I_H-L2_BDTP_NH2_CN_H-SQL_A-AA",
     "S4_PHPR_CHO_SO2H_H_H_H_H_H-L2_BPYB_NH2_NH2_H_H_H_H_H-SQL_A-AA",
     "T3_BRZN_CHO_OH-L2_DPDA_NH2_I_H_H_H-HCB_A-AA",
 ]
 
 
-def generate_and_save(topology=None, supercell=None, output_dir="generated_cofs", verbose=True, max_attempts=20):
+def generate_and_save(topology=None, supercell=None, output_dir="generated_cofs", verbose=True, max_attempts=20,
+                      seed=None, start_index=0, exports=None):
     """
     Generates and saves a COF. Retries quietly if a candidate fails to build.
+    With a seed, attempt i draws from candidate_rng(seed, start_index + i),
+    so the same seed and index always give the same candidate.
     """
     last_result = None
-    for _ in range(max_attempts):
-        cof_string = generator.generate_candidate(topology=topology)
-        result = build_from_string(cof_string, output_dir=output_dir, supercell=supercell, verbose=verbose)
+    for i in range(max_attempts):
+        rng = candidate_rng(seed, start_index + i) if seed is not None else None
+        cof_string = generator.generate_candidate(topology=topology, rng=rng)
+        result = build_from_string(cof_string, output_dir=output_dir, supercell=supercell, verbose=verbose,
+                                   exports=exports)
         result["cof_string"] = cof_string
         if result.get("ok"):
             return result
@@ -139,7 +186,8 @@ def generate_and_save(topology=None, supercell=None, output_dir="generated_cofs"
 
     # Try deterministic fallback strings before giving up
     for fallback in FALLBACK_STRINGS:
-        result = build_from_string(fallback, output_dir=output_dir, supercell=supercell, verbose=verbose)
+        result = build_from_string(fallback, output_dir=output_dir, supercell=supercell, verbose=verbose,
+                                   exports=exports)
         result["cof_string"] = fallback
         if result.get("ok"):
             return result
@@ -156,7 +204,16 @@ def main():
     parser.add_argument("--json", action="store_true", help="Emit a JSON payload for programmatic callers.")
     parser.add_argument("--quiet", action="store_true", help="Suppress verbose logging (implied when --json is set).")
     parser.add_argument("--max-attempts", type=int, default=20, help="Retry count if a generated string fails to build.")
+    parser.add_argument("--seed", type=int, help="Root seed for reproducible candidates.")
+    parser.add_argument("--index", type=int, default=0, help="Candidate index of the first attempt (with --seed).")
+    parser.add_argument("--export", action="append", default=[], metavar="FMT[:AxBxC]",
+                        help="Extra output from the same build, e.g. cif:2x2x1, xyz or poscar (repeatable).")
     args = parser.parse_args()
+    try:
+        for spec in args.export:
+            parse_target(spec)
+    except ValueError as e:
+        parser.error(f"--export: {e}")
 
     verbose = not args.quiet and not args.json
     cell = [args.supercell, args.supercell, args.supercell]
@@ -167,6 +224,9 @@ def main():
         output_dir=args.output_dir,
         verbose=verbose,
         max_attempts=max(1, args.max_attempts),
+        seed=args.seed,
+        start_index=args.index,
+        exports=args.export,
     )
 
     if args.json:
@@ -2,7 +2,12 @@ import argparse
 import json
 import os
 import random
+import socket
+import stat
 import sys
+import time
+
+import numpy as np
 
 # Wrap import in try/except to handle environment issues gracefully
 try:
@@ -11,28 +16,75 @@ except ImportError:
     print("Error: pycofbuilder not found. Please install it via 'pip install pycofbuilder'")
     sys.exit(1)
 
+from adaptive_sampler import SAMPLER_STATS, AdaptiveSampler
+from cof_validator import NameValidator
+from descriptors import describe
+from failure_cache import FailureCache
+from fingerprint import FingerprintIndex, file_stamp, fingerprint
+from neighbors import check_clashes
+from pore_size import PoreSizeCache
+from rng_streams import candidate_rng
+from stage_timer import StageTimer, format_summary, summarize
+from structure_export import export_framework, parse_target
+from structure_store import StructureStore
+
+# --- LOGGING ---
+
+def _log(message, verbose=True):
+    if verbose:
+        print(message, file=sys.stderr)
+
 # --- CONFIGURATION ---
 
 # Ensure these codes exist in your pycofbuilder library 'data' folder
 # I have removed potentially problematic codes or duplicates
-L2_CORES = ['BENZ', 'TPTA', 'TRZN', 'DICZ', 'TPAM', 'TPOB', 'DBA1', 'TPNY', 'BRZN', 'TPTZ', 'BTTP', 'TPBZ']
-T3_CORES = ['BENZ', 'TPB', 'TRZN', 'HBC', 'PYRE', 'TRUX', 'TPA', 'BTP', 'DTP', 'HAT'] 
-S4_CORES = ['PORP', 'PYRE', 'PHPR']
+# (codes per symmetry as listed in building_blocks/{L2,T3,S4,H6}.csv)
+L2_CORES = ['BENZ', 'NAPT', 'ANTR', 'PYRN', 'BPNY', 'TPNY', 'DPEY', 'DPEL', 'BPYB', 'BTPH', 'TTPH', 'BDTP']
+T3_CORES = ['BENZ', 'TPTA', 'TRZN', 'DICZ', 'TPAM', 'TPOB', 'DBA1', 'TPNY', 'BRZN', 'TPTZ', 'BTTP', 'TPBZ']
+S4_CORES = ['PORP', 'PHPR', 'PTCA']
 H6_CORES = ['HPCO', 'HECO']
 
 # Functional groups (R-groups)
 # Note: 'H' is most likely to succeed. Bulky groups like 'tBu' often fail generation.
 FUNC_GROUPS = ['H', 'OH', 'OMe', 'F', 'Cl', 'Br', 'CH3', 'CN', 'COOH', 'NO2', 'tBu', 'Ph']
 
+# Offline name checks against building_blocks/*.csv (cheap, no pycofbuilder calls)
+validator = NameValidator()
+
 class COFGenerator:
-    def __init__(self):
-        self.cores = {
+    def __init__(self, catalog=None, sampler=None):
+        self.catalog = catalog or validator
+        # Picks topology / cores / linkage / R-groups; uniform unless an
+        # AdaptiveSampler that learns from build outcomes is passed in
+        self.sampler = sampler or AdaptiveSampler(path=None, strategy="uniform")
+        self.last_choices = {}
+
+        # Keep only cores/R-groups the building_blocks catalog knows, so every
+        # candidate name is at least syntactically valid
+        configured = {
             'L2': L2_CORES,
             'T3': T3_CORES,
             'S4': S4_CORES,
             'H6': H6_CORES
         }
-        self.func_groups = FUNC_GROUPS
+        self.cores = {}
+        for sym, codes in configured.items():
+            known = self.catalog.cores.get(sym, {})
+            self.cores[sym] = [c for c in codes if c in known]
+            dropped = [c for c in codes if c not in known]
+            if dropped:
+                _log(f"Skipping {sym} cores not in building_blocks/{sym}.csv: {dropped}")
+        self.func_groups = [f for f in FUNC_GROUPS if f in self.catalog.func_groups]
+        dropped = [f for f in FUNC_GROUPS if f not in self.catalog.func_groups]
+        if dropped:
+            _log(f"Skipping R-groups not in building_blocks/functional_groups.csv: {dropped}")
+
+        # Distinct R sites per core: a name needs one R token per site
+        self.r_sites = {
+            (sym, core): self.catalog.r_site_count(sym, core)
+            for sym, codes in self.cores.items()
+            for core in codes
+        }
 
         # (Connector_A, Connector_B) pairs
         self.valid_linkages = [
@@ -49,82 +101,141 @@ class COFGenerator:
         self.topo_rules = {
             'HCB': ('T3', 'L2'), # Honeycomb (Hexagonal)
             'SQL': ('S4', 'L2'), # Square Lattice
-            'KGD': ('T3', 'L2'), # Kagome (Dual Honeycomb)
+            'KGD': ('H6', 'T3'), # Kagome (Dual Honeycomb)
             'HXL': ('H6', 'L2'), # Hexagonal Lattice (6-connected)
         }
 
-    def generate_candidate(self, topology=None):
+        # pyCOFBuilder net for each topology ("_A" nets put the L2 block on the edges)
+        self.nets = {
+            'HCB': 'HCB_A',
+            'SQL': 'SQL_A',
+            'KGD': 'KGD',
+            'HXL': 'HXL_A',
+        }
+
+        # Topologies we can actually fill with cores from the catalog
+        self.available_topologies = [
+            topo for topo, (sym_a, sym_b) in self.topo_rules.items()
+            if self.cores[sym_a] and self.cores[sym_b]
+        ]
+
+    def generate_candidate(self, topology=None, rng=None):
+        """rng: random.Random to draw from (default: the global random module)."""
+        rng = rng or random
+
         # 1. Select Topology
         if topology:
             if topology not in self.topo_rules:
                 raise ValueError(f"Topology {topology} not defined in rules.")
+            if topology not in self.available_topologies:
+                raise ValueError(f"No catalog cores available for topology {topology}.")
             selected_topo = topology
         else:
-            selected_topo = random.choice(list(self.topo_rules.keys()))
+            selected_topo = self.sampler.choose('topology', self.available_topologies, rng)
 
         sym_a, sym_b = self.topo_rules[selected_topo]
 
         # 2. Select Cores
-        core_a = random.choice(self.cores[sym_a])
-        core_b = random.choice(self.cores[sym_b])
+        core_a = self.sampler.choose(f'core:{sym_a}', self.cores[sym_a], rng)
+        core_b = self.sampler.choose(f'core:{sym_b}', self.cores[sym_b], rng)
 
         # 3. Select Chemistry (Connectors)
-        conn_a, conn_b = random.choice(self.valid_linkages)
+        conn_a, conn_b = self.sampler.choose('linkage', self.valid_linkages, rng)
 
-        # 4. Select Functional Groups
-        # weighted random choice: Give 'H' a higher probability to ensure geometric success
-        # This helps avoid failing 20 times in a row due to steric clashes
-        func_a = self._pick_func_group()
-        func_b = self._pick_func_group()
+        # 4. Select Functional Groups, one per distinct R site of each core
+        funcs_a = [self._pick_func_group(rng) for _ in range(self.r_sites[(sym_a, core_a)])]
+        funcs_b = [self._pick_func_group(rng) for _ in range(self.r_sites[(sym_b, core_b)])]
 
         # 5. Defaults
-        net = "A" 
         stacking = "AA" # Eclipsed is standard for 2D COFs
 
-        # 6. Format: {Sym}_{Core}_{Conn}_{Func}
-        block_A_str = f"{sym_a}_{core_a}_{conn_a}_{func_a}"
-        block_B_str = f"{sym_b}_{core_b}_{conn_b}_{func_b}"
+        # 6. Format: {Sym}_{Core}_{Conn}_{R1}_..._{Rn}
+        block_A_str = "_".join([sym_a, core_a, conn_a] + funcs_a)
+        block_B_str = "_".join([sym_b, core_b, conn_b] + funcs_b)
         
         # PyCOFBuilder structure string
-        # Format: BlockA-BlockB-Topology_Net-Stacking
-        cof_string = f"{block_A_str}-{block_B_str}-{selected_topo}_{net}-{stacking}"
+        # Format: BlockA-BlockB-Net-Stacking
+        cof_string = f"{block_A_str}-{block_B_str}-{self.nets[selected_topo]}-{stacking}"
+
+        # Remember what went into this candidate so record_outcome() can credit it
+        self.last_choices = {
+            'topology': [selected_topo],
+            'linkage': [(conn_a, conn_b)],
+            'rgroup': funcs_a + funcs_b,
+        }
+        self.last_choices.setdefault(f'core:{sym_a}', []).append(core_a)
+        self.last_choices.setdefault(f'core:{sym_b}', []).append(core_b)
 
         return cof_string
 
-    def _pick_func_group(self):
-        """Pick a functional group, favoring Hydrogen (H) for stability."""
-        if random.random() < 0.3:
-            return 'H'
-        return random.choice(self.func_groups)
+    def _pick_func_group(self, rng=random):
+        """Pick a functional group; the sampler learns which ones build reliably."""
+        return self.sampler.choose('rgroup', self.func_groups, rng)
 
-# --- LOGGING & BUILDER ---
+    def record_outcome(self, success):
+        """Feed the build result of the last candidate back into the sampler."""
+        if self.last_choices:
+            self.sampler.update(self.last_choices, success)
 
-def _log(message, verbose=True):
-    if verbose:
-        print(message, file=sys.stderr)
+# --- BUILDER ---
 
-def build_from_string(cof_string, output_dir, supercell, verbose=True):
+def build_from_string(cof_string, output_dir, supercell, verbose=True, timer=None, exports=None, compress=False,
+                      store=None, fingerprints=None, screen=True, descriptors=False, pores=None, bonds=True):
+    """
+    Build one COF and write it as a CIF at `supercell`, plus any extra
+    (format, supercell) `exports` (e.g. ["cif:2x2x1", "vasp"]) from the same
+    build. result["path"] is the main CIF, result["paths"] every file. A
+    1x1x1 main CIF is saved by pyCOFBuilder with its bond table unless
+    bonds=False; larger supercells and the extra exports are streamed to
+    disk in bounded memory. compress=True gzips every file.
+    With a StructureStore, the unit cell is also appended to it
+    (result["store_row"]). With a FingerprintIndex, result["duplicate_of"] is
+    the closest near-duplicate already indexed (or None), and the new CIF is
+    indexed. With screen=True, builds with clashing atoms (neighbors.check_clashes)
+    fail before anything is written. With descriptors=True, result["descriptors"]
+    holds density, void fractions and surface area (descriptors.describe).
+    With a PoreSizeCache, result["pores"] holds LCD, PLD and the pore size
+    distribution (pore_size.pore_sizes).
+    """
     _log(f"Attempting: {cof_string}", verbose)
+    timer = timer or StageTimer()
+
+    with timer.stage("validate"):
+        valid, reason = validator.validate(cof_string)
+    if not valid:
+        return {"ok": False, "error": f"Invalid COF name: {reason}"}
+
     try:
-        cof = pcb.Framework(cof_string)
-        
+        with timer.stage("framework"):
+            cof = pcb.Framework(cof_string)
+        if screen:
+            with timer.stage("screen"):
+                check_clashes(cof.cellMatrix, cof.atom_types, positions=cof.atom_pos)
+
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
 
-        # Generating the CIF
-        cof.save(fmt="cif", supercell=supercell, save_dir=output_dir)
-        
-        filename = f"{cof.name}.cif" # Use internal name property if available, else construct it
-        saved_path = os.path.join(output_dir, filename)
-        
-        # Double check file creation (sometimes pcb fails silently)
-        if not os.path.exists(saved_path):
-             # Try constructing filename manually if cof.name varies
-             filename = f"{cof_string}.cif"
-             saved_path = os.path.join(output_dir, filename)
+        # Main CIF first, then the extra exports, all from this one build
+        targets = [("cif", supercell)] + [parse_target(t) for t in exports or []]
+        paths = export_framework(cof, targets, output_dir, timer=timer, compress=compress, bonds=bonds)
+        saved_path = paths[0]
 
         if os.path.exists(saved_path):
-             return {"ok": True, "path": saved_path, "filename": filename}
+             result = {"ok": True, "path": saved_path, "filename": os.path.basename(saved_path), "paths": paths}
+             if fingerprints is not None:
+                 frac = np.linalg.solve(np.asarray(cof.cellMatrix).T, np.asarray(cof.atom_pos).T).T
+                 fp = fingerprint(cof.cellMatrix, cof.atom_types, frac)
+                 result["duplicate_of"] = fingerprints.duplicate_of(fp, exclude=saved_path)
+                 fingerprints.add(saved_path, fp, stamp=file_stamp(saved_path))
+             if descriptors:
+                 with timer.stage("describe"):
+                     result["descriptors"] = describe(cof.cellMatrix, cof.atom_types, positions=cof.atom_pos)
+             if pores is not None:
+                 with timer.stage("pores"):
+                     result["pores"] = pores.pore_sizes(cof.cellMatrix, cof.atom_types, positions=cof.atom_pos).to_dict()
+             if store is not None:
+                 result["store_row"] = store.append_cartesian(cof_string, cof.cellMatrix, cof.atom_types, cof.atom_pos)
+             return result
         else:
              return {"ok": False, "error": "File not written to disk"}
 
@@ -132,6 +243,263 @@ def build_from_string(cof_string, output_dir, supercell, verbose=True):
         # Common errors: "Atoms too close", "Core not found"
         return {"ok": False, "error": str(e)}
 
+# Redraws allowed per attempt when the candidate is a known failure
+MAX_RESAMPLES = 1000
+
+def generate_with_retries(generator, topology, output_dir, supercell, max_attempts, verbose=True, failure_cache=None,
+                          seed=None, start_index=0, exports=None, compress=False, store=None, fingerprints=None,
+                          screen=True, descriptors=False, pores=None, bonds=True):
+    """
+    Sample and build candidates until one succeeds or max_attempts is reached.
+    With a FailureCache, known-bad combinations are redrawn without a build
+    and new deterministic failures are recorded for later runs; if
+    MAX_RESAMPLES draws in a row are all known-bad, it stops with a
+    "No viable candidate" error instead of building one of them.
+    With a seed, attempt i draws from candidate_rng(seed, start_index + i), so
+    a (seed, index) pair always names the same candidate (given the same
+    sampler statistics; use --sampler uniform for fully fixed streams).
+    Per-stage timings (seconds) of the returned attempt are in result["timings"],
+    those of every attempt in result["attempt_timings"].
+    """
+    result = {"ok": False, "error": "Max attempts reached"}
+    skipped = 0
+    attempt_timings = []
+    exports = [parse_target(t) for t in exports or []]  # reject bad specs before building
+
+    for i in range(max_attempts):
+        timer = StageTimer()
+        rng = candidate_rng(seed, start_index + i) if seed is not None else None
+        with timer.stage("sample"):
+            for _ in range(MAX_RESAMPLES):
+                candidate_str = generator.generate_candidate(topology=topology, rng=rng)
+                if failure_cache is None or not failure_cache.is_known_bad(candidate_str):
+                    break
+                skipped += 1
+            else:
+                candidate_str = None
+
+        if candidate_str is None:
+            # Every redraw was a known failure: the design space looks exhausted, nothing to build
+            attempt_timings.append(timer.as_record())
+            result = {"ok": False, "cof_string": None, "index": start_index + i, "attempts": i + 1,
+                      "skipped_known_bad": skipped, "timings": attempt_timings[-1],
+                      "attempt_timings": attempt_timings,
+                      "error": f"No viable candidate: {MAX_RESAMPLES} draws in a row were known failures"}
+            _log(f"   [Attempt {i+1} Failed]: {result['error']}", verbose)
+            break
+
+        result = build_from_string(candidate_str, output_dir, supercell, verbose, timer=timer, exports=exports,
+                                   compress=compress, store=store, fingerprints=fingerprints, screen=screen,
+                                   descriptors=descriptors, pores=pores, bonds=bonds)
+        attempt_timings.append(timer.as_record())
+        result["cof_string"] = candidate_str
+        result["index"] = start_index + i
+        result["attempts"] = i + 1
+        result["skipped_known_bad"] = skipped
+        result["timings"] = attempt_timings[-1]
+        result["attempt_timings"] = attempt_timings
+        generator.record_outcome(result["ok"])
+
+        if result["ok"]:
+            break
+        else:
+            _log(f"   [Attempt {i+1} Failed]: {result.get('error')}", verbose)
+            if failure_cache is not None:
+                failure_cache.record(candidate_str, result.get("error"))
+
+    generator.sampler.save()
+    return result
+
+# --- SERVICE MODE ---
+# One resident process keeps pycofbuilder imported and the generator warm, so
+# the web backend pays only for the build itself. Requests and responses are
+# single-line JSON objects:
+#   -> {"id": 1, "cmd": "generate", "topology": "SQL", "supercell": 1, "seed": 7, "index": 0,
+#       "exports": ["cif:2x2x1", "xyz"], "gzip": false, "bonds": true, "descriptors": true}
+#   <- {"id": 1, "ok": true, "path": "...", "cof_string": "...", ...}
+#   -> {"cmd": "health"}    <- {"ok": true, "event": "health", "stage_timings": {...}, ...}
+#   -> {"cmd": "shutdown"}  <- {"ok": true, "event": "bye"}
+# A {"event": "ready"} line is emitted once the generator is initialised.
+# A request's "output_dir" is resolved inside the service's --output-dir;
+# paths that lead outside it are rejected.
+# With --store, every successful build is also appended to that store; this
+# process is its only writer, so requests cannot choose a different one.
+# With --dedupe, responses carry "duplicate_of" (see fingerprint.py).
+
+def _status(state):
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - state["started_at"], 3),
+        "requests_served": state["served"],
+    }
+
+# Build attempts kept for the p50/p95/p99 stage timings in health replies
+TIMING_WINDOW = 1000
+
+class ConnectionClosed(OSError):
+    """The client went away while a response was being written."""
+
+def _request_output_dir(request, defaults):
+    """The request's output_dir, resolved under the service's output directory."""
+    if request.get("output_dir") is None:
+        return defaults["output_dir"]
+    root = os.path.realpath(defaults["output_dir"])
+    path = os.path.realpath(os.path.join(root, str(request["output_dir"])))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"output_dir must stay inside {defaults['output_dir']}")
+    return path
+
+def handle_request(generator, request, defaults, failure_cache=None):
+    """Run one service request and return the response dict."""
+    cmd = request.get("cmd", "generate")
+
+    if cmd == "generate":
+        supercell = request.get("supercell", defaults["supercell"])
+        if isinstance(supercell, int):
+            supercell = [supercell, supercell, supercell]
+        return generate_with_retries(
+            generator,
+            topology=request.get("topology", defaults["topology"]),
+            output_dir=_request_output_dir(request, defaults),
+            supercell=list(supercell),
+            max_attempts=int(request.get("max_attempts", defaults["max_attempts"])),
+            verbose=defaults["verbose"],
+            failure_cache=failure_cache,
+            seed=request.get("seed", defaults["seed"]),
+            start_index=int(request.get("index", 0)),
+            exports=request.get("exports", defaults["exports"]),
+            compress=bool(request.get("gzip", defaults["gzip"])),
+            store=defaults["store"],
+            fingerprints=defaults["fingerprints"],
+            screen=defaults["screen"],
+            descriptors=bool(request.get("descriptors", defaults["descriptors"])),
+            pores=defaults["pores"],
+            bonds=bool(request.get("bonds", defaults["bonds"])),
+        )
+    if cmd in ("health", "ping"):
+        return {"ok": True, "event": "health", "ready": True}
+    if cmd == "shutdown":
+        return {"ok": True, "event": "bye"}
+    return {"ok": False, "error": f"Unknown cmd: {cmd}"}
+
+def _serve_lines(generator, defaults, lines, send, state, failure_cache=None):
+    """Answer JSON-lines requests from an iterable until EOF or shutdown. Returns True on shutdown."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            send({"ok": False, "error": f"Bad request: {e}"})
+            continue
+
+        state["served"] += 1
+        try:
+            response = handle_request(generator, request, defaults, failure_cache)
+            state["timings"].extend(response.get("attempt_timings", []))
+            del state["timings"][:-TIMING_WINDOW]
+            if response.get("event") == "health":
+                response.update(_status(state))
+                response["stage_timings"] = summarize(state["timings"])
+            if "id" in request:
+                response["id"] = request["id"]
+            # json.dumps fails before anything is written, so the error reply is still a clean line
+            send(response)
+        except ConnectionClosed:
+            raise  # nothing more can be sent on this connection
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+            if "id" in request:
+                response["id"] = request["id"]
+            send(response)
+
+        if response.get("event") == "bye":
+            return True
+    return False
+
+def _remove_stale_socket(socket_path):
+    """
+    Clear the way for bind(): remove a socket left behind by a service that
+    is gone. Anything else at that path, or a socket someone still listens
+    on, raises FileExistsError.
+    """
+    if not os.path.lexists(socket_path):
+        return
+    if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"Another service is listening on {socket_path}")
+
+def serve(generator, defaults, socket_path=None, failure_cache=None):
+    """
+    Resident service loop over stdin/stdout, or over a local UNIX socket when
+    socket_path is given. Connections on the socket are handled one at a time
+    because pycofbuilder is not thread-safe; a client that disconnects
+    mid-request only loses its own connection.
+    """
+    state = {"started_at": time.time(), "served": 0, "timings": []}
+    out = sys.stdout
+    # pycofbuilder prints to stdout while building; keep the protocol channel clean
+    sys.stdout = sys.stderr
+
+    def send_to(stream):
+        def send(payload):
+            line = json.dumps(payload) + "\n"
+            try:
+                stream.write(line)
+                stream.flush()
+            except OSError as e:
+                raise ConnectionClosed(str(e)) from e
+        return send
+
+    def ready(**extra):
+        return {"event": "ready", "ok": True, **_status(state), **extra}
+
+    if socket_path is None:
+        try:
+            send_to(out)(ready())
+            _serve_lines(generator, defaults, sys.stdin, send_to(out), state, failure_cache)
+        except ConnectionClosed:
+            pass  # the reader of stdout is gone
+        return
+
+    _remove_stale_socket(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    bound = os.stat(socket_path)
+
+    try:
+        server.listen()
+        send_to(out)(ready(socket=socket_path))
+        while True:
+            conn, _ = server.accept()
+            try:
+                with conn, conn.makefile("rw", encoding="utf-8") as stream:
+                    send_to(stream)(ready(socket=socket_path))
+                    if _serve_lines(generator, defaults, stream, send_to(stream), state, failure_cache):
+                        break
+            except OSError as e:
+                # Client disconnected mid-request: drop this connection, keep serving
+                _log(f"Connection lost: {e}", defaults.get("verbose", True))
+    finally:
+        server.close()
+        # Remove the socket only if it is still ours (not replaced by another service)
+        try:
+            if os.path.samestat(os.stat(socket_path), bound):
+                os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--topology", help="Force topology (HCB, SQL, KGD, HXL)")
@@ -140,34 +508,97 @@ def main():
     parser.add_argument("--json", action="store_true")
     parser.add_argument("--quiet", action="store_true", help="Suppress verbose logging (implied when --json is set).")
     parser.add_argument("--max-attempts", type=int, default=20)
+    parser.add_argument("--serve", action="store_true", help="Run as a resident JSON-lines service on stdin/stdout.")
+    parser.add_argument("--socket", help="With --serve, listen on this UNIX socket path instead of stdin/stdout.")
+    parser.add_argument("--no-failure-cache", action="store_true", help="Do not skip or record known-bad combinations.")
+    parser.add_argument("--sampler", choices=["thompson", "ucb", "uniform"], default="thompson",
+                        help="How to pick ingredients: bandit strategies learn from build outcomes.")
+    parser.add_argument("--exploration", type=float, default=1.0, help="Bandit exploration scale (>1 explores more).")
+    parser.add_argument("--epsilon", type=float, default=0.05, help="Probability of a uniform random pick.")
+    parser.add_argument("--sampler-stats", default=SAMPLER_STATS, help="JSON file persisting sampler statistics.")
+    parser.add_argument("--seed", type=int, help="Root seed for reproducible candidates.")
+    parser.add_argument("--index", type=int, default=0, help="Candidate index of the first attempt (with --seed).")
+    parser.add_argument("--export", action="append", default=[], metavar="FMT[:AxBxC]",
+                        help="Extra output from the same build, e.g. cif:2x2x1, xyz or poscar (repeatable).")
+    parser.add_argument("--gzip", action="store_true", help="Write gzip-compressed files (*.cif.gz, ...).")
+    parser.add_argument("--no-bonds", action="store_true",
+                        help="Stream the main CIF without pyCOFBuilder's bond table (faster; always so for supercells > 1).")
+    parser.add_argument("--store", help="Also append built structures to this structure store directory.")
+    parser.add_argument("--no-clash-screen", action="store_true",
+                        help="Skip the periodic atom-clash check before writing a build.")
+    parser.add_argument("--descriptors", action="store_true",
+                        help="Also compute density, void fraction and surface area of the built structure.")
+    parser.add_argument("--pores", action="store_true",
+                        help="Also compute LCD, PLD and pore size distribution (cached in .cof_cache/pore_sizes.jsonl).")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Flag near-duplicates of structures in the fingerprint index (.cof_cache/fingerprints.jsonl).")
     args = parser.parse_args()
+    try:
+        for spec in args.export:
+            parse_target(spec)
+    except ValueError as e:
+        parser.error(f"--export: {e}")
 
-    generator = COFGenerator()
+    sampler = AdaptiveSampler(
+        path=args.sampler_stats,
+        strategy=args.sampler,
+        exploration=args.exploration,
+        epsilon=args.epsilon,
+    )
+    generator = COFGenerator(sampler=sampler)
+    failure_cache = None if args.no_failure_cache else FailureCache()
     cell = [args.supercell, args.supercell, args.supercell]
+    store = StructureStore(args.store, mode="a") if args.store else None
+    fingerprints = FingerprintIndex() if args.dedupe else None
+    pores = PoreSizeCache() if args.pores else None
     
     #verbose = not args.json
     verbose = True
+
+    if args.serve:
+        defaults = {
+            "topology": args.topology,
+            "supercell": cell,
+            "output_dir": args.output_dir,
+            "max_attempts": args.max_attempts,
+            "verbose": not args.quiet,
+            "seed": args.seed,
+            "exports": args.export,
+            "gzip": args.gzip,
+            "store": store,
+            "fingerprints": fingerprints,
+            "screen": not args.no_clash_screen,
+            "descriptors": args.descriptors,
+            "pores": pores,
+            "bonds": not args.no_bonds,
+        }
+        try:
+            serve(generator, defaults, socket_path=args.socket, failure_cache=failure_cache)
+        except FileExistsError as e:
+            parser.error(f"--socket: {e}")
+        return
     
     # Retry Loop
-    result = {"ok": False, "error": "Max attempts reached"}
-    
-    for i in range(args.max_attempts):
-        candidate_str = generator.generate_candidate(topology=args.topology)
-        print("hi")
-        result = build_from_string(candidate_str, args.output_dir, cell, verbose)
-        result["cof_string"] = candidate_str
-        
-        if result["ok"]:
-            break
-        else:
-            _log(f"   [Attempt {i+1} Failed]: {result.get('error')}", verbose)
+    result = generate_with_retries(generator, args.topology, args.output_dir, cell, args.max_attempts, verbose, failure_cache,
+                                   seed=args.seed, start_index=args.index, exports=args.export,
+                                   compress=args.gzip, store=store, fingerprints=fingerprints,
+                                   screen=not args.no_clash_screen, descriptors=args.descriptors,
+                                   pores=pores, bonds=not args.no_bonds)
 
     # Output Handling
     if args.json:
         print(json.dumps(result))
     else:
+        _log(format_summary(summarize(result.get("attempt_timings", [])), title="Stage timings:"), verbose)
         if result["ok"]:
             print(f"\nSUCCESS\nCOF: {result['cof_string']}\nSaved: {result['path']}")
+            for key, value in result.get("descriptors", {}).items():
+                print(f"{key}: {value}")
+            for key in ("LCD", "PLD", "PLD_a", "PLD_b", "PLD_c"):
+                if key in result.get("pores", {}):
+                    print(f"{key}: {result['pores'][key]}")
+            if result.get("duplicate_of"):
+                print(f"Near-duplicate of: {result['duplicate_of']}")
         else:
             print("\nFAILURE: Could not generate a valid COF.")
             sys.exit(1)
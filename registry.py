@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Interlayer registry scan for 2D stacked COFs.
+
+The v2 generator always builds "AA" and work.py picks a random entry of
+available_stacking; the real offset and spacing between layers (c = 6.98
+A in valid_cofs/19411N2.cif) only come out of a full xTB cell
+relaxation. This module scans them cheaply instead: one layer (a
+single-layer cell, as the AA builds are) is stacked with its own lattice
+a, b and a third vector
+
+    c = u a + v b + d n        (n: unit normal of the layer)
+
+for a grid of lateral slips (u, v) and interlayer distances d. The
+energy per layer is the UFF Lennard-Jones interaction (element
+parameters of forcefield.UFF_TYPES) between the layer and the layers
+1..K above it, within LJ_CUTOFF. Intralayer terms do not depend on the
+registry and are left out.
+
+For every slip, pairs come from one 2D KD-tree query of the layer against
+its in-plane periodic images (scipy cKDTree.sparse_distance_matrix), and
+the energies for all d are evaluated at once on the pair arrays. Slips
+are spread over a process pool.
+
+    result = scan(cell, symbols, frac, workers=8)
+    result.slip, result.spacing, result.energy, result.surface
+    cell = registry_cell(cell, result.slip, result.spacing)
+
+The layers are counted first, as connected components of the periodic
+bond graph: cells with two or more layers (AB/ABC builds, many curated
+CIFs) and frameworks bonded along c raise NotSingleLayer, since stacking
+their cell as one layer puts the layers inside each other. apply_registry() also refuses
+(RegistryRejected) a best registry whose energy is not negative and
+finite, as that means overlapping atoms rather than a stacking.
+
+relax.py applies the best registry with `submit --registry` when no warm
+start reference is found, and keeps the structure unchanged (recording
+why) when the scan rejects it.
+
+CLI:
+    python registry.py generated_cofs/*.cif -o registry.csv --surfaces registry_scans --workers 8
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+SLIPS = 24                                   # grid points along a and along b
+SPACINGS = np.round(np.arange(3.0, 4.21, 0.1), 2)   # interlayer distances d (A)
+LJ_CUTOFF = 10.0                             # A
+
+# UFF type whose LJ parameters stand for each element
+ELEMENT_TYPES = {"H": "H_", "B": "B_2", "C": "C_R", "N": "N_R", "O": "O_3", "F": "F_", "Si": "Si3",
+                 "P": "P_3", "S": "S_3", "Cl": "Cl", "Br": "Br", "I": "I_"}
+
+
+class NotSingleLayer(ValueError):
+    """The cell does not hold exactly one layer along the layer normal."""
+
+
+class RegistryRejected(ValueError):
+    """The best registry found is not a physical stacking (energy not negative and finite)."""
+
+
+class Registry(NamedTuple):
+    slip: Tuple[float, float]    # (u, v): fractions of a and b
+    spacing: float               # d (A)
+    energy: float                # eV per layer at the best registry
+    aa_spacing: float            # best d with zero slip (eclipsed AA)
+    aa_energy: float             # eV per layer there
+    slips: np.ndarray            # (SLIPS,) fractional slip grid along a and b
+    spacings: np.ndarray         # (n_d,) d grid
+    surface: np.ndarray          # (SLIPS, SLIPS, n_d) eV per layer
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "slip_a": round(self.slip[0], 4),
+            "slip_b": round(self.slip[1], 4),
+            "spacing": round(self.spacing, 3),
+            "energy_eV": round(self.energy, 4),
+            "aa_spacing": round(self.aa_spacing, 3),
+            "aa_energy_eV": round(self.aa_energy, 4),
+            "gain_vs_aa_eV": round(self.aa_energy - self.energy, 4),
+        }
+
+
+# =======================================
+# LAYER GEOMETRY
+# =======================================
+
+def layer_frame(cell) -> Tuple[np.ndarray, np.ndarray]:
+    """Orthonormal frame (e1 along a, e2 in plane, n normal) as rows, and the 2D lattice (a, b) in it."""
+    cell = np.asarray(cell, dtype=float)
+    e1 = cell[0] / np.linalg.norm(cell[0])
+    n = np.cross(cell[0], cell[1])
+    n /= np.linalg.norm(n)
+    frame = np.stack([e1, np.cross(n, e1), n])
+    return frame, (cell[:2] @ frame.T)[:, :2]
+
+
+def layers(cell, symbols, positions) -> Tuple[int, np.ndarray]:
+    """
+    Number of layers per cell and Cartesian positions with every layer made
+    whole (atoms moved by lattice vectors along their bonds, so a layer that
+    wraps across the cell boundary comes out contiguous). A layer is a
+    connected component of the periodic bond graph (forcefield.BOND_SCALE);
+    0 if some component is bonded to its own image along c, i.e. the atoms
+    are not stacked layers in the a-b plane.
+    """
+    from ase.data import atomic_numbers, covalent_radii
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import breadth_first_order, connected_components
+
+    from forcefield import BOND_SCALE
+    from neighbors import neighbor_list
+
+    cell = np.asarray(cell, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    radii = np.array([covalent_radii[atomic_numbers[sym]] for sym in np.asarray(symbols).tolist()])
+    i, j, d, shift = neighbor_list(cell, positions=positions, cutoff=2 * BOND_SCALE * radii.max())
+    bonded = d < BOND_SCALE * (radii[i] + radii[j])
+    i, j, shift = i[bonded], j[bonded], shift[bonded]
+
+    graph = coo_matrix((np.ones(len(i)), (i, j)), shape=(n, n)).tocsr()
+    n_layers, labels = connected_components(graph, directed=False)
+
+    # Lattice image of each atom that makes its component whole: walk a BFS tree from one atom per component
+    first_bond = {}
+    for k, key in enumerate((i * n + j).tolist()):
+        first_bond.setdefault(key, k)
+    image = np.zeros((n, 3), dtype=int)
+    for root in np.unique(labels, return_index=True)[1]:
+        order, parent = breadth_first_order(graph, int(root), directed=False, return_predecessors=True)
+        for atom in order[1:]:
+            image[atom] = image[parent[atom]] + shift[first_bond[int(parent[atom]) * n + int(atom)]]
+
+    # Bonds that close a loop through a periodic image along c
+    if np.any((image[i] + shift - image[j])[:, 2] != 0):
+        n_layers = 0
+    return n_layers, positions + image @ cell
+
+
+def registry_cell(cell, slip: Tuple[float, float], spacing: float) -> np.ndarray:
+    """Cell with the same a, b and c = u a + v b + d n."""
+    cell = np.asarray(cell, dtype=float)
+    frame, _ = layer_frame(cell)
+    c = slip[0] * cell[0] + slip[1] * cell[1] + spacing * frame[2]
+    return np.stack([cell[0], cell[1], c])
+
+
+def _tile_2d(points: np.ndarray, lattice: np.ndarray, cutoff: float) -> Tuple[np.ndarray, np.ndarray]:
+    """In-plane images of points (wrapped into the cell) within cutoff of it, and their atom indices."""
+    inv = np.linalg.inv(lattice)
+    frac = (points @ inv) % 1.0
+    area = abs(np.linalg.det(lattice))
+    spacing = area / np.linalg.norm(lattice[::-1], axis=1)   # distance between lattice lines
+    pad = cutoff / spacing
+    reps = np.ceil(pad).astype(int)
+    shifts = np.stack(np.meshgrid(*[np.arange(-k, k + 1) for k in reps], indexing="ij"), -1).reshape(-1, 2)
+    images = frac[None, :, :] + shifts[:, None, :]
+    keep = np.all((images >= -pad) & (images < 1.0 + pad), axis=2).reshape(-1)
+    index = np.tile(np.arange(len(points)), len(shifts))[keep]
+    return images.reshape(-1, 2)[keep] @ lattice, index
+
+
+# =======================================
+# SCAN
+# =======================================
+
+def _lj_parameters(symbols) -> Tuple[np.ndarray, np.ndarray]:
+    from forcefield import KCAL_TO_EV, UFF_TYPES
+
+    params = np.array([UFF_TYPES[ELEMENT_TYPES[s]] for s in np.asarray(symbols).tolist()])
+    return params[:, 2], params[:, 3] * KCAL_TO_EV
+
+
+def _scan_slips(args) -> np.ndarray:
+    """Energies (len(slips), n_d) for a chunk of (u, v) slips."""
+    from scipy.spatial import cKDTree
+
+    rho, z, lattice, x, depth, slips, spacings, cutoff = args
+    images, index = _tile_2d(rho, lattice, cutoff)
+    tree = cKDTree(images)
+    inv = np.linalg.inv(lattice)
+    layers = int(np.ceil((cutoff + np.ptp(z)) / spacings.min()))
+
+    energies = np.zeros((len(slips), len(spacings)))
+    for s, slip in enumerate(slips):
+        for k in range(1, layers + 1):
+            # Layer k above sits at +k (slip, d): query the layer, moved back by k slips, against the images
+            queries = (((rho - k * (slip @ lattice)) @ inv) % 1.0) @ lattice
+            pairs = cKDTree(queries).sparse_distance_matrix(tree, cutoff, output_type="ndarray")
+            if len(pairs) == 0:
+                continue
+            i, j = pairs["i"], index[pairs["j"]]
+            dz = z[j] - z[i]
+            r2 = pairs["v"][:, None] ** 2 + (dz[:, None] + k * spacings[None, :]) ** 2
+            xij = np.sqrt(x[i] * x[j])[:, None]
+            s6 = np.where(r2 < cutoff ** 2, (xij ** 2 / r2) ** 3, 0.0)
+            energies[s] += (np.sqrt(depth[i] * depth[j])[:, None] * (s6 * s6 - 2 * s6)).sum(axis=0)
+    return energies
+
+
+def scan(cell, symbols, frac=None, positions=None, slips: int = SLIPS, spacings=SPACINGS,
+         cutoff: float = LJ_CUTOFF, workers: Optional[int] = None) -> Registry:
+    """
+    Energy surface over lateral slips and interlayer distances, and its
+    minimum. Raises NotSingleLayer unless the cell holds exactly one layer.
+    """
+    cell = np.asarray(cell, dtype=float)
+    if positions is None:
+        positions = (np.asarray(frac, dtype=float) % 1.0) @ cell
+    n_layers, whole = layers(cell, symbols, positions)
+    if n_layers != 1:
+        found = "a framework bonded along c" if n_layers == 0 else f"{n_layers} layers per cell"
+        raise NotSingleLayer(f"found {found}; the registry scan needs a single-layer cell")
+    frame, lattice = layer_frame(cell)
+    local = whole @ frame.T
+    rho, z = local[:, :2], local[:, 2] - local[:, 2].mean()
+    x, depth = _lj_parameters(symbols)
+    spacings = np.asarray(spacings, dtype=float)
+
+    grid = (np.arange(slips) / slips)
+    uv = np.stack(np.meshgrid(grid, grid, indexing="ij"), -1).reshape(-1, 2)
+    workers = workers or 1
+    chunks = np.array_split(uv, max(1, min(workers * 4, len(uv))))
+    jobs = [(rho, z, lattice, x, depth, chunk, spacings, cutoff) for chunk in chunks]
+    if workers == 1:
+        parts = [_scan_slips(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_scan_slips, jobs))
+    surface = np.concatenate(parts).reshape(slips, slips, len(spacings))
+
+    a, b, d = np.unravel_index(np.argmin(surface), surface.shape)
+    aa = int(np.argmin(surface[0, 0]))
+    return Registry(
+        slip=(float(grid[a]), float(grid[b])),
+        spacing=float(spacings[d]),
+        energy=float(surface[a, b, d]),
+        aa_spacing=float(spacings[aa]),
+        aa_energy=float(surface[0, 0, aa]),
+        slips=grid,
+        spacings=spacings,
+        surface=surface,
+    )
+
+
+def save_surface(path: str, result: Registry):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, slips=result.slips, spacings=result.spacings, surface=result.surface,
+                        slip=np.array(result.slip), spacing=result.spacing, energy=result.energy)
+
+
+def apply_registry(atoms, workers: Optional[int] = None, surface_path: Optional[str] = None) -> Dict[str, float]:
+    """
+    Scan atoms (one layer per cell) and give them the best registry in
+    place; returns the summary. Raises NotSingleLayer for other cells and
+    RegistryRejected, leaving atoms unchanged, if the best energy is not
+    negative and finite (the surface is still saved).
+    """
+    result = scan(atoms.cell, atoms.get_chemical_symbols(), positions=atoms.get_positions(), workers=workers)
+    if surface_path:
+        save_surface(surface_path, result)
+    if not (np.isfinite(result.energy) and result.energy < 0):
+        raise RegistryRejected(f"best registry has energy {result.energy:.4g} eV per layer "
+                               f"(slip {result.slip}, d = {result.spacing} A): atoms overlap")
+    atoms.set_cell(registry_cell(atoms.cell, result.slip, result.spacing), scale_atoms=False)
+    atoms.wrap()
+    return result.summary()
+
+
+# =======================================
+# MANY STRUCTURES
+# =======================================
+
+def scan_cifs(paths: List[str], workers: Optional[int] = None, surfaces_dir: Optional[str] = None,
+              **kwargs) -> List[Dict[str, object]]:
+    """scan() of each CIF in turn, each spread over `workers` processes; rows keep the input order."""
+    from cif_reader import read_cif
+
+    rows = []
+    for path in paths:
+        try:
+            cif = read_cif(path)
+            result = scan(cif.cell, cif.symbols, cif.frac, workers=workers, **kwargs)
+        except Exception as e:
+            rows.append({"path": path, "error": str(e)})
+            continue
+        if surfaces_dir:
+            save_surface(os.path.join(surfaces_dir, os.path.basename(path).split(".cif")[0] + ".npz"), result)
+        rows.append({"path": path, **result.summary()})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan interlayer slip and spacing of single-layer COF cells.")
+    parser.add_argument("cifs", nargs="+")
+    parser.add_argument("-o", "--output", help="CSV of best registries (default: print to stdout).")
+    parser.add_argument("--surfaces", help="Directory for the energy surfaces (<name>.npz).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel worker processes.")
+    parser.add_argument("--slips", type=int, default=SLIPS, help="Grid points along a and b.")
+    parser.add_argument("--spacing", type=float, nargs=3, metavar=("MIN", "MAX", "STEP"),
+                        help=f"Interlayer distances (default {SPACINGS[0]} to {SPACINGS[-1]} by 0.1 A).")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    spacings = SPACINGS if args.spacing is None else np.arange(args.spacing[0], args.spacing[1] + 1e-9, args.spacing[2])
+    rows = scan_cifs(args.cifs, workers=args.workers, surfaces_dir=args.surfaces, slips=args.slips, spacings=spacings)
+    df = pd.DataFrame(rows)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Queue-driven GFN1-xTB cell + position relaxation with checkpoint/resume.
+
+The notebook relaxation in a.ipynb (TBLite GFN1-xTB, ExpCellFilter,
+BFGS to fmax 0.05) takes 4-17 s per step, so a relaxation runs for hours
+and an interrupted one used to start over. Here every structure is a job
+directory under relax_runs/:
+
+    relax_runs/<name>/
+        input.cif         structure as submitted
+        warmstart.cif     with --warm-start: input with the nearest relaxed cell
+        registry.cif      with --registry: restacked at the best slip and spacing
+                          (surface in registry.npz), unless warm-started; left
+                          unchanged for multi-layer cells or a rejected scan
+        prerelaxed.cif    with --prerelax: the above after the force-field stage
+        job.json          settings, status, steps, energy, ...
+        checkpoint.npz    optimizer state: filter coordinates, BFGS Hessian,
+                          previous positions/forces, step and frame count
+        relax.traj        one frame per checkpoint (ase Trajectory)
+        opt.log           optimizer log, appended across runs
+        relaxed.cif       written once converged
+
+The checkpoint holds the ExpCellFilter coordinates (relative to the input
+cell) and the full BFGS state, so a resumed job takes exactly the step it
+would have taken had it not stopped. It is replaced atomically, after
+the trajectory frame for the same step is written; frames written after
+the last checkpoint are dropped on resume.
+
+submit(..., optimizer="trust") relaxes with optimizers.TrustRegionBFGS
+(bounded atom and cell steps, rejection of steps that raise the energy)
+instead of the notebook's plain BFGS; submit(..., symmetry=True) keeps
+the structure in its detected space group (symmetry.py).
+
+run_queue() works through every job that is not finished (queued,
+interrupted, failed with --retry) in a process pool, with a fixed number
+of OpenMP threads per job. A lock file per job lets several runners
+share one queue.
+
+CLI:
+    python relax.py submit generated_cofs/*.cif
+    python relax.py run --workers 4 --threads 4
+    python relax.py status
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RELAX_DIR = "relax_runs"
+JOB_FILE = "job.json"
+CHECKPOINT_FILE = "checkpoint.npz"
+TRAJECTORY_FILE = "relax.traj"
+LOG_FILE = "opt.log"
+LOCK_FILE = "lock"
+RELAXED_FILE = "relaxed.cif"
+PRERELAXED_FILE = "prerelaxed.cif"
+WARMSTART_FILE = "warmstart.cif"
+REGISTRY_FILE = "registry.cif"
+REGISTRY_SURFACE_FILE = "registry.npz"
+
+# A 700-atom Hessian is ~35 MB: well under a second to write, against 4-17 s per xTB step
+CHECKPOINT_EVERY = 1
+
+DEFAULT_SETTINGS = {
+    "method": "GFN1-xTB",
+    "fmax": 0.05,          # eV/A, as in the notebook
+    "max_steps": 1000,
+    "checkpoint_every": CHECKPOINT_EVERY,
+    "warm_start": False,   # seed the cell from the nearest relaxed job in the queue (warmstart.py)
+    "registry": False,     # best interlayer slip/spacing from registry.scan() (single-layer cells)
+    "prerelax": False,     # forcefield.prerelax() before xTB
+    "optimizer": "bfgs",   # or "trust" (optimizers.TrustRegionBFGS)
+    "symmetry": False,     # constrain to the detected space group (symmetry.constrain_symmetry)
+    "symprec": 0.01,
+}
+
+# Optimizer attributes that carry state between steps: BFGS (r0/f0 in ase < 3.23)
+# and the extra trust-region state of optimizers.TrustRegionBFGS
+_OPTIMIZER_STATE = ("H", "pos0", "forces0", "r0", "f0", "e0", "predicted", "trust", "at_boundary", "rejected")
+
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+class JobBusy(RuntimeError):
+    """Another runner holds the job's lock."""
+
+
+# =======================================
+# HELPERS
+# =======================================
+
+def _read_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _locked(job_dir: str):
+    """Hold the job's lock file; a lock left by a dead process is taken over."""
+    path = os.path.join(job_dir, LOCK_FILE)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    pid = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                pid = 0
+            if pid and _pid_alive(pid):
+                raise JobBusy(f"{job_dir} is locked by process {pid}")
+            os.remove(path)
+    else:
+        raise JobBusy(f"could not lock {job_dir}")
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(path)
+
+
+def set_threads(threads: Optional[int]):
+    """Thread count for OpenMP/BLAS in this process; must run before tblite is imported."""
+    if threads:
+        for var in THREAD_VARIABLES:
+            os.environ[var] = str(threads)
+
+
+def make_calculator(method: str):
+    from tblite.ase import TBLite
+
+    return TBLite(method=method, verbosity=0)
+
+
+def cell_filter(atoms):
+    try:
+        from ase.filters import ExpCellFilter
+    except ImportError:
+        from ase.constraints import ExpCellFilter
+
+    # hydrostatic_strain=False lets the cell change shape (layer slip), as in the notebook
+    return ExpCellFilter(atoms, hydrostatic_strain=False)
+
+
+def max_force(forces: np.ndarray) -> float:
+    return float(np.sqrt((np.asarray(forces) ** 2).sum(axis=1).max()))
+
+
+# =======================================
+# CHECKPOINTS
+# =======================================
+
+def save_checkpoint(path: str, opt, filtered, frames: int):
+    """Optimizer and filter state, written to a temporary file and moved into place."""
+    arrays = {"filter_positions": filtered.get_positions(), "nsteps": opt.nsteps, "frames": frames}
+    for name in _OPTIMIZER_STATE:
+        value = getattr(opt, name, None)
+        if value is not None:
+            arrays[name] = np.asarray(value)
+    tmp_path = path[: -len(".npz")] + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _restore_attribute(opt, name: str, value):
+    if name == "H" and isinstance(getattr(type(opt), "H", None), property):
+        # Newer ase BFGS keeps the Hessian in opt.state; opt.H is a read-only view of it
+        from ase.optimize.bfgs import BFGSMethod
+
+        opt.state = BFGSMethod(value)
+    else:
+        setattr(opt, name, value)
+
+
+def load_checkpoint(path: str, opt, filtered) -> int:
+    """Restore save_checkpoint() state into a fresh optimizer; returns the trajectory frame count."""
+    with np.load(path) as data:
+        filtered.set_positions(data["filter_positions"])
+        opt.nsteps = int(data["nsteps"])
+        for name in _OPTIMIZER_STATE:
+            if name in data:
+                value = data[name]
+                _restore_attribute(opt, name, value.item() if value.ndim == 0 else value.copy())
+        return int(data["frames"])
+
+
+def _truncate_trajectory(path: str, frames: int):
+    """Keep the first `frames` frames: the rest were written after the last checkpoint."""
+    from ase.io.trajectory import Trajectory
+
+    if not os.path.exists(path):
+        return
+    with Trajectory(path) as traj:
+        if len(traj) <= frames:
+            return
+        kept = [traj[i] for i in range(frames)]
+    tmp_path = f"{path}.tmp"
+    with Trajectory(tmp_path, "w") as out:
+        for atoms in kept:
+            out.write(atoms)
+    os.replace(tmp_path, path)
+
+
+# =======================================
+# JOBS
+# =======================================
+
+def job_dirs(root: str = RELAX_DIR) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.exists(os.path.join(root, name, JOB_FILE))
+    )
+
+
+def submit(cif_path: str, root: str = RELAX_DIR, name: Optional[str] = None, cof_name: Optional[str] = None,
+           **settings) -> str:
+    """
+    Queue a CIF for relaxation and return its job directory. A job that
+    already exists under the same name is left as it is. cof_name (default:
+    the file name, as pyCOFBuilder saves them) is what warm starts match on.
+    """
+    base = os.path.basename(cif_path)
+    name = name or base.split(".cif")[0]
+    job_dir = os.path.join(root, name)
+    if os.path.exists(os.path.join(job_dir, JOB_FILE)):
+        return job_dir
+
+    os.makedirs(job_dir, exist_ok=True)
+    input_name = "input.cif.gz" if base.endswith(".gz") else "input.cif"
+    shutil.copyfile(cif_path, os.path.join(job_dir, input_name))
+    _write_json(os.path.join(job_dir, JOB_FILE), {
+        "name": name,
+        "source": cif_path,
+        "cof_name": cof_name or base.split(".cif")[0],
+        "input": input_name,
+        "settings": {**DEFAULT_SETTINGS, **settings},
+        "status": "queued",
+        "steps": 0,
+        "runs": 0,
+        "elapsed_s": 0.0,
+    })
+    return job_dir
+
+
+def _warm_start_stage(atoms, job_dir: str, job: dict) -> dict:
+    from warmstart import warm_start
+
+    return warm_start(atoms, job.get("cof_name"), [os.path.dirname(os.path.abspath(job_dir))])
+
+
+def _registry_stage(atoms, job_dir: str, job: dict) -> dict:
+    from registry import NotSingleLayer, RegistryRejected, apply_registry
+
+    if (job.get("warm_start") or {}).get("reference"):
+        return {"skipped": "cell taken from the warm start reference"}
+    try:
+        return apply_registry(atoms, surface_path=os.path.join(job_dir, REGISTRY_SURFACE_FILE))
+    except (NotSingleLayer, RegistryRejected) as e:
+        return {"skipped": str(e)}   # atoms are left as they were
+
+
+def _prerelax_stage(atoms, job_dir: str, job: dict) -> dict:
+    from forcefield import prerelax
+
+    return prerelax(atoms)
+
+
+def _start_structure(job_dir: str, job: dict, settings: dict) -> str:
+    """
+    File the xTB stage starts from: the input, then optionally warm-started,
+    restacked at the best interlayer registry and pre-relaxed. Each stage's
+    result is written once and reused on resume, since the checkpoint is
+    relative to the starting cell.
+    """
+    current = job["input"]
+    for key, filename, stage in (("warm_start", WARMSTART_FILE, _warm_start_stage),
+                                 ("registry", REGISTRY_FILE, _registry_stage),
+                                 ("prerelax", PRERELAXED_FILE, _prerelax_stage)):
+        if not settings[key]:
+            continue
+        if not os.path.exists(os.path.join(job_dir, filename)):
+            from ase.io import write
+
+            from cif_reader import read_cif
+
+            atoms = read_cif(os.path.join(job_dir, current)).to_atoms()
+            job[key] = stage(atoms, job_dir, job)
+            write(os.path.join(job_dir, filename), atoms)
+        current = filename
+    return current
+
+
+def relax_job(job_dir: str) -> Dict[str, object]:
+    """
+    Run (or resume) one job until it converges or reaches max_steps, and
+    return its job.json contents. Errors are recorded in the job, which
+    keeps its last checkpoint.
+    """
+    from ase.io import write
+    from ase.io.trajectory import Trajectory
+
+    from cif_reader import read_cif
+    from optimizers import make_optimizer
+    from symmetry import check as check_symmetry
+    from symmetry import constrain_symmetry
+
+    job_path = os.path.join(job_dir, JOB_FILE)
+    with _locked(job_dir):
+        job = _read_json(job_path)
+        if job["status"] in ("converged", "unconverged"):
+            return job
+        settings = {**DEFAULT_SETTINGS, **job["settings"]}
+        checkpoint_path = os.path.join(job_dir, CHECKPOINT_FILE)
+        trajectory_path = os.path.join(job_dir, TRAJECTORY_FILE)
+
+        job.update(status="running", runs=job["runs"] + 1, pid=os.getpid(), error=None)
+        _write_json(job_path, job)
+        start = time.perf_counter()
+        try:
+            atoms = read_cif(os.path.join(job_dir, _start_structure(job_dir, job, settings))).to_atoms()
+            atoms.calc = make_calculator(settings["method"])
+            if settings["symmetry"]:
+                # Deterministic from the start structure, so resumed jobs get the same reference cell
+                job["symmetry"] = constrain_symmetry(atoms, settings["symprec"])
+            filtered = cell_filter(atoms)
+            opt = make_optimizer(settings["optimizer"], filtered, os.path.join(job_dir, LOG_FILE))
+
+            frames = 0
+            if os.path.exists(checkpoint_path):
+                frames = load_checkpoint(checkpoint_path, opt, filtered)
+                _truncate_trajectory(trajectory_path, frames)
+            saved_step = opt.nsteps if frames else None
+
+            with Trajectory(trajectory_path, "a", atoms) as traj:
+                def checkpoint(force=False):
+                    nonlocal frames, saved_step
+                    if opt.nsteps == saved_step:
+                        return
+                    if not force and opt.nsteps % settings["checkpoint_every"]:
+                        return
+                    traj.write(atoms)
+                    frames += 1
+                    save_checkpoint(checkpoint_path, opt, filtered, frames)
+                    saved_step = opt.nsteps
+
+                opt.attach(checkpoint)
+                converged = False
+                # steps is absolute in older ase and relative in newer; stop at max_steps either way
+                for converged in opt.irun(fmax=settings["fmax"], steps=settings["max_steps"]):
+                    if converged or opt.nsteps >= settings["max_steps"]:
+                        break
+                checkpoint(force=True)
+
+            job.update(
+                status="converged" if converged else "unconverged",
+                steps=opt.nsteps,
+                energy=float(atoms.get_potential_energy()),
+                fmax=max_force(filtered.get_forces()),
+                cell=atoms.cell.cellpar().round(4).tolist(),
+            )
+            if settings["symmetry"]:
+                job["symmetry"] = check_symmetry(atoms, job["symmetry"], settings["symprec"])
+            if getattr(opt, "rejected", None) is not None:
+                job["rejected_steps"] = opt.rejected
+            if converged:
+                write(os.path.join(job_dir, RELAXED_FILE), atoms)
+        except Exception as e:
+            job.update(status="failed", error=f"{type(e).__name__}: {e}")
+        job["elapsed_s"] = round(job["elapsed_s"] + time.perf_counter() - start, 2)
+        job.pop("pid", None)
+        _write_json(job_path, job)
+        return job
+
+
+def _run_one(job_dir: str) -> Dict[str, object]:
+    try:
+        return relax_job(job_dir)
+    except JobBusy as e:
+        return {"name": os.path.basename(job_dir), "status": "busy", "error": str(e)}
+
+
+def pending_jobs(root: str = RELAX_DIR, retry_failed: bool = False) -> List[str]:
+    """Jobs still to run: queued, interrupted (status running, no live lock) and, optionally, failed."""
+    wanted = {"queued", "running"} | ({"failed"} if retry_failed else set())
+    return [d for d in job_dirs(root) if _read_json(os.path.join(d, JOB_FILE))["status"] in wanted]
+
+
+def run_queue(root: str = RELAX_DIR, workers: int = 1, threads: Optional[int] = None,
+              retry_failed: bool = False, verbose: bool = True) -> List[Dict[str, object]]:
+    """Relax every pending job, `workers` at a time with `threads` OpenMP threads each."""
+    jobs = pending_jobs(root, retry_failed)
+    if verbose:
+        print(f">>> {len(jobs)} pending relaxations, {workers} workers x {threads or 'default'} threads",
+              file=sys.stderr)
+    results = []
+    if workers == 1:
+        set_threads(threads)
+        iterator = map(_run_one, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=set_threads, initargs=(threads,))
+        iterator = pool.map(_run_one, jobs, chunksize=1)
+    try:
+        for job in iterator:
+            results.append(job)
+            if verbose:
+                print(f"  {job['name']}: {job['status']} ({job.get('steps', 0)} steps)", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def compare_variants(paths: List[str], root: str, variants: Dict[str, dict], workers: int = 1,
+                     threads: Optional[int] = None, **settings) -> List[Dict[str, object]]:
+    """
+    Relax every CIF once per variant (settings overriding `settings`) in one
+    queue, so interrupted comparisons resume, and return one row per
+    structure with <variant>_steps, _status, _energy and _elapsed_s.
+    """
+    jobs = []
+    for path in paths:
+        name = os.path.basename(path).split(".cif")[0]
+        jobs.append((path, {v: submit(path, root, name=f"{name}-{v}", **{**settings, **overrides})
+                            for v, overrides in variants.items()}))
+    run_queue(root, workers, threads)
+
+    rows = []
+    for path, dirs in jobs:
+        row = {"path": path}
+        for variant, job_dir in dirs.items():
+            job = _read_json(os.path.join(job_dir, JOB_FILE))
+            row[f"{variant}_steps"] = job["steps"]
+            row[f"{variant}_status"] = job["status"]
+            row[f"{variant}_energy"] = job.get("energy")
+            row[f"{variant}_elapsed_s"] = job["elapsed_s"]
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue-driven xTB cell relaxation with checkpoint/resume.")
+    parser.add_argument("--root", default=RELAX_DIR, help="Job queue directory.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_submit = sub.add_parser("submit", help="Queue CIF files.")
+    p_submit.add_argument("cifs", nargs="+")
+    p_submit.add_argument("--method", default=DEFAULT_SETTINGS["method"])
+    p_submit.add_argument("--fmax", type=float, default=DEFAULT_SETTINGS["fmax"])
+    p_submit.add_argument("--max-steps", type=int, default=DEFAULT_SETTINGS["max_steps"])
+    p_submit.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="Steps between checkpoints.")
+    p_submit.add_argument("--warm-start", action="store_true",
+                          help="Start from the cell of the nearest relaxed COF (same net and cores) in the queue.")
+    p_submit.add_argument("--registry", action="store_true",
+                          help="Restack a single-layer cell at the best interlayer slip and spacing first.")
+    p_submit.add_argument("--prerelax", action="store_true", help="Pre-relax with the UFF-style force field first.")
+    p_submit.add_argument("--optimizer", choices=["bfgs", "trust"], default=DEFAULT_SETTINGS["optimizer"],
+                          help="Plain BFGS, or trust-region BFGS with step rejection.")
+    p_submit.add_argument("--symmetry", action="store_true", help="Constrain the relaxation to the detected space group.")
+    p_submit.add_argument("--symprec", type=float, default=DEFAULT_SETTINGS["symprec"], help="Symmetry tolerance (A).")
+    p_run = sub.add_parser("run", help="Relax (or resume) every pending job.")
+    p_run.add_argument("--workers", type=int, default=1, help="Jobs in parallel.")
+    p_run.add_argument("--threads", type=int, help="OpenMP threads per job (default: cpu_count / workers).")
+    p_run.add_argument("--retry", action="store_true", help="Also rerun failed jobs from their checkpoint.")
+    sub.add_parser("status", help="List jobs.")
+    args = parser.parse_args()
+
+    if args.cmd == "submit":
+        for path in args.cifs:
+            job_dir = submit(path, args.root, method=args.method, fmax=args.fmax, max_steps=args.max_steps,
+                             checkpoint_every=args.checkpoint_every, warm_start=args.warm_start,
+                             registry=args.registry, prerelax=args.prerelax, optimizer=args.optimizer,
+                             symmetry=args.symmetry, symprec=args.symprec)
+            print(job_dir)
+    elif args.cmd == "run":
+        threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+        run_queue(args.root, args.workers, threads, retry_failed=args.retry)
+    else:
+        for job_dir in job_dirs(args.root):
+            job = _read_json(os.path.join(job_dir, JOB_FILE))
+            energy = f"{job['energy']:.4f} eV" if job.get("energy") is not None else ""
+            print(f"{job['name']:40s} {job['status']:12s} {job['steps']:6d} steps {job['elapsed_s']:10.1f} s  {energy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Per-stage wall-clock timing for the COF build pipeline.
+
+    timer = StageTimer()
+    with timer.stage("framework"):
+        cof = pcb.Framework(name)
+    with timer.stage("write"):
+        f.write(text)
+    record.update(timer.as_record())      # {"t_framework": ..., "t_write": ..., "t_total": ...}
+
+summarize() turns many such records into p50/p95/p99 per stage, which is
+what tells us whether throughput is bound by name sampling, pyCOFBuilder
+assembly, the clash screen, serialisation or disk I/O ("save" is pyCOFBuilder's own
+serialise-and-write, used for formats structure_export cannot write).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Mapping, Optional
+
+# Canonical order of pipeline stages (only the ones that ran are recorded)
+STAGES = ["sample", "validate", "framework", "screen", "serialize", "write", "save", "describe", "pores"]
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def as_record(self, prefix: str = "t_") -> Dict[str, float]:
+        """Flat {prefix + stage: seconds} dict plus the total, ready for a log row."""
+        record = {f"{prefix}{name}": round(sec, 6) for name, sec in self.timings.items()}
+        record[f"{prefix}total"] = round(sum(self.timings.values()), 6)
+        return record
+
+
+def percentile(values: List[float], q: float) -> float:
+    """q-th percentile with linear interpolation (same convention as numpy)."""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(records: Iterable[Mapping], prefix: str = "t_") -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate per-candidate timing records into
+    {stage: {"n": .., "mean": .., "p50": .., "p95": .., "p99": ..}}.
+    Accepts dicts or the rows of a DataFrame (via df.to_dict("records")).
+    """
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        for key, value in record.items():
+            if not key.startswith(prefix) or value is None or value != value:  # skip NaN
+                continue
+            samples.setdefault(key[len(prefix):], []).append(float(value))
+
+    order = {name: k for k, name in enumerate(STAGES + ["total"])}
+    summary = {}
+    for stage in sorted(samples, key=lambda s: order.get(s, len(order))):
+        values = samples[stage]
+        summary[stage] = {"n": len(values), "mean": sum(values) / len(values)}
+        for q in PERCENTILES:
+            summary[stage][f"p{q}"] = percentile(values, q)
+    return summary
+
+
+def format_summary(summary: Dict[str, Dict[str, float]], title: Optional[str] = None) -> str:
+    lines = [title] if title else []
+    lines.append(f"  {'stage':<12}{'n':>6}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (seconds)")
+    for stage, s in summary.items():
+        lines.append(
+            f"  {stage:<12}{s['n']:>6}{s['mean']:>10.4f}{s['p50']:>10.4f}{s['p95']:>10.4f}{s['p99']:>10.4f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Write one built framework to several (format, supercell) targets.
+
+pcb.Framework.save() rebuilds a pymatgen Structure, makes the supercell and
+searches for bonds on every call, so exporting 1x1x1 for simulation, 2x2x1
+for the viewer and a POSCAR for another tool costs three times as much as
+it should. Here the unit cell is read from the framework once, and each
+target is written by tiling the cell arrays with numpy:
+
+    paths = export_framework(cof, [("cif", (1, 1, 1)), ("cif", (2, 2, 1)), ("vasp", (1, 1, 1))], "out")
+
+Files are named <name>.<ext> (plus .gz with compress=True). If several
+targets share a format, the ones that are not 1x1x1 get a _AxBxC suffix.
+The writers stream P1 CIF, extended XYZ and VASP 5 POSCAR chunk by
+chunk, so memory is bounded by the unit cell, not the supercell. Unlike
+pyCOFBuilder's writers they do not emit a bond table, so
+export_framework() still writes a 1x1x1 CIF main target with cof.save(),
+bonds included, unless bonds=False. A main target in a larger supercell
+(or in another format, or without bonds) is streamed like the extra
+targets. Targets in any other pyCOFBuilder format (json, pdb, turbomole,
+...) always go through cof.save().
+"""
+
+import gzip
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from stage_timer import StageTimer
+
+# format -> file extension (pyCOFBuilder names POSCARs *.vasp)
+FORMATS: Dict[str, str] = {"cif": ".cif", "xyz": ".xyz", "vasp": ".vasp"}
+FORMAT_ALIASES = {"poscar": "vasp"}
+
+# Formats whose pyCOFBuilder writer emits a bond table
+BOND_FORMATS = {"cif"}
+
+# Atoms per streamed chunk (a few MB of text)
+CHUNK_ATOMS = 65536
+
+Target = Tuple[str, Tuple[int, int, int]]
+
+
+# =======================================
+# TARGETS
+# =======================================
+
+def parse_target(spec: Union[str, Sequence]) -> Target:
+    """
+    Normalise a target given as "cif", "xyz:2x2x1", ("cif", 2) or
+    ("cif", [2, 2, 1]) into (format, (a, b, c)).
+    """
+    if isinstance(spec, str):
+        fmt, _, cell = spec.partition(":")
+        supercell = [int(n) for n in cell.lower().split("x")] if cell else [1, 1, 1]
+    else:
+        fmt, supercell = spec[0], spec[1] if len(spec) > 1 else (1, 1, 1)
+        if isinstance(supercell, int):
+            supercell = [supercell] * 3
+
+    fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+    if len(supercell) != 3 or any(int(n) < 1 for n in supercell):
+        raise ValueError(f"Supercell must be three positive integers, got {supercell}")
+    return fmt, tuple(int(n) for n in supercell)
+
+
+def target_filenames(name: str, targets: List[Target], main_first: bool = False) -> List[str]:
+    """
+    File name per target; see the module docstring for the naming rule.
+    With main_first, the first target keeps the plain <name>.<ext> that
+    cof.save() writes, and every other target in its format gets the suffix.
+    """
+    shared = {fmt for fmt, _ in targets if sum(1 for f, _ in targets if f == fmt) > 1}
+    names = []
+    for k, (fmt, supercell) in enumerate(targets):
+        suffix = ""
+        if main_first and k > 0 and fmt == targets[0][0]:
+            suffix = "_" + "x".join(map(str, supercell))
+        elif fmt in shared and supercell != (1, 1, 1) and not (main_first and k == 0):
+            suffix = "_" + "x".join(map(str, supercell))
+        names.append(f"{name}{suffix}{FORMATS.get(fmt, '.' + fmt)}")
+    return names
+
+
+# =======================================
+# TILING
+# =======================================
+
+def tile(
+    cell: np.ndarray, atom_types: np.ndarray, atom_pos: np.ndarray, supercell: Tuple[int, int, int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Replicate a unit cell (3x3 lattice rows, N types, Nx3 Cartesian
+    positions) into an a x b x c supercell in one broadcast.
+    """
+    reps = np.asarray(supercell)
+    if np.all(reps == 1):
+        return cell, atom_types, atom_pos
+    shifts = np.indices(reps).reshape(3, -1).T @ cell          # (n_images, 3)
+    positions = (shifts[:, None, :] + atom_pos[None, :, :]).reshape(-1, 3)
+    return cell * reps[:, None], np.tile(atom_types, len(shifts)), positions
+
+
+def cell_parameters(cell: np.ndarray) -> Tuple[float, float, float, float, float, float]:
+    a, b, c = np.linalg.norm(cell, axis=1)
+    alpha = np.degrees(np.arccos(np.dot(cell[1], cell[2]) / (b * c)))
+    beta = np.degrees(np.arccos(np.dot(cell[0], cell[2]) / (a * c)))
+    gamma = np.degrees(np.arccos(np.dot(cell[0], cell[1]) / (a * b)))
+    return a, b, c, alpha, beta, gamma
+
+
+# =======================================
+# STREAMING WRITERS
+# =======================================
+# Each writer yields the file as text chunks: the header, then batches of
+# whole periodic images of at most ~chunk_atoms atoms each. Nothing larger
+# than the unit cell times one batch is held in memory, whatever the
+# supercell, so 4x4x4 of a big H6 framework streams to disk (or gzip)
+# in bounded memory.
+
+def _rows(fmt: str, *columns) -> str:
+    return "".join(fmt % row for row in zip(*columns))
+
+
+def _image_batches(n_atoms: int, supercell: Tuple[int, int, int], chunk_atoms: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (index of first image, (k, 3) integer image offsets) in C order."""
+    n_images = int(np.prod(supercell))
+    per_batch = max(1, chunk_atoms // max(n_atoms, 1))
+    for start in range(0, n_images, per_batch):
+        idx = np.arange(start, min(start + per_batch, n_images))
+        yield start, np.stack(np.unravel_index(idx, supercell), axis=1)
+
+
+def iter_cif(name, cell, atom_types, atom_pos, supercell=(1, 1, 1), chunk_atoms=CHUNK_ATOMS) -> Iterator[str]:
+    reps = np.asarray(supercell)
+    a, b, c, alpha, beta, gamma = cell_parameters(cell * reps[:, None])
+    yield (
+        f"data_{name}\n\n"
+        f"_chemical_name_common                  '{name}'\n"
+        f"_cell_length_a                          {a:>10.6f}\n"
+        f"_cell_length_b                          {b:>10.6f}\n"
+        f"_cell_length_c                          {c:>10.6f}\n"
+        f"_cell_angle_alpha                       {alpha:>6.2f}\n"
+        f"_cell_angle_beta                        {beta:>6.2f}\n"
+        f"_cell_angle_gamma                       {gamma:>6.2f}\n"
+        "_space_group_name_H-M_alt               'P 1'\n"
+        "_space_group_IT_number                  1\n\n"
+        "loop_\n_symmetry_equiv_pos_as_xyz\n   'x, y, z'\n\n"
+        "loop_\n   _atom_site_label\n   _atom_site_type_symbol\n"
+        "   _atom_site_fract_x\n   _atom_site_fract_y\n   _atom_site_fract_z\n"
+    )
+    n = len(atom_types)
+    frac = np.linalg.solve(cell.T, atom_pos.T).T
+    types = atom_types.tolist()
+    for first, images in _image_batches(n, supercell, chunk_atoms):
+        chunk = (((frac[None, :, :] + images[:, None, :]) / reps) % 1.0).reshape(-1, 3)
+        offset = first * n
+        labels = [f"{t}{offset + i}" for i, t in enumerate(types * len(images))]
+        yield _rows("%-15s    %s %15.9f %15.9f %15.9f\n", labels, types * len(images), *chunk.T.tolist())
+
+
+def iter_xyz(name, cell, atom_types, atom_pos, supercell=(1, 1, 1), chunk_atoms=CHUNK_ATOMS) -> Iterator[str]:
+    reps = np.asarray(supercell)
+    n = len(atom_types)
+    lattice = " ".join(f"{x:.7f}" for x in (cell * reps[:, None]).ravel())
+    yield f'{n * int(np.prod(reps))}\nLattice="{lattice}" Properties=species:S:1:pos:R:3 pbc="T T T"\n'
+    types = atom_types.tolist()
+    for _, images in _image_batches(n, supercell, chunk_atoms):
+        chunk = (atom_pos[None, :, :] + (images @ cell)[:, None, :]).reshape(-1, 3)
+        yield _rows("%-5s%15.7f%15.7f%15.7f\n", types * len(images), *chunk.T.tolist())
+
+
+def iter_vasp(name, cell, atom_types, atom_pos, supercell=(1, 1, 1), chunk_atoms=CHUNK_ATOMS) -> Iterator[str]:
+    # POSCAR lists atoms grouped by element, in order of first appearance
+    reps = np.asarray(supercell)
+    n_images = int(np.prod(reps))
+    elements, first = np.unique(atom_types, return_index=True)
+    elements = elements[np.argsort(first)]
+    counts = [int(np.count_nonzero(atom_types == e)) * n_images for e in elements]
+    yield (
+        f"{name}\n1.0\n"
+        + _rows("%15.7f%15.7f%15.7f\n", *(cell * reps[:, None]).T.tolist())
+        + " ".join(elements.tolist()) + "\n"
+        + " ".join(map(str, counts)) + "\nCartesian\n"
+    )
+    for element in elements:
+        pos = atom_pos[atom_types == element]
+        for _, images in _image_batches(len(pos), supercell, chunk_atoms):
+            chunk = (pos[None, :, :] + (images @ cell)[:, None, :]).reshape(-1, 3)
+            yield _rows("%15.7f%15.7f%15.7f\n", *chunk.T.tolist())
+
+
+WRITERS = {"cif": iter_cif, "xyz": iter_xyz, "vasp": iter_vasp}
+
+
+def format_structure(fmt: str, name: str, cell, atom_types, atom_pos, supercell=(1, 1, 1)) -> str:
+    """Whole file text in one string (for small structures and tests)."""
+    return "".join(WRITERS[fmt](name, np.asarray(cell, dtype=float), np.asarray(atom_types, dtype=str),
+                                np.asarray(atom_pos, dtype=float).reshape(-1, 3), tuple(supercell)))
+
+
+# =======================================
+# EXPORT
+# =======================================
+
+def export_structure(
+    name: str,
+    cell,
+    atom_types,
+    atom_pos,
+    targets: Iterable,
+    out_dir: str,
+    timer=None,
+    compress: bool = False,
+    chunk_atoms: int = CHUNK_ATOMS,
+    filenames: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Stream a unit cell to every target and return the file paths (in target
+    order). compress=True writes gzip files (<name>.<ext>.gz). filenames
+    overrides target_filenames(name, targets).
+    With a StageTimer, generating the text is timed as "serialize" and
+    output (including compression) as "write".
+    """
+    timer = timer or StageTimer()
+    targets = [parse_target(t) for t in targets]
+    for fmt, _ in targets:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown export format {fmt} (known: {', '.join(WRITERS)}, poscar)")
+    cell = np.asarray(cell, dtype=float)
+    atom_types = np.asarray(atom_types, dtype=str)
+    atom_pos = np.asarray(atom_pos, dtype=float).reshape(-1, 3)
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    filenames = target_filenames(name, targets) if filenames is None else filenames
+    for (fmt, supercell), filename in zip(targets, filenames):
+        path = os.path.join(out_dir, filename + (".gz" if compress else ""))
+        chunks = WRITERS[fmt](name, cell, atom_types, atom_pos, supercell, chunk_atoms)
+        opener = gzip.open(path, "wt", encoding="utf-8", compresslevel=6) if compress else open(path, "w", encoding="utf-8")
+        with opener as f:
+            while True:
+                with timer.stage("serialize"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with timer.stage("write"):
+                    f.write(chunk)
+        paths.append(path)
+    return paths
+
+
+def _gzip_in_place(path: str) -> str:
+    """Compress a file to <path>.gz and remove the original."""
+    with open(path, "rb") as src, gzip.open(path + ".gz", "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+    return path + ".gz"
+
+
+def export_framework(
+    cof, targets: Iterable, out_dir: str, name: Optional[str] = None, timer=None, compress: bool = False,
+    bonds: bool = True,
+) -> List[str]:
+    """
+    Write a built pcb.Framework to every target. The first target is the
+    main output: a 1x1x1 CIF goes through cof.save(), so it keeps
+    pyCOFBuilder's bond table, unless bonds=False. Every other target in a
+    format with a writer here, the main one included, is streamed from the
+    conventional cell by export_structure(); targets in other formats go
+    through cof.save(). cof.save() calls are timed as "save"; their
+    reported path assumes pyCOFBuilder's <name>.<ext>. With compress=True
+    a CIF saved by cof.save() is gzipped afterwards (timed as "write");
+    other cof.save() formats are never compressed. Returns the paths in
+    target order.
+    """
+    timer = timer or StageTimer()
+    name = name or cof.name
+    targets = [parse_target(t) for t in targets]
+    filenames = target_filenames(name, targets, main_first=True)
+    paths = [os.path.join(out_dir, filename) for filename in filenames]
+    if not targets:
+        return paths
+
+    os.makedirs(out_dir, exist_ok=True)
+    main_fmt, main_supercell = targets[0]
+    save_main = bonds and main_fmt in BOND_FORMATS and main_supercell == (1, 1, 1)
+    if save_main:
+        with timer.stage("save"):
+            cof.save(fmt=main_fmt, supercell=list(main_supercell), save_dir=out_dir)
+        if compress:
+            with timer.stage("write"):
+                paths[0] = _gzip_in_place(paths[0])
+
+    native = [k for k, (fmt, _) in enumerate(targets) if fmt in WRITERS and not (k == 0 and save_main)]
+    if native:
+        native_paths = export_structure(
+            name, cof.cellMatrix, cof.atom_types, cof.atom_pos,
+            [targets[k] for k in native], out_dir, timer=timer, compress=compress,
+            filenames=[filenames[k] for k in native],
+        )
+        for k, path in zip(native, native_paths):
+            paths[k] = path
+    for fmt, supercell in targets:
+        if fmt not in WRITERS:
+            with timer.stage("save"):
+                cof.save(fmt=fmt, supercell=list(supercell), save_dir=out_dir)
+    return paths
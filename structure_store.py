@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Columnar, append-only store for many COF structures.
+
+One text CIF per structure means a directory scan, an inode and a full
+parse for every access. A store instead keeps every structure in a fixed
+set of flat binary columns inside one directory:
+
+    <store>/
+        coords.f32     float32 fractional coordinates, all atoms, (N_total, 3)
+        numbers.u8     uint8 atomic numbers, (N_total,)
+        index.bin      one fixed-size record per structure: atom offset, atom
+                       count, cell (3x3 float64)
+        meta.jsonl     one JSON line per structure: name, content hash and
+                       any extra metadata
+
+Columns are read through np.memmap, so get() returns zero-copy views, and
+a structure is found in O(1) by row, name or content hash. Appends go to
+the ends of the files: atoms first, then the index record, then the
+metadata line. A crash mid-append leaves a shorter consistent prefix that
+is picked up on the next open.
+
+Stores open read-only by default, and readers only ever see the longest
+complete prefix, so they can open a store while it is being appended to.
+mode="a" makes this process the single writer: it takes an exclusive
+fcntl.flock on <store>/lock (StoreBusy if another writer holds it), and
+only then cuts off the tail of an interrupted append.
+
+    with StructureStore("campaign.cofstore", mode="a") as store:
+        store.append(name, cell, symbols, frac, metadata={"topology": "SQL"})
+        s = store["S4_...-SQL_A-AA"]        # s.frac, s.numbers are memmap views
+        store.export_cif(s.name, "out/")
+
+CLI:
+    python structure_store.py import STORE CIF [CIF ...]
+    python structure_store.py export STORE NAME [NAME ...] -o DIR
+    python structure_store.py ls STORE
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+COORDS_FILE = "coords.f32"
+NUMBERS_FILE = "numbers.u8"
+INDEX_FILE = "index.bin"
+META_FILE = "meta.jsonl"
+LOCK_FILE = "lock"
+
+INDEX_DTYPE = np.dtype([("offset", "<i8"), ("n_atoms", "<i4"), ("cell", "<f8", (3, 3))])
+
+
+def _symbols_to_numbers(symbols) -> np.ndarray:
+    from ase.data import atomic_numbers
+
+    symbols = np.asarray(symbols)
+    if symbols.dtype.kind in "iu":
+        return symbols.astype(np.uint8)
+    return np.array([atomic_numbers[s] for s in symbols.tolist()], dtype=np.uint8)
+
+
+def content_hash(cell, numbers, frac, decimals: int = 4) -> str:
+    """
+    Hash of a structure's content, independent of its name. Positions are
+    rounded and wrapped into [0, 1), and atoms are put in a canonical
+    order first, so atom order and tiny float noise do not change the key.
+    """
+    numbers = np.asarray(numbers, dtype=np.uint8)
+    frac = np.round(np.asarray(frac, dtype=np.float64) % 1.0, decimals) % 1.0
+    order = np.lexsort((frac[:, 2], frac[:, 1], frac[:, 0], numbers))
+    h = hashlib.sha1()
+    h.update(np.round(np.asarray(cell, dtype=np.float64), 3).tobytes())
+    h.update(numbers[order].tobytes())
+    h.update(frac[order].tobytes())
+    return h.hexdigest()
+
+
+class StoreBusy(RuntimeError):
+    """Another process holds the store's writer lock."""
+
+
+class StoredStructure(NamedTuple):
+    row: int
+    name: str
+    hash: str
+    cell: np.ndarray      # (3, 3) lattice rows, Angstrom
+    numbers: np.ndarray   # (n,) uint8 atomic numbers (memmap view)
+    frac: np.ndarray      # (n, 3) float32 fractional coordinates (memmap view)
+    metadata: dict
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Cartesian coordinates (a float64 copy)."""
+        return self.frac.astype(np.float64) @ self.cell
+
+    @property
+    def symbols(self) -> List[str]:
+        from ase.data import chemical_symbols
+
+        return [chemical_symbols[z] for z in self.numbers.tolist()]
+
+    def to_atoms(self):
+        """ase.Atoms copy of the structure."""
+        from ase import Atoms
+
+        return Atoms(numbers=self.numbers, scaled_positions=self.frac, cell=self.cell, pbc=True)
+
+
+class StructureStore:
+    """
+    Append-only structure store in directory `path`. mode "r" (default)
+    opens an existing store read-only; "a" creates it if missing, takes the
+    writer lock and allows append().
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        if mode not in ("r", "a"):
+            raise ValueError(f"Unknown mode {mode}")
+        self.path = path
+        self.mode = mode
+        self._lock = None
+        if mode == "a":
+            os.makedirs(path, exist_ok=True)
+            self._acquire_lock()
+        elif not os.path.isdir(path):
+            raise FileNotFoundError(f"No structure store at {path}")
+
+        self._meta: List[dict] = []
+        self._rows: Dict[str, int] = {}    # name or hash -> row
+        self._coords = None                 # memmaps, refreshed on demand
+        self._numbers = None
+        self._index = None
+        self._load()
+
+    # -----------------------------
+    # Loading / consistency
+    # -----------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _acquire_lock(self):
+        """Exclusive writer lock, held until close() (or process exit)."""
+        self._lock = open(self._file(LOCK_FILE), "a")
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock.close()
+            self._lock = None
+            raise StoreBusy(f"{self.path} is open for writing in another process")
+
+    def _load(self):
+        meta_path = self._file(META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._meta.append(json.loads(line))
+                    except ValueError:
+                        break  # torn last line from an interrupted append
+
+        # Keep the longest prefix that is complete in every column
+        self._map()
+        n = min(len(self._meta), len(self._index))
+        while n and self._end(n) > min(len(self._numbers), len(self._coords)):
+            n -= 1
+        self._meta = self._meta[:n]
+
+        if self.mode == "a":
+            # Safe only under the writer lock: readers never cut another process's appends
+            self._truncate_to(len(self._meta))
+        self._n_atoms = self._end(len(self._meta))
+        for row, meta in enumerate(self._meta):
+            self._rows.setdefault(meta["name"], row)
+            self._rows.setdefault(meta["hash"], row)
+
+    def _end(self, n: int) -> int:
+        """Number of atoms stored by the first n structures."""
+        return int(self._index[n - 1]["offset"] + self._index[n - 1]["n_atoms"]) if n else 0
+
+    def _truncate_to(self, n: int):
+        """Drop bytes past the last complete structure, so appends line up again."""
+        n_atoms = self._end(n)
+        for name, size in (
+            (COORDS_FILE, n_atoms * 3 * 4),
+            (NUMBERS_FILE, n_atoms),
+            (INDEX_FILE, n * INDEX_DTYPE.itemsize),
+        ):
+            path = self._file(name)
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        meta_path = self._file(META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            if len(lines) != n:
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    f.writelines(lines[:n])
+        self._map()
+
+    def _map(self):
+        """(Re)open the memmaps over the current file sizes."""
+        def memmap(name, dtype, shape_tail=()):
+            path = self._file(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            count = size // (np.dtype(dtype).itemsize * int(np.prod(shape_tail or (1,))))
+            if count == 0:
+                return np.zeros((0,) + shape_tail, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r", shape=(count,) + shape_tail)
+
+        self._coords = memmap(COORDS_FILE, np.dtype("<f4"), (3,))
+        self._numbers = memmap(NUMBERS_FILE, np.uint8)
+        self._index = memmap(INDEX_FILE, INDEX_DTYPE)
+
+    # -----------------------------
+    # Read access
+    # -----------------------------
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def __iter__(self) -> Iterator[StoredStructure]:
+        for row in range(len(self)):
+            yield self.get(row)
+
+    def names(self) -> List[str]:
+        return [meta["name"] for meta in self._meta]
+
+    def row_of(self, key: Union[int, str]) -> int:
+        """Row of a structure given its row, name or content hash (KeyError if absent)."""
+        if isinstance(key, (int, np.integer)):
+            row = int(key) + (len(self) if key < 0 else 0)
+            if not 0 <= row < len(self):
+                raise IndexError(key)
+            return row
+        return self._rows[key]
+
+    def get(self, key: Union[int, str]) -> StoredStructure:
+        row = self.row_of(key)
+        if len(self._index) <= row:
+            self._map()  # appended since the memmaps were opened
+        record = self._index[row]
+        start, stop = int(record["offset"]), int(record["offset"] + record["n_atoms"])
+        meta = self._meta[row]
+        return StoredStructure(
+            row=row,
+            name=meta["name"],
+            hash=meta["hash"],
+            cell=np.array(record["cell"]),
+            numbers=self._numbers[start:stop],
+            frac=self._coords[start:stop],
+            metadata=meta.get("metadata", {}),
+        )
+
+    __getitem__ = get
+
+    # -----------------------------
+    # Append
+    # -----------------------------
+
+    def append(
+        self,
+        name: str,
+        cell,
+        symbols,
+        frac,
+        metadata: Optional[dict] = None,
+        skip_duplicates: bool = True,
+    ) -> int:
+        """
+        Add a structure (symbols or atomic numbers, fractional coordinates)
+        and return its row. With skip_duplicates, a name or content hash
+        already in the store returns the existing row instead.
+        """
+        if self.mode != "a":
+            raise IOError("Store opened read-only")
+        cell = np.asarray(cell, dtype=np.float64).reshape(3, 3)
+        numbers = _symbols_to_numbers(symbols)
+        frac = np.asarray(frac, dtype=np.float64).reshape(-1, 3)
+        if len(numbers) != len(frac):
+            raise ValueError(f"{len(numbers)} atom types but {len(frac)} positions")
+
+        key = content_hash(cell, numbers, frac)
+        if skip_duplicates:
+            for existing in (name, key):
+                if existing in self._rows:
+                    return self._rows[existing]
+
+        offset = self._n_atoms
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record["offset"], record["n_atoms"], record["cell"] = offset, len(numbers), cell
+
+        with open(self._file(COORDS_FILE), "ab") as f:
+            f.write(frac.astype("<f4").tobytes())
+        with open(self._file(NUMBERS_FILE), "ab") as f:
+            f.write(numbers.tobytes())
+        with open(self._file(INDEX_FILE), "ab") as f:
+            f.write(record.tobytes())
+        with open(self._file(META_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"name": name, "hash": key, "metadata": metadata or {}}) + "\n")
+
+        # The memmaps are not reopened here; get() remaps once it needs a newer row
+        self._n_atoms += len(numbers)
+        row = len(self._meta)
+        self._meta.append({"name": name, "hash": key, "metadata": metadata or {}})
+        self._rows.setdefault(name, row)
+        self._rows.setdefault(key, row)
+        return row
+
+    def append_cartesian(self, name: str, cell, symbols, positions, metadata: Optional[dict] = None, **kwargs) -> int:
+        """append() for Cartesian positions, e.g. a pcb.Framework's atom_pos."""
+        cell = np.asarray(cell, dtype=np.float64).reshape(3, 3)
+        frac = np.linalg.solve(cell.T, np.asarray(positions, dtype=np.float64).reshape(-1, 3).T).T
+        return self.append(name, cell, symbols, frac, metadata=metadata, **kwargs)
+
+    # -----------------------------
+    # CIF import / export
+    # -----------------------------
+
+    def import_cif(self, path: str, name: Optional[str] = None, metadata: Optional[dict] = None) -> int:
+        """
+        Read a CIF (first data block, .cif or .cif.gz) and append it; the
+        name defaults to the file stem. P1 files take cif_reader's fast path.
+        """
+        from cif_reader import read_cif
+
+        cif = read_cif(path)
+        name = name or os.path.basename(path).split(".")[0]
+        meta = {"source": os.path.abspath(path), **(metadata or {})}
+        return self.append(name, cif.cell, cif.symbols, cif.frac, metadata=meta)
+
+    def export_cif(
+        self,
+        key: Union[int, str],
+        out_dir: str,
+        supercell=(1, 1, 1),
+        compress: bool = False,
+    ) -> str:
+        """Write one stored structure as <out_dir>/<name>.cif and return the path."""
+        from structure_export import export_structure
+
+        s = self.get(key)
+        return export_structure(
+            s.name, s.cell, s.symbols, s.positions, [("cif", supercell)], out_dir, compress=compress
+        )[0]
+
+    # -----------------------------
+    # Context manager
+    # -----------------------------
+
+    def close(self):
+        self._coords = self._numbers = self._index = None
+        if self._lock is not None:
+            self._lock.close()  # releases the flock
+            self._lock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar COF structure store.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_import = sub.add_parser("import", help="Append CIF files to a store.")
+    p_import.add_argument("store")
+    p_import.add_argument("cifs", nargs="+")
+
+    p_export = sub.add_parser("export", help="Write stored structures as CIFs.")
+    p_export.add_argument("store")
+    p_export.add_argument("names", nargs="*", help="Names or hashes (default: all).")
+    p_export.add_argument("-o", "--output-dir", default=".")
+    p_export.add_argument("--gzip", action="store_true")
+
+    p_ls = sub.add_parser("ls", help="List stored structures.")
+    p_ls.add_argument("store")
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        with StructureStore(args.store, mode="a") as store:
+            n_before = len(store)
+            for path in args.cifs:
+                try:
+                    store.import_cif(path)
+                except Exception as e:
+                    print(f"Skipping {path}: {e}", file=sys.stderr)
+            print(f"Imported {len(store) - n_before} new structures ({len(store)} in {args.store})")
+    elif args.cmd == "export":
+        with StructureStore(args.store, mode="r") as store:
+            for key in args.names or store.names():
+                print(store.export_cif(key, args.output_dir, compress=args.gzip))
+    else:
+        with StructureStore(args.store, mode="r") as store:
+            for s in store:
+                print(f"{s.row:>8}  {len(s.numbers):>7} atoms  {s.hash[:12]}  {s.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Space-group detection and symmetry-constrained relaxation.
+
+Curated CIFs (valid_cofs/19411N2.cif: P1 setting of a 120 degree
+hexagonal cell) and pyCOFBuilder's HCB/SQL builds are highly symmetric,
+but a P1 relaxation moves every atom on its own and lets noise break the
+symmetry. constrain_symmetry() detects the space group with spglib,
+snaps the structure onto it (ase refine_symmetry) and attaches ase's
+FixSymmetry, which symmetrises forces and stress. The optimizer then only
+moves along symmetric directions: fewer effective degrees of freedom,
+and the space group is kept to symprec.
+
+The number of free parameters is the trace of the projector onto
+symmetric displacements, (1/|G|) sum_g n_fixed(g) tr(R_g) for positions
+and the same over the symmetric square of R_g for the cell, so it comes
+straight from the operations without building the projector.
+
+    info = constrain_symmetry(atoms)    # before wrapping atoms in a cell filter
+    info["spacegroup"], info["dof"], info["dof_p1"]
+
+relax.py applies it with `submit --symmetry`.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+SYMPREC = 0.01   # A, spglib tolerance
+
+
+def _spglib_cell(atoms) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.asarray(atoms.cell), atoms.get_scaled_positions(), atoms.get_atomic_numbers()
+
+
+def detect(atoms, symprec: float = SYMPREC) -> Dict[str, object]:
+    """Space group symbol, number and operations (rotations, translations) of atoms."""
+    import spglib
+
+    dataset = spglib.get_symmetry_dataset(_spglib_cell(atoms), symprec=symprec)
+    if dataset is None:
+        return {"spacegroup": "P1", "number": 1, "rotations": np.eye(3, dtype=int)[None],
+                "translations": np.zeros((1, 3))}
+    get = dataset.get if isinstance(dataset, dict) else lambda key: getattr(dataset, key)
+    return {"spacegroup": get("international"), "number": int(get("number")),
+            "rotations": np.asarray(get("rotations")), "translations": np.asarray(get("translations"))}
+
+
+def symmetric_dof(cell, frac, rotations, translations, tol: float = 1e-3) -> Tuple[int, int]:
+    """Independent (position, cell) parameters under the operations: traces of the symmetric projectors."""
+    cell = np.asarray(cell, dtype=float)
+    frac = np.asarray(frac, dtype=float)
+    # Images of every atom under every operation; an atom is fixed if it maps onto itself
+    moved = np.einsum("gij,nj->gni", rotations, frac) + translations[:, None, :] - frac[None]
+    moved -= np.round(moved)
+    fixed = (np.linalg.norm(moved @ cell, axis=2) < tol).sum(axis=1)
+    chi = np.trace(rotations, axis1=1, axis2=2)
+    chi2 = np.trace(np.einsum("gij,gjk->gik", rotations, rotations), axis1=1, axis2=2)
+    positions = float(np.mean(fixed * chi))
+    strain = float(np.mean(0.5 * (chi ** 2 + chi2)))
+    return int(round(positions)), int(round(strain))
+
+
+def constrain_symmetry(atoms, symprec: float = SYMPREC) -> Dict[str, object]:
+    """
+    Snap atoms onto their detected space group and constrain them to it
+    (in place). Returns the space group and the free parameters with and
+    without the constraint (positions + 6 cell strains in P1).
+    """
+    from ase.constraints import FixSymmetry
+    from ase.spacegroup.symmetrize import refine_symmetry
+
+    refine_symmetry(atoms, symprec=symprec)
+    found = detect(atoms, symprec)
+    atoms.set_constraint(FixSymmetry(atoms, symprec=symprec))
+    positions, strain = symmetric_dof(atoms.cell, atoms.get_scaled_positions(), found["rotations"],
+                                      found["translations"])
+    return {
+        "spacegroup": found["spacegroup"],
+        "number": found["number"],
+        "operations": len(found["rotations"]),
+        "dof": positions + strain,
+        "dof_p1": 3 * len(atoms) + 6,
+    }
+
+
+def check(atoms, info: Dict[str, object], symprec: float = SYMPREC) -> Dict[str, object]:
+    """info plus the space group found after relaxation and whether it is unchanged."""
+    final = detect(atoms, symprec)
+    return {**info, "final_spacegroup": final["spacegroup"], "kept": final["number"] == info["number"]}
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from adaptive_sampler import AdaptiveSampler
+
+
+def _trained(strategy, path=None):
+    sampler = AdaptiveSampler(path=path, strategy=strategy, epsilon=0.0)
+    for _ in range(40):
+        sampler.update({"core": ["good"]}, success=True)
+        sampler.update({"core": ["bad"]}, success=False)
+    return sampler
+
+
+@pytest.mark.parametrize("strategy", ["thompson", "ucb"])
+def test_prefers_the_arm_that_builds(strategy):
+    sampler = _trained(strategy)
+    rng = random.Random(0)
+    picks = [sampler.choose("core", ["bad", "good"], rng=rng) for _ in range(200)]
+    assert picks.count("good") > 180
+
+
+def test_ucb_tries_unseen_arms_first():
+    sampler = _trained("ucb")
+    assert sampler.choose("core", ["good", "bad", "new"]) == "new"
+
+
+def test_success_rate_and_repeated_arms():
+    sampler = AdaptiveSampler(path=None)
+    sampler.update({"r_group": ["H", "H", "CH3"]}, success=True)
+    assert sampler.stats["r_group"] == {"H": [1, 0], "CH3": [1, 0]}
+    assert sampler.success_rate("r_group", "H") == pytest.approx(2 / 3)
+    assert sampler.success_rate("r_group", "NH2") == pytest.approx(0.5)
+
+
+def test_uniform_ignores_statistics():
+    sampler = _trained("uniform")
+    rng = random.Random(0)
+    picks = [sampler.choose("core", ["bad", "good"], rng=rng) for _ in range(400)]
+    assert 150 < picks.count("good") < 250
+
+
+def test_stats_persist(tmp_path):
+    path = str(tmp_path / "stats.json")
+    _trained("thompson", path).save()
+    assert AdaptiveSampler(path).stats == {"core": {"good": [40, 0], "bad": [0, 40]}}
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        AdaptiveSampler(path=None, strategy="greedy")
+    with pytest.raises(ValueError):
+        AdaptiveSampler(path=None).choose("core", [])
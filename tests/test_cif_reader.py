@@ -0,0 +1,63 @@
+import gzip
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from cif_reader import CifFormatError, read_cif, read_p1_cif
+
+ase_io = pytest.importorskip("ase.io")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(ROOT, "valid_cofs", "19411N2.cif")
+
+SYMMETRIC = """data_NaCl
+_cell_length_a 5.64
+_cell_length_b 5.64
+_cell_length_c 5.64
+_cell_angle_alpha 90
+_cell_angle_beta 90
+_cell_angle_gamma 90
+_symmetry_space_group_name_H-M 'F m -3 m'
+_symmetry_Int_Tables_number 225
+loop_
+_atom_site_label
+_atom_site_type_symbol
+_atom_site_fract_x
+_atom_site_fract_y
+_atom_site_fract_z
+Na1 Na 0.0 0.0 0.0
+Cl1 Cl 0.5 0.5 0.5
+"""
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_matches_ase(mmap):
+    cif = read_p1_cif(SAMPLE, mmap=mmap)
+    atoms = ase_io.read(SAMPLE)
+    np.testing.assert_allclose(cif.cell, np.asarray(atoms.cell), atol=1e-6)
+    assert cif.symbols.tolist() == atoms.get_chemical_symbols()
+    delta = cif.frac - atoms.get_scaled_positions(wrap=False)
+    np.testing.assert_allclose(delta - np.round(delta), 0.0, atol=1e-6)
+
+
+def test_gzip_is_transparent(tmp_path):
+    path = str(tmp_path / "19411N2.cif.gz")
+    with open(SAMPLE, "rb") as src, gzip.open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    plain, packed = read_cif(SAMPLE), read_cif(path)
+    np.testing.assert_array_equal(plain.frac, packed.frac)
+    assert plain.symbols.tolist() == packed.symbols.tolist()
+
+
+def test_symmetric_files_fall_back_to_ase(tmp_path):
+    path = str(tmp_path / "nacl.cif")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SYMMETRIC)
+    with pytest.raises(CifFormatError):
+        read_p1_cif(path)
+    with pytest.raises(CifFormatError):
+        read_cif(path, fallback=False)
+    cif = read_cif(path)
+    assert sorted(cif.symbols.tolist()) == ["Cl"] * 4 + ["Na"] * 4
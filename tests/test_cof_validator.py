@@ -0,0 +1,47 @@
+import pytest
+
+from cof_validator import NameValidator
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return NameValidator()
+
+
+@pytest.mark.parametrize("name", [
+    "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AA",
+    "S4_PORP_CHO_H_H-L2_BDTP_NH2_CN_H-SQL_A-AB1",
+    "T3_TRZN_BOH2-T3_BENZ_BOH2_H-HCB-AA",
+    "T3_BENZ_CHO-L2_BENZ_NH2-HCB_A-AA",        # R groups may be left out
+])
+def test_accepts_catalog_names(validator, name):
+    assert validator.validate(name) == (True, None)
+
+
+@pytest.mark.parametrize("name, reason", [
+    ("T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A", "form BB1-BB2-NET-STACKING"),
+    ("T3_BENZ_CHO_H-L2_BENZ_NH2_H-XYZ-AA", "unknown net"),
+    ("T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-7", "stacking 7"),
+    ("T3_BENZ_CHO_H-L2_BENZ_NH2_H-DIA_A-AA", "stacking AA"),
+    ("Q9_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-AA", "unknown symmetry Q9"),
+    ("T3_NAPT_CHO_H-L2_BENZ_NH2_H-HCB_A-AA", "core NAPT does not exist with T3"),
+    ("T3_BENZ_XYZ_H-L2_BENZ_NH2_H-HCB_A-AA", "unknown connector XYZ"),
+    ("T3_BENZ_CHO_Foo-L2_BENZ_NH2_H-HCB_A-AA", "unknown functional group Foo"),
+    ("T3_BENZ_CHO_H_H-L2_BENZ_NH2_H-HCB_A-AA", "2 R groups given but core BENZ has 1 R sites"),
+    ("L2_BENZ_NH2_H-T3_BENZ_CHO_H-HCB_A-AA", "needs connectivity (3, 2)"),
+])
+def test_rejects_with_reason(validator, name, reason):
+    ok, message = validator.validate(name)
+    assert not ok
+    assert reason in message
+
+
+def test_r_site_counts_come_from_the_smiles(validator):
+    assert validator.r_site_count("T3", "BENZ") == 1
+    assert validator.r_site_count("L2", "BENZ") == 2
+    assert validator.r_site_count("T3", "DBA1") == 3
+
+
+def test_validate_many_matches_validate(validator):
+    names = ["T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AA", "T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A"]
+    assert validator.validate_many(names) == [(name, *validator.validate(name)) for name in names]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from descriptors import PROBE_RADIUS, accessible_surface_area, density, describe, distance_grid, void_fractions
+
+pytest.importorskip("scipy")
+from ase.data import atomic_masses, atomic_numbers, vdw_radii  # noqa: E402
+
+# One carbon atom in a box: every descriptor has a closed form
+CELL = np.diag([12.0, 12.0, 12.0])
+FRAC = np.array([[0.3, 0.4, 0.5]])
+R_C = vdw_radii[atomic_numbers["C"]]
+
+
+def _sphere(r):
+    return 4.0 / 3.0 * np.pi * r ** 3
+
+
+def test_exact_distance_grid_in_a_long_thin_cell():
+    # Far points need several doublings of the search radius (the inscribed radius is 1.5 A)
+    cell = np.diag([30.0, 3.0, 3.0])
+    frac = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5]])
+    grid, dist = distance_grid(cell, ["C", "O"], frac, spacing=0.5)
+    _, reference = distance_grid(cell, ["C", "O"], frac, spacing=0.5, reach=30.0)
+    assert np.all(np.isfinite(dist))
+    np.testing.assert_allclose(dist, reference)
+
+
+def test_density():
+    volume_cm3 = 12.0 ** 3 * 1e-24
+    assert density(CELL, ["C"]) == pytest.approx(atomic_masses[6] * 1.66053907e-24 / volume_cm3)
+
+
+def test_void_fractions_of_an_isolated_atom():
+    vf = void_fractions(CELL, ["C"], FRAC, spacing=0.3)
+    assert vf["av"] == pytest.approx(1 - _sphere(R_C + PROBE_RADIUS) / 12.0 ** 3, abs=2e-3)
+    assert vf["poav"] == pytest.approx(1 - _sphere(R_C) / 12.0 ** 3, abs=2e-3)
+
+
+def test_surface_area_of_an_isolated_atom():
+    assert accessible_surface_area(CELL, ["C"], FRAC) == pytest.approx(4 * np.pi * (R_C + PROBE_RADIUS) ** 2)
+
+
+def test_closed_packing_has_no_accessible_volume():
+    # Atoms 1.5 A apart leave no room for a 1.86 A probe
+    frac = np.indices((2, 2, 2)).reshape(3, -1).T / 2
+    vf = void_fractions(np.diag([3.0, 3.0, 3.0]), ["C"] * 8, frac)
+    assert vf == {"av": 0.0, "poav": 0.0}
+
+
+def test_describe_keys_and_units():
+    d = describe(CELL, ["C"], positions=FRAC @ CELL, spacing=0.5)
+    assert d["Unitcell_volume"] == pytest.approx(12.0 ** 3)
+    assert d["AV_A^3"] == pytest.approx(d["AV_Volume_fraction"] * 12.0 ** 3)
+    assert d["POAV_A^3"] > d["AV_A^3"]
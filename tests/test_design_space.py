@@ -0,0 +1,79 @@
+import pytest
+
+from design_space import DesignSpace, Permutation
+
+BLOCKS = {
+    2: ["L2_BENZ_NH2_H", "L2_NAPT_NH2_H", "L2_ANTR_NH2_H"],
+    3: ["T3_BENZ_CHO_H", "T3_TRZN_CHO", "T3_TPAM_CHO_H", "T3_BRZN_CHO_H"],
+    4: ["S4_PORP_CHO_H_H", "S4_PHPR_CHO_H"],
+}
+RULES = {"HCB": (3, 3), "HCB_A": (3, 2), "SQL_A": (4, 2)}
+STACKINGS = {"HCB": ["AA", "AB1"], "HCB_A": ["AA"], "SQL_A": ["AA", "AB1", "AB2"]}
+
+
+@pytest.fixture
+def space():
+    return DesignSpace(BLOCKS, RULES, STACKINGS)
+
+
+def test_size(space):
+    # HCB: unordered pairs of distinct T3 blocks
+    assert space.size_by_topology() == {"HCB": 6 * 2, "HCB_A": 4 * 3, "SQL_A": 2 * 3 * 3}
+    assert len(space) == 42
+
+
+def test_decode_index_of_round_trip(space):
+    names = list(space)
+    assert len(set(names)) == len(space)
+    for index, name in enumerate(names):
+        assert space.index_of(name) == index
+    assert space[-1] == names[-1]
+
+
+def test_same_connectivity_pairs_are_unordered(space):
+    name = space.index_of("T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA")
+    assert name == space.index_of("T3_BENZ_CHO_H-T3_TRZN_CHO-HCB-AA")
+
+
+@pytest.mark.parametrize("name", [
+    "T3_BENZ_CHO_H-T3_BENZ_CHO_H-HCB-AA",      # same block twice
+    "T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-AB1",   # stacking not offered for the net
+    "T3_BENZ_CHO_H-L2_PYRN_NH2_H-HCB_A-AA",    # unknown block
+    "T3_BENZ_CHO_H-L2_BENZ_NH2_H-KGD-AA",      # topology not in the space
+    "not-a-name",
+])
+def test_index_of_rejects_names_outside(space, name):
+    with pytest.raises(ValueError):
+        space.index_of(name)
+
+
+def test_index_out_of_range(space):
+    with pytest.raises(IndexError):
+        space[len(space)]
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 64, 1000, 4097])
+def test_permutation_is_a_bijection(n):
+    perm = Permutation(n, seed=3)
+    assert sorted(perm[i] for i in range(n)) == list(range(n))
+
+
+def test_permutation_depends_on_seed():
+    a = [Permutation(1000, seed=1)[i] for i in range(1000)]
+    b = [Permutation(1000, seed=2)[i] for i in range(1000)]
+    assert a != b
+    assert a == [Permutation(1000, seed=1)[i] for i in range(1000)]
+
+
+def test_shards_partition_the_space(space):
+    for seed in (None, 5):
+        shards = [list(space.shard(i, 4, seed=seed)) for i in range(4)]
+        merged = [name for shard in shards for name in shard]
+        assert sorted(merged) == sorted(space)
+
+
+def test_sample_without_replacement(space):
+    names = space.sample(len(space), seed=9)
+    assert sorted(names) == sorted(space)
+    with pytest.raises(ValueError):
+        space.sample(len(space) + 1)
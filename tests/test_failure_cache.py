@@ -0,0 +1,60 @@
+import json
+import time
+
+import pytest
+
+from failure_cache import FailureCache, canonical_key, classify_error
+
+CLASH = "Atoms 3 and 7 are closer than 0.8 A"
+
+
+def test_canonical_key_sorts_interchangeable_blocks():
+    # HCB and SQL take two blocks of the same connectivity: order does not matter
+    assert canonical_key("T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA") == ("T3_BENZ_CHO_H", "T3_TRZN_CHO", "HCB", "AA")
+    assert canonical_key("T3_BENZ_CHO_H-T3_TRZN_CHO-HCB-AA") == ("T3_BENZ_CHO_H", "T3_TRZN_CHO", "HCB", "AA")
+    # HCB_A needs (T3, L2): the order is part of the name
+    assert canonical_key("T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-AA") == ("T3_BENZ_CHO_H", "L2_BENZ_NH2_H", "HCB_A", "AA")
+
+
+def test_canonical_key_rejects_malformed_names():
+    with pytest.raises(ValueError):
+        canonical_key("T3_BENZ_CHO_H-HCB-AA")
+
+
+def test_only_deterministic_errors_are_recorded(tmp_path):
+    cache = FailureCache(tmp_path / "failed.jsonl", pcb_version="1.0")
+    assert cache.record("T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA", CLASH) == "atoms_too_close"
+    assert cache.record("T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-AA", "disk full") is None
+    assert classify_error(None) == "other"
+    assert cache.is_known_bad("T3_BENZ_CHO_H-T3_TRZN_CHO-HCB-AA")   # canonical order
+    assert not cache.is_known_bad("T3_BENZ_CHO_H-L2_BENZ_NH2_H-HCB_A-AA")
+    assert len(FailureCache(tmp_path / "failed.jsonl", pcb_version="1.0")) == 1
+
+
+def test_entries_of_another_version_are_ignored(tmp_path):
+    path = tmp_path / "failed.jsonl"
+    FailureCache(path, pcb_version="1.0").record("T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA", CLASH)
+    assert len(FailureCache(path, pcb_version="1.0")) == 1
+    assert len(FailureCache(path, pcb_version="2.0")) == 0
+
+
+def test_ttl_expires_entries(tmp_path, monkeypatch):
+    path = tmp_path / "failed.jsonl"
+    name = "T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA"
+    FailureCache(path, pcb_version="1.0").record(name, CLASH)
+
+    assert FailureCache(path, ttl_s=60, pcb_version="1.0").is_known_bad(name)
+    cache = FailureCache(path, ttl_s=60, pcb_version="1.0")
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert not cache.is_known_bad(name)                                   # expired in memory
+    assert len(FailureCache(path, ttl_s=60, pcb_version="1.0")) == 0    # and on load
+    assert len(FailureCache(path, ttl_s=None, pcb_version="1.0")) == 1
+
+
+def test_torn_lines_are_skipped(tmp_path):
+    path = tmp_path / "failed.jsonl"
+    FailureCache(path, pcb_version="1.0").record("T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA", CLASH)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": ["a", "b", "HCB", "AA"]})[:20])
+    assert len(FailureCache(path, pcb_version="1.0")) == 1
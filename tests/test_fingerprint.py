@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pytest
+
+from fingerprint import FingerprintIndex, cells_match, fingerprint, reduced_formula
+
+pytest.importorskip("scipy")
+
+CELL = np.array([[9.0, 0.0, 0.0], [-4.5, 7.794, 0.0], [0.0, 0.0, 3.6]])
+SYMBOLS = ["C"] * 6 + ["N"] * 2 + ["H"] * 4
+
+
+def _frac(seed=0):
+    return np.random.default_rng(seed).random((len(SYMBOLS), 3))
+
+
+def _doubled(frac):
+    """The 2x1x1 supercell: (cell, symbols, frac)."""
+    images = np.array([[0, 0, 0], [1, 0, 0]])
+    return CELL * [[2], [1], [1]], SYMBOLS * 2, ((frac[None] + images[:, None]) / [2, 1, 1]).reshape(-1, 3)
+
+
+def test_reduced_formula():
+    assert reduced_formula(SYMBOLS) == "C3H2N"
+
+
+def test_supercell_with_shuffled_atoms_is_a_duplicate():
+    frac = _frac()
+    index = FingerprintIndex(path=None)
+    index.add("unit", fingerprint(CELL, SYMBOLS, frac))
+
+    cell, symbols, big_frac = _doubled(frac)
+    order = np.random.default_rng(1).permutation(len(big_frac))
+    big = fingerprint(cell, symbols, big_frac)
+    shuffled = fingerprint(cell, [symbols[k] for k in order], big_frac[order])
+
+    assert index.duplicate_of(big) == "unit"
+    assert index.duplicate_of(shuffled) == "unit"
+    assert index.duplicate_of(big, exclude="unit") is None
+
+
+def test_different_structures_are_not_duplicates():
+    index = FingerprintIndex(path=None)
+    index.add("unit", fingerprint(CELL, SYMBOLS, _frac()))
+    assert index.duplicate_of(fingerprint(CELL, SYMBOLS, _frac(seed=2))) is None
+    assert index.duplicate_of(fingerprint(1.2 * CELL, SYMBOLS, _frac())) is None
+
+
+def test_index_persists(tmp_path):
+    path = str(tmp_path / "fingerprints.jsonl")
+    fp = fingerprint(CELL, SYMBOLS, _frac())
+    FingerprintIndex(path).add("unit", fp)
+    reloaded = FingerprintIndex(path)
+    assert "unit" in reloaded
+    assert reloaded.duplicate_of(fp) == "unit"
+
+
+def test_same_volume_but_other_cell_is_not_a_duplicate():
+    frac = _frac()
+    index = FingerprintIndex(path=None)
+    index.add("unit", fingerprint(CELL, SYMBOLS, frac))
+    # Same formula and volume per atom, cell stretched along a and squeezed along b
+    other = fingerprint(CELL * [[1.1], [1 / 1.1], [1.0]], SYMBOLS, frac)
+    assert not cells_match(other, index.entries["unit"])
+    assert index.duplicate_of(other) is None
+
+
+def test_scan_forgets_deleted_files(tmp_path):
+    from structure_export import export_structure
+
+    lib = str(tmp_path / "lib")
+    frac = _frac()
+    (unit,) = export_structure("a", CELL, SYMBOLS, frac @ CELL, ["cif"], lib)
+    cell, symbols, big_frac = _doubled(frac)
+    (big,) = export_structure("b", cell, symbols, big_frac @ cell, ["cif"], lib)
+    cache = str(tmp_path / "fingerprints.jsonl")
+    assert FingerprintIndex(cache).scan([lib]) == [(big, unit)]
+
+    os.remove(unit)
+    assert FingerprintIndex(cache).scan([lib]) == []
+    assert list(FingerprintIndex(cache).entries) == [big]
+
+
+@pytest.mark.parametrize("vpa", [40.0, 80.9, 500.0])
+@pytest.mark.parametrize("ratio", [1.02, 0.98, 1.029, 0.971])
+def test_volume_per_atom_tolerance_holds_for_large_volumes(vpa, ratio):
+    # Same structure, only the volume per atom differs (within VPA_TOL, relative)
+    fp = fingerprint(CELL, SYMBOLS, _frac())
+    index = FingerprintIndex(path=None)
+    index.add("indexed", fp._replace(volume_per_atom=vpa))
+    assert index.duplicate_of(fp._replace(volume_per_atom=vpa * ratio)) == "indexed"
+    assert index.duplicate_of(fp._replace(volume_per_atom=vpa * 1.04)) is None
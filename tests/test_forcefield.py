@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from forcefield import UFFCalculator, build_topology, prerelax
+
+pytest.importorskip("scipy")
+fd = pytest.importorskip("ase.calculators.fd")
+from ase.build import molecule  # noqa: E402
+
+
+@pytest.fixture
+def atoms():
+    # Pyridine in a small periodic box, so LJ acts between images too
+    atoms = molecule("C5H5N")
+    atoms.set_cell([[9.0, 0.0, 0.0], [1.0, 8.5, 0.0], [0.5, 0.7, 6.5]])
+    atoms.center()
+    atoms.pbc = True
+    atoms.rattle(0.05, seed=1)
+    atoms.calc = UFFCalculator()
+    return atoms
+
+
+def test_topology_of_an_aromatic_ring(atoms):
+    topology = build_topology(atoms.cell, atoms.get_chemical_symbols(), atoms.positions)
+    assert sorted(topology.types.tolist()) == ["C_R"] * 5 + ["H_"] * 5 + ["N_R"]
+    assert len(topology.bonds) == 11                 # 6 in the ring + 5 C-H
+    assert len(topology.angles) == 6 + 2 * 5         # one per ring atom + two per C-H
+
+
+def test_forces_are_the_energy_gradient(atoms):
+    numerical = fd.calculate_numerical_forces(atoms, eps=1e-5)
+    np.testing.assert_allclose(atoms.get_forces(), numerical, atol=1e-4)
+
+
+def test_stress_is_the_strain_derivative(atoms):
+    numerical = fd.calculate_numerical_stress(atoms, eps=1e-6)
+    np.testing.assert_allclose(atoms.get_stress(), numerical, atol=1e-5)
+
+
+def test_prerelax_lowers_energy_and_forces(atoms):
+    stats = prerelax(atoms, fmax=0.1, steps=500)
+    assert stats["energy_end"] < stats["energy_start"]
+    assert stats["fmax_end"] <= 0.1 < stats["fmax_start"]
+    assert atoms.calc is None
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from neighbors import neighbor_list
+
+ase_neighborlist = pytest.importorskip("ase.neighborlist")
+from ase import Atoms  # noqa: E402
+
+
+def _pairs(i, j, shift):
+    return sorted(zip(i.tolist(), j.tolist(), map(tuple, np.asarray(shift).tolist())))
+
+
+@pytest.mark.parametrize("cutoff", [1.5, 3.0, 6.5])
+def test_matches_ase_on_a_triclinic_cell(cutoff):
+    rng = np.random.default_rng(0)
+    cell = np.array([[4.1, 0.0, 0.0], [-1.9, 3.6, 0.0], [0.8, 1.1, 3.3]])   # skewed, no right angles
+    frac = rng.random((25, 3)) * 1.4 - 0.2                                # some atoms outside the cell
+    atoms = Atoms("C25", scaled_positions=frac, cell=cell, pbc=True)
+    # ase wraps scaled_positions on construction; compare on the same (unwrapped) coordinates
+    atoms.positions = frac @ cell
+
+    i, j, d, shift = neighbor_list(cell, frac, cutoff=cutoff)
+    ai, aj, ad, ashift = ase_neighborlist.neighbor_list("ijdS", atoms, cutoff)
+
+    assert _pairs(i, j, shift) == _pairs(ai, aj, ashift)
+    order, ase_order = np.lexsort((shift.T.tolist() + [j, i])), np.lexsort((ashift.T.tolist() + [aj, ai]))
+    np.testing.assert_allclose(d[order], ad[ase_order], atol=1e-9)
+    np.testing.assert_allclose(np.linalg.norm(frac[j] @ cell + shift @ cell - frac[i] @ cell, axis=1), d, atol=1e-9)
+
+
+def test_atom_sees_its_own_images():
+    cell = np.diag([2.0, 10.0, 10.0])
+    i, j, d, shift = neighbor_list(cell, [[0.0, 0.0, 0.0]], cutoff=2.5)
+    assert _pairs(i, j, shift) == [(0, 0, (-1, 0, 0)), (0, 0, (1, 0, 0))]
+    np.testing.assert_allclose(d, 2.0)
+
+
+def test_cartesian_input_and_empty_cell():
+    cell = np.diag([5.0, 5.0, 5.0])
+    frac = np.array([[0.1, 0.1, 0.1], [0.3, 0.1, 0.1]])
+    by_frac = neighbor_list(cell, frac, cutoff=1.2)
+    by_pos = neighbor_list(cell, positions=frac @ cell, cutoff=1.2)
+    assert _pairs(by_frac[0], by_frac[1], by_frac[3]) == _pairs(by_pos[0], by_pos[1], by_pos[3])
+    assert len(neighbor_list(cell, np.zeros((0, 3)), cutoff=3.0)[0]) == 0
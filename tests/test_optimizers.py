@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from optimizers import TrustRegionBFGS, make_optimizer
+
+pytest.importorskip("ase")
+from ase.build import bulk  # noqa: E402
+from ase.calculators.emt import EMT  # noqa: E402
+
+
+def _strained_copper():
+    atoms = bulk("Cu", "fcc", a=3.75, cubic=True).repeat((2, 1, 1))
+    atoms.rattle(0.1, seed=3)
+    atoms.calc = EMT()
+    return atoms
+
+
+def _filtered(atoms):
+    from relax import cell_filter
+
+    return cell_filter(atoms)
+
+
+def test_relaxes_positions_and_cell():
+    atoms = _strained_copper()
+    start = atoms.get_potential_energy()
+    opt = TrustRegionBFGS(_filtered(atoms), logfile=None)
+    assert opt.run(fmax=0.01, steps=200)
+    assert atoms.get_potential_energy() < start
+    assert np.sqrt((_filtered(atoms).get_forces() ** 2).sum(axis=1)).max() < 0.01
+    # EMT copper relaxes to a = 3.59 A
+    assert atoms.cell.cellpar()[1] == pytest.approx(3.59, abs=0.02)
+
+
+def test_steps_stay_inside_the_trust_region():
+    atoms = _strained_copper()
+    opt = TrustRegionBFGS(atoms, logfile=None, maxstep=0.05)
+    before = atoms.get_positions()
+    opt.run(fmax=0.01, steps=1)
+    assert np.linalg.norm(atoms.get_positions() - before, axis=1).max() <= 0.05 + 1e-9
+
+
+def test_make_optimizer():
+    atoms = _strained_copper()
+    assert isinstance(make_optimizer("trust", atoms, None), TrustRegionBFGS)
+    with pytest.raises(ValueError):
+        make_optimizer("lbfgs", atoms, None)
+
+
+def test_restart_file_resumes_the_relaxation(tmp_path):
+    atoms = _strained_copper()
+    TrustRegionBFGS(_filtered(atoms), logfile=None).run(fmax=1e-4, steps=6)
+    reference = atoms.get_positions()
+
+    restart = str(tmp_path / "trust.json")
+    atoms = _strained_copper()
+    filtered = _filtered(atoms)
+    TrustRegionBFGS(filtered, restart=restart, logfile=None).run(fmax=1e-4, steps=3)
+    saved = filtered.get_positions()
+
+    atoms = _strained_copper()
+    filtered = _filtered(atoms)
+    filtered.set_positions(saved)
+    opt = TrustRegionBFGS(filtered, restart=restart, logfile=None)
+    assert opt.H is not None and opt.pos0 is not None
+    opt.run(fmax=1e-4, steps=3)
+    np.testing.assert_allclose(atoms.get_positions(), reference, atol=1e-8)
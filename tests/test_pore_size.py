@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from descriptors import distance_grid
+from pore_size import PoreSizeCache, percolating_axes, pore_size_distribution, pore_sizes
+
+pytest.importorskip("scipy")
+from ase.data import atomic_numbers, vdw_radii  # noqa: E402
+
+# One carbon atom per 10 A cube: the largest cavity is centred on the body
+# diagonal, and the widest channel along each axis runs through a face centre
+CELL = np.diag([10.0, 10.0, 10.0])
+FRAC = np.array([[0.0, 0.0, 0.0]])
+R_C = vdw_radii[atomic_numbers["C"]]
+
+
+@pytest.fixture(scope="module")
+def pores():
+    return pore_sizes(CELL, ["C"], FRAC)
+
+
+def test_lcd_and_pld(pores):
+    assert pores.lcd == pytest.approx(2 * (5 * np.sqrt(3) - R_C), abs=1.0)
+    for pld in pores.pld:
+        assert pld == pytest.approx(2 * (5 * np.sqrt(2) - R_C), abs=1.0)
+        assert pld < pores.lcd
+
+
+def test_psd_covers_the_void_volume(pores):
+    assert pores.psd.sum() == pytest.approx(1 - 4 / 3 * np.pi * R_C ** 3 / 1000, abs=0.01)
+    assert pores.psd_edges[np.flatnonzero(pores.psd)[-1]] <= pores.lcd
+    assert np.all(pores.psd >= 0)
+
+
+def test_psd_matches_a_brute_force_sweep():
+    cell = np.array([[8.0, 0.0, 0.0], [-4.0, 4.0 * np.sqrt(3), 0.0], [0.0, 0.0, 4.0]])
+    frac = np.array([[0.0, 0.0, 0.0], [1 / 3, 2 / 3, 0.5]])
+    grid, dist = distance_grid(cell, ["C", "N"], frac, spacing=0.8)
+    edges, psd = pore_size_distribution(cell, grid, dist, bin_width=0.5)
+
+    # Largest bin lower edge whose sphere (radius edge / 2, centred on a grid point at least
+    # that deep) reaches the point, over all periodic images
+    images = np.stack(np.meshgrid(*[np.arange(-1, 2)] * 3, indexing="ij"), -1).reshape(-1, 3)
+    delta = grid[:, None, :] - grid[None, :, :]
+    pair = np.linalg.norm((delta[:, :, None, :] + images) @ cell, axis=-1).min(axis=2)
+    covering = np.zeros(len(grid))
+    for lower in edges[1:-1]:
+        reached = ((pair <= lower / 2) & (dist[None, :] >= lower / 2)).any(axis=1)
+        covering[reached] = lower
+    expected, _ = np.histogram(covering[dist > 0], bins=edges)
+    np.testing.assert_allclose(psd, expected / len(grid))
+    assert psd.sum() == pytest.approx(np.mean(dist > 0))
+
+
+def test_percolation_along_a_channel():
+    grid = np.zeros((6, 6, 6), dtype=bool)
+    grid[:, 2:4, 2:4] = True                     # open channel along a
+    assert percolating_axes(grid) == (True, False, False)
+    grid[:, 2:4, 2:4] = False
+    grid[1:4, 1:4, 1:4] = True                   # closed cavity
+    assert percolating_axes(grid) == (False, False, False)
+
+
+def test_cache_round_trip(tmp_path, pores):
+    path = str(tmp_path / "pores.jsonl")
+    cache = PoreSizeCache(path)
+    cached = cache.pore_sizes(CELL, ["C"], FRAC)
+    assert cached.to_dict() == pores.to_dict()
+    # the same structure with its atom moved by a lattice vector hits the cache
+    again = PoreSizeCache(path)
+    assert len(again) == 1
+    assert again.pore_sizes(CELL, ["C"], FRAC + [1, 0, 0]).to_dict() == cached.to_dict()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from registry import NotSingleLayer, RegistryRejected, apply_registry, layers, registry_cell, scan
+
+pytest.importorskip("scipy")
+
+# One graphene sheet per cell (gamma = 120): graphite stacks AB, one C over the ring centre, at ~3.4 A
+A = 2.46
+GRAPHENE = np.array([[A, 0.0, 0.0], [-A / 2, A * np.sqrt(3) / 2, 0.0], [0.0, 0.0, 10.0]])
+FRAC = np.array([[1 / 3, 2 / 3, 0.5], [2 / 3, 1 / 3, 0.5]])
+
+
+@pytest.fixture(scope="module")
+def graphene():
+    return scan(GRAPHENE, ["C", "C"], FRAC, slips=6)
+
+
+def test_graphene_stacks_ab(graphene):
+    assert graphene.slip in ((1 / 3, 2 / 3), (2 / 3, 1 / 3))
+    assert 3.2 <= graphene.spacing <= 3.6
+    assert graphene.energy < graphene.aa_energy < 0
+    assert graphene.surface.shape == (6, 6, len(graphene.spacings))
+
+
+def test_registry_cell():
+    cell = registry_cell(GRAPHENE, (0.5, 0.25), 3.3)
+    np.testing.assert_allclose(cell[:2], GRAPHENE[:2])
+    np.testing.assert_allclose(cell[2], 0.5 * GRAPHENE[0] + 0.25 * GRAPHENE[1] + [0.0, 0.0, 3.3])
+
+
+def test_layers_are_counted_and_made_whole():
+    # Graphene shifted so that its C-C bond crosses the cell boundary
+    n_layers, whole = layers(GRAPHENE, ["C", "C"], (FRAC + [0.57, -0.17, 0.0]) @ GRAPHENE)
+    assert n_layers == 1
+    assert np.linalg.norm(whole[1] - whole[0]) == pytest.approx(A / np.sqrt(3))
+
+    graphite = GRAPHENE * [[1], [1], [0.67]]
+    two = np.vstack([[1 / 3, 2 / 3, 0.25], [2 / 3, 1 / 3, 0.25], [0.0, 0.0, 0.75], [1 / 3, 2 / 3, 0.75]])
+    assert layers(graphite, ["C"] * 4, two @ graphite)[0] == 2
+    with pytest.raises(NotSingleLayer):
+        scan(graphite, ["C"] * 4, two, slips=4)
+
+    # Diamond is bonded along c: not a stack of layers
+    from ase.build import bulk
+
+    diamond = bulk("C", "diamond", a=3.57, cubic=True)
+    assert layers(diamond.cell, diamond.get_chemical_symbols(), diamond.positions)[0] == 0
+
+
+def test_overlapping_registries_are_rejected():
+    from ase import Atoms
+
+    # A "layer" of carbon chains 6 A thick along the normal: at 3-4.2 A the layers interpenetrate
+    atoms = Atoms("C5", positions=[[0.0, 0.0, 1.5 * k] for k in range(5)], cell=[3.0, 3.0, 20.0], pbc=True)
+    with pytest.raises(RegistryRejected):
+        apply_registry(atoms)
+    np.testing.assert_allclose(atoms.cell[2], [0, 0, 20])
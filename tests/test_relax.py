@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from relax import JOB_FILE, LOCK_FILE, JobBusy, _locked, _read_json, job_dirs, pending_jobs, submit
+
+ase_io = pytest.importorskip("ase.io")
+from ase.build import bulk  # noqa: E402
+
+
+@pytest.fixture
+def cif(tmp_path):
+    path = str(tmp_path / "Cu.cif")
+    ase_io.write(path, bulk("Cu", "fcc", a=3.6, cubic=True))
+    return path
+
+
+def test_submit_queues_a_job_once(tmp_path, cif):
+    root = str(tmp_path / "runs")
+    job_dir = submit(cif, root=root, fmax=0.1)
+    job = _read_json(os.path.join(job_dir, JOB_FILE))
+    assert job["status"] == "queued"
+    assert job["settings"]["fmax"] == 0.1
+    assert os.path.exists(os.path.join(job_dir, job["input"]))
+
+    assert submit(cif, root=root, fmax=0.5) == job_dir      # existing jobs are left alone
+    assert _read_json(os.path.join(job_dir, JOB_FILE))["settings"]["fmax"] == 0.1
+    assert job_dirs(root) == [job_dir]
+    assert pending_jobs(root) == [job_dir]
+
+
+def test_lock_is_exclusive_and_taken_over_from_dead_runners(tmp_path, cif):
+    job_dir = submit(cif, root=str(tmp_path / "runs"))
+    with _locked(job_dir):
+        with pytest.raises(JobBusy):
+            with _locked(job_dir):
+                pass
+    assert not os.path.exists(os.path.join(job_dir, LOCK_FILE))
+
+    with open(os.path.join(job_dir, LOCK_FILE), "w") as f:
+        f.write("999999999")                               # no such process
+    with _locked(job_dir):
+        pass
+
+
+def _relaxing_copper():
+    from ase.calculators.emt import EMT
+    from ase.optimize import BFGS
+
+    from relax import cell_filter
+
+    atoms = bulk("Cu", "fcc", a=3.7, cubic=True).repeat((2, 1, 1))
+    atoms.rattle(0.05, seed=2)
+    atoms.calc = EMT()
+    filtered = cell_filter(atoms)
+    return atoms, filtered, BFGS(filtered, logfile=None)
+
+
+def test_checkpoint_resumes_the_same_trajectory(tmp_path):
+    from relax import load_checkpoint, save_checkpoint
+
+    atoms, _, opt = _relaxing_copper()
+    opt.run(fmax=1e-4, steps=8)
+    reference = atoms.get_positions()
+
+    atoms, filtered, opt = _relaxing_copper()
+    opt.run(fmax=1e-4, steps=4)
+    path = str(tmp_path / "checkpoint.npz")
+    save_checkpoint(path, opt, filtered, frames=4)
+
+    atoms, filtered, opt = _relaxing_copper()
+    assert load_checkpoint(path, opt, filtered) == 4
+    assert opt.nsteps == 4
+    opt.run(fmax=1e-4, steps=4)
+    np.testing.assert_allclose(atoms.get_positions(), reference, atol=1e-8)
@@ -0,0 +1,38 @@
+from rng_streams import candidate_rng, candidate_seed
+
+
+def _draws(rng, n=20):
+    return [rng.random() for _ in range(n)]
+
+
+def test_same_seed_and_index_give_the_same_stream():
+    assert _draws(candidate_rng(42, 7)) == _draws(candidate_rng(42, 7))
+
+
+def test_streams_do_not_depend_on_draw_order():
+    forward = {k: _draws(candidate_rng(42, k)) for k in range(50)}
+    backward = {k: _draws(candidate_rng(42, k)) for k in reversed(range(50))}
+    assert forward == backward
+
+
+def test_streams_differ_by_index_seed_and_name():
+    seeds = {candidate_seed(42, k) for k in range(1000)}
+    assert len(seeds) == 1000
+    assert candidate_seed(42, 0) != candidate_seed(43, 0)
+    assert candidate_seed(42, 0, "sample") != candidate_seed(42, 0, "relax")
+    # "42:1"+"0" and "4:21"+"0" must not collide through string concatenation
+    assert candidate_seed(42, 10) != candidate_seed(4, 210)
+
+
+def test_neighbouring_streams_are_uncorrelated():
+    a = _draws(candidate_rng(1, 0), 2000)
+    b = _draws(candidate_rng(1, 1), 2000)
+    mean_a, mean_b = sum(a) / len(a), sum(b) / len(b)
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b)) / len(a)
+    var_a = sum((x - mean_a) ** 2 for x in a) / len(a)
+    var_b = sum((y - mean_b) ** 2 for y in b) / len(b)
+    assert abs(cov / (var_a * var_b) ** 0.5) < 0.1
+
+
+def test_unseeded_streams_are_fresh():
+    assert _draws(candidate_rng(None, 0)) != _draws(candidate_rng(None, 0))
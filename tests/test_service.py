@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pycofbuilder")
+
+from random_cof_generator_v2 import ConnectionClosed, _remove_stale_socket, _serve_lines, serve  # noqa: E402
+
+
+def _exchange(lines):
+    sent = []
+    state = {"started_at": time.time(), "served": 0, "timings": []}
+    stopped = _serve_lines(None, {}, lines, sent.append, state)
+    return stopped, sent, state
+
+
+def test_request_response_pairs():
+    stopped, sent, state = _exchange([
+        json.dumps({"cmd": "ping", "id": 1}),
+        "",
+        "not json",
+        json.dumps([1, 2]),
+        json.dumps({"cmd": "frobnicate", "id": "x"}),
+        json.dumps({"cmd": "shutdown"}),
+        json.dumps({"cmd": "ping", "id": 2}),            # after shutdown: never answered
+    ])
+    assert stopped
+    assert [response.get("id") for response in sent] == [1, None, None, "x", None]
+    health, bad_json, not_object, unknown, bye = sent
+    assert health["ok"] and health["ready"] and health["requests_served"] == 1
+    assert not bad_json["ok"] and bad_json["error"].startswith("Bad request")
+    assert not not_object["ok"]
+    assert unknown == {"ok": False, "error": "Unknown cmd: frobnicate", "id": "x"}
+    assert bye == {"ok": True, "event": "bye"}
+
+
+def test_eof_ends_without_shutdown():
+    stopped, sent, _ = _exchange([json.dumps({"cmd": "health"})])
+    assert not stopped
+    assert sent[0]["event"] == "health"
+
+
+def test_output_dir_stays_inside_the_service_directory(tmp_path):
+    from random_cof_generator_v2 import _request_output_dir
+
+    defaults = {"output_dir": str(tmp_path / "out")}
+    root = os.path.realpath(defaults["output_dir"])
+    assert _request_output_dir({}, defaults) == defaults["output_dir"]
+    assert _request_output_dir({"output_dir": "batch7"}, defaults) == os.path.join(root, "batch7")
+    for outside in ("..", "../elsewhere", "/tmp", "a/../../b"):
+        with pytest.raises(ValueError):
+            _request_output_dir({"output_dir": outside}, defaults)
+
+
+def test_failed_request_gets_an_error_reply():
+    defaults = {"output_dir": "generated_cofs", "supercell": 1, "topology": None}
+    sent = []
+    state = {"started_at": time.time(), "served": 0, "timings": []}
+    _serve_lines(None, defaults, [json.dumps({"cmd": "generate", "output_dir": "/etc", "id": 3})], sent.append, state)
+    assert sent == [{"ok": False, "error": "output_dir must stay inside generated_cofs", "id": 3}]
+
+
+def test_transport_failure_is_not_answered_again():
+    calls = []
+
+    def send(payload):
+        calls.append(payload)
+        raise ConnectionClosed("Broken pipe")
+
+    state = {"started_at": time.time(), "served": 0, "timings": []}
+    with pytest.raises(ConnectionClosed):
+        _serve_lines(None, {}, [json.dumps({"cmd": "ping"}), json.dumps({"cmd": "ping"})], send, state)
+    assert len(calls) == 1
+
+
+def test_only_stale_sockets_are_removed(tmp_path):
+    path = str(tmp_path / "svc.sock")
+    with open(path, "w") as f:
+        f.write("not a socket")
+    with pytest.raises(FileExistsError):
+        _remove_stale_socket(path)
+    os.remove(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    with pytest.raises(FileExistsError):
+        _remove_stale_socket(path)        # someone is listening
+    server.close()
+    _remove_stale_socket(path)            # left behind
+    assert not os.path.exists(path)
+
+
+def _client(path):
+    for _ in range(200):
+        try:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(path)
+            return conn, conn.makefile("rw", encoding="utf-8")
+        except (FileNotFoundError, ConnectionRefusedError):
+            conn.close()
+            time.sleep(0.01)
+    raise TimeoutError(path)
+
+
+def test_socket_service_survives_a_client_that_hangs_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "stdout", open(os.devnull, "w"))
+    path = str(tmp_path / "svc.sock")
+    thread = threading.Thread(target=serve, args=(None, {"verbose": False}, path), daemon=True)
+    thread.start()
+
+    conn, stream = _client(path)
+    assert json.loads(stream.readline())["event"] == "ready"
+    stream.write((json.dumps({"cmd": "ping"}) + "\n") * 2000)
+    stream.flush()
+    stream.close()
+    conn.close()                          # gone before the replies are read
+
+    conn, stream = _client(path)
+    assert json.loads(stream.readline())["event"] == "ready"
+    stream.write(json.dumps({"cmd": "shutdown"}) + "\n")
+    stream.flush()
+    assert json.loads(stream.readline()) == {"ok": True, "event": "bye"}
+    conn.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not os.path.exists(path)
@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+import pytest
+
+from stage_timer import StageTimer, percentile, summarize
+
+
+@pytest.mark.parametrize("q", [0, 25, 50, 95, 99, 100])
+def test_percentile_matches_numpy(q):
+    values = [0.3, 1.7, 0.2, 5.0, 2.2, 0.9, 3.1]
+    assert percentile(values, q) == pytest.approx(np.percentile(values, q))
+
+
+def test_percentile_edge_cases():
+    assert math.isnan(percentile([], 50))
+    assert percentile([4.0], 99) == 4.0
+
+
+def test_summarize_skips_missing_and_nan():
+    records = [{"t_framework": float(k), "t_total": float(k)} for k in range(1, 101)]
+    records.append({"t_framework": float("nan"), "t_total": None, "other": 1.0})
+    summary = summarize(records)
+    assert list(summary) == ["framework", "total"]
+    assert summary["framework"]["n"] == 100
+    assert summary["framework"]["mean"] == pytest.approx(50.5)
+    assert summary["framework"]["p50"] == pytest.approx(50.5)
+    assert summary["framework"]["p95"] == pytest.approx(95.05)
+    assert summary["framework"]["p99"] == pytest.approx(99.01)
+
+
+def test_timer_records_stages_and_total():
+    timer = StageTimer()
+    with timer.stage("sample"):
+        pass
+    with timer.stage("sample"):
+        pass
+    with timer.stage("write"):
+        pass
+    record = timer.as_record()
+    assert set(record) == {"t_sample", "t_write", "t_total"}
+    assert record["t_total"] == pytest.approx(record["t_sample"] + record["t_write"], abs=2e-6)
@@ -0,0 +1,104 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+from structure_export import export_framework, export_structure, format_structure, parse_target, target_filenames
+
+ase_io = pytest.importorskip("ase.io")
+
+CELL = np.array([[7.0, 0.0, 0.0], [-3.5, 3.5 * np.sqrt(3), 0.0], [0.0, 0.0, 3.4]])   # gamma = 120
+TYPES = ["C", "C", "N", "H"]
+FRAC = np.array([[0.1, 0.2, 0.5], [0.45, 0.3, 0.5], [0.7, 0.85, 0.5], [0.95, 0.05, 0.5]])
+
+
+def _same_structure(atoms, cell, types, frac):
+    np.testing.assert_allclose(np.asarray(atoms.cell), cell, atol=1e-4)
+    assert atoms.get_chemical_symbols() == list(types)
+    delta = atoms.get_scaled_positions(wrap=False) - frac
+    np.testing.assert_allclose(delta - np.round(delta), 0.0, atol=1e-5)
+
+
+def test_parse_target():
+    assert parse_target("cif") == ("cif", (1, 1, 1))
+    assert parse_target("POSCAR:2x2x1") == ("vasp", (2, 2, 1))
+    assert parse_target(("xyz", 3)) == ("xyz", (3, 3, 3))
+    with pytest.raises(ValueError):
+        parse_target("cif:2x0x1")
+
+
+def test_filenames_of_shared_formats():
+    targets = [("cif", (1, 1, 1)), ("cif", (2, 2, 1)), ("vasp", (1, 1, 1))]
+    assert target_filenames("X", targets) == ["X.cif", "X_2x2x1.cif", "X.vasp"]
+
+
+@pytest.mark.parametrize("fmt, ase_format", [("cif", "cif"), ("xyz", "extxyz"), ("vasp", "vasp")])
+@pytest.mark.parametrize("supercell", [(1, 1, 1), (2, 3, 1)])
+def test_round_trip_through_ase(tmp_path, fmt, ase_format, supercell):
+    (path,) = export_structure("X", CELL, TYPES, FRAC @ CELL, [(fmt, supercell)], str(tmp_path))
+    atoms = ase_io.read(path, format=ase_format)
+
+    images = np.indices(supercell).reshape(3, -1).T
+    big_frac = ((FRAC[None] + images[:, None]) / supercell).reshape(-1, 3)
+    big_types = TYPES * len(images)
+    if fmt == "vasp":
+        # POSCAR groups atoms by element, in order of first appearance
+        order = np.argsort([["C", "N", "H"].index(t) for t in big_types], kind="stable")
+        big_frac, big_types = big_frac[order], [big_types[k] for k in order]
+    _same_structure(atoms, CELL * np.asarray(supercell)[:, None], big_types, big_frac)
+
+
+@pytest.mark.parametrize("fmt", ["cif", "xyz", "vasp"])
+def test_streamed_chunks_match_the_whole_file(tmp_path, fmt):
+    whole = format_structure(fmt, "X", CELL, TYPES, FRAC @ CELL, (3, 2, 2))
+    (path,) = export_structure("X", CELL, TYPES, FRAC @ CELL, [(fmt, (3, 2, 2))], str(tmp_path), chunk_atoms=5)
+    with open(path) as f:
+        assert f.read() == whole
+    (gz_path,) = export_structure("X", CELL, TYPES, FRAC @ CELL, [(fmt, (3, 2, 2))], str(tmp_path / "gz"),
+                                  compress=True, chunk_atoms=5)
+    assert gz_path.endswith(".gz")
+    with gzip.open(gz_path, "rt") as f:
+        assert f.read() == whole
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export_structure("X", CELL, TYPES, FRAC @ CELL, ["pdb"], str(tmp_path))
+
+
+class _Framework:
+    """The parts of a built pcb.Framework that export_framework uses; save() writes a marker file."""
+
+    name = "X"
+    cellMatrix = CELL
+    atom_types = TYPES
+    atom_pos = FRAC @ CELL
+
+    def __init__(self):
+        self.saved = []
+
+    def save(self, fmt, supercell, save_dir):
+        self.saved.append((fmt, tuple(supercell)))
+        with open(os.path.join(save_dir, f"{self.name}.{fmt}"), "w", encoding="utf-8") as f:
+            f.write("saved by pyCOFBuilder\n")
+
+
+def test_framework_main_target_keeps_pycofbuilder_output(tmp_path):
+    cof = _Framework()
+    paths = export_framework(cof, ["cif", "cif:2x2x1", "xyz", "pdb"], str(tmp_path))
+    assert [os.path.basename(p) for p in paths] == ["X.cif", "X_2x2x1.cif", "X.xyz", "X.pdb"]
+    assert cof.saved == [("cif", (1, 1, 1)), ("pdb", (1, 1, 1))]
+    assert len(ase_io.read(paths[1])) == 4 * len(TYPES)
+    assert len(ase_io.read(paths[2], format="extxyz")) == len(TYPES)
+
+
+@pytest.mark.parametrize("main, bonds", [("cif:2x2x1", True), ("cif", False), ("xyz", True)])
+def test_framework_main_target_streams_without_a_bond_table(tmp_path, main, bonds):
+    cof = _Framework()
+    (path,) = export_framework(cof, [main], str(tmp_path), compress=True, bonds=bonds)
+    assert cof.saved == []
+    fmt, supercell = parse_target(main)
+    assert path == str(tmp_path / target_filenames("X", [(fmt, supercell)])[0]) + ".gz"
+    with gzip.open(path, "rt") as f:
+        assert f.read() == format_structure(fmt, "X", CELL, TYPES, FRAC @ CELL, supercell)
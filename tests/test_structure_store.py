@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from structure_store import INDEX_FILE, META_FILE, StoreBusy, StructureStore, content_hash
+
+CELL = np.diag([10.0, 11.0, 3.5])
+FRAC = np.array([[0.1, 0.2, 0.5], [0.6, 0.7, 0.5], [0.3, 0.9, 0.5]])
+
+
+def _fill(path):
+    with StructureStore(path, mode="a") as store:
+        assert store.append("first", CELL, ["C", "N", "H"], FRAC, metadata={"topology": "HCB"}) == 0
+        assert store.append("second", 1.1 * CELL, [6, 6, 8], FRAC[::-1]) == 1
+
+
+def test_reopen_and_read_back(tmp_path):
+    path = str(tmp_path / "lib.cofstore")
+    _fill(path)
+
+    with StructureStore(path, mode="r") as store:
+        assert len(store) == 2
+        assert store.names() == ["first", "second"]
+        s = store["first"]
+        assert s.row == 0
+        assert s.symbols == ["C", "N", "H"]
+        np.testing.assert_allclose(s.cell, CELL)
+        np.testing.assert_allclose(s.frac, FRAC, atol=1e-6)
+        assert s.metadata == {"topology": "HCB"}
+        assert store[s.hash].name == "first"
+        assert store[-1].name == "second"
+        np.testing.assert_allclose(store[1].positions, FRAC[::-1] @ (1.1 * CELL), atol=1e-5)
+
+
+def test_duplicates_return_the_existing_row(tmp_path):
+    path = str(tmp_path / "lib.cofstore")
+    _fill(path)
+    with StructureStore(path, mode="a") as store:
+        # same content under a new name, atoms reordered
+        assert store.append("renamed", CELL, ["H", "N", "C"], FRAC[::-1]) == 0
+        assert store.append("first", 2 * CELL, ["C"], FRAC[:1]) == 0
+        assert len(store) == 2
+
+
+def test_content_hash_ignores_order_and_wrapping():
+    numbers = np.array([6, 7, 1], dtype=np.uint8)
+    assert content_hash(CELL, numbers, FRAC) == content_hash(CELL, numbers[::-1], FRAC[::-1] + 1.0)
+    assert content_hash(CELL, numbers, FRAC) != content_hash(CELL, numbers, FRAC + 0.01)
+
+
+def test_interrupted_append_is_cut_off(tmp_path):
+    path = str(tmp_path / "lib.cofstore")
+    _fill(path)
+    # An append that died after writing its index record but before its metadata line
+    with open(os.path.join(path, INDEX_FILE), "ab") as f:
+        f.write(b"\0" * 40)
+    with open(os.path.join(path, META_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "torn"})[:8])
+
+    with StructureStore(path, mode="a") as store:
+        assert store.names() == ["first", "second"]
+        assert store.append("third", CELL, ["O"], FRAC[:1]) == 2
+    with StructureStore(path, mode="r") as store:
+        assert store.names() == ["first", "second", "third"]
+        assert store["third"].symbols == ["O"]
+
+
+def test_read_only_store_refuses_appends(tmp_path):
+    path = str(tmp_path / "lib.cofstore")
+    _fill(path)
+    with StructureStore(path, mode="r") as store:
+        with pytest.raises(IOError):
+            store.append("third", CELL, ["O"], FRAC[:1])
+    with pytest.raises(FileNotFoundError):
+        StructureStore(str(tmp_path / "missing"), mode="r")
+
+
+def test_single_writer_and_concurrent_readers(tmp_path):
+    path = str(tmp_path / "lib.cofstore")
+    _fill(path)
+    reader = StructureStore(path)                           # read-only by default
+    with StructureStore(path, mode="a") as writer:
+        with pytest.raises(StoreBusy):
+            StructureStore(path, mode="a")
+        writer.append("third", CELL, ["O"], FRAC[:1])
+        assert len(reader) == 2                             # a reader keeps the prefix it opened
+        assert StructureStore(path)["third"].symbols == ["O"]
+    reader.close()
+    StructureStore(path, mode="a").close()                  # the lock is released on close
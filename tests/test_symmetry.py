@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from symmetry import check, constrain_symmetry, detect, symmetric_dof
+
+pytest.importorskip("spglib")
+from ase.build import bulk  # noqa: E402
+from ase.calculators.emt import EMT  # noqa: E402
+from ase.optimize import BFGS  # noqa: E402
+
+
+def test_detect():
+    found = detect(bulk("Cu", "fcc", a=3.6, cubic=True))
+    assert (found["spacegroup"], found["number"]) == ("Fm-3m", 225)
+    assert len(found["rotations"]) == 192         # 48 operations x 4 centring translations
+
+
+def test_symmetric_dof():
+    # Cubic Cu: no free coordinate and one free cell parameter
+    atoms = bulk("Cu", "fcc", a=3.6, cubic=True)
+    found = detect(atoms)
+    assert symmetric_dof(atoms.cell, atoms.get_scaled_positions(), found["rotations"],
+                         found["translations"]) == (0, 1)
+    # P1: everything is free
+    assert symmetric_dof(atoms.cell, atoms.get_scaled_positions(), np.eye(3, dtype=int)[None],
+                         np.zeros((1, 3))) == (3 * len(atoms), 6)
+
+
+def test_constrained_relaxation_keeps_the_space_group():
+    atoms = bulk("Cu", "fcc", a=3.7, cubic=True)
+    atoms.positions[0] += 1e-4                     # noise below symprec
+    info = constrain_symmetry(atoms)
+    assert info["spacegroup"] == "Fm-3m"
+    assert info["dof"] == 1 and info["dof_p1"] == 18
+
+    from relax import cell_filter
+
+    atoms.calc = EMT()
+    BFGS(cell_filter(atoms), logfile=None).run(fmax=0.001, steps=100)
+    assert check(atoms, info)["kept"]
@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+
+from warmstart import RelaxedLibrary, name_distance, parse_cof_name, transfer_cell, warm_start
+
+ase_io = pytest.importorskip("ase.io")
+from ase.build import bulk  # noqa: E402
+
+NAME = "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AA"
+
+
+def test_parse_cof_name():
+    (net, core1, core2), (t1, t2), stacking = parse_cof_name(NAME)
+    assert (net, core1, core2, stacking) == ("HCB_A", "T3_BENZ", "L2_BENZ", "AA")
+    assert t2 == ["L2", "BENZ", "NH2", "H", "H"]
+    assert parse_cof_name("19411N2") is None
+    assert parse_cof_name(None) is None
+
+
+def test_name_distance():
+    assert name_distance(NAME, NAME) == 0
+    assert name_distance(NAME, "T3_BENZ_CHO_CH3-L2_BENZ_NH2_H_H-HCB_A-AA") == 1
+    assert name_distance(NAME, "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AB1") == 2
+    assert name_distance(NAME, "T3_BENZ_CHO_H-L2_NAPT_NH2_H_H-HCB_A-AA") is None    # other core
+    assert name_distance(NAME, "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-SQL_A-AA") is None    # other net
+
+
+def _queue(root, name, raw, relaxed, status="converged"):
+    from relax import JOB_FILE, RELAXED_FILE, _read_json, _write_json, submit
+
+    path = os.path.join(root, f"{name}.cif")
+    ase_io.write(path, raw)
+    job_dir = submit(path, root=os.path.join(root, "runs"))
+    ase_io.write(os.path.join(job_dir, RELAXED_FILE), relaxed)
+    job = _read_json(os.path.join(job_dir, JOB_FILE))
+    _write_json(os.path.join(job_dir, JOB_FILE), {**job, "status": status})
+    return job_dir
+
+
+def test_nearest_and_transfer(tmp_path):
+    raw = bulk("Cu", "fcc", a=3.6, cubic=True)
+    relaxed = raw.copy()
+    relaxed.set_cell(raw.cell * [[1.02], [0.99], [0.95]], scale_atoms=True)
+    root = str(tmp_path)
+    _queue(root, "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AB1", raw, relaxed)
+    _queue(root, "T3_BENZ_CHO_H-L2_BENZ_NH2_CH3_H-HCB_A-AA", raw, relaxed)
+    _queue(root, "T3_BENZ_CHO_H-L2_BENZ_NH2_H_H-HCB_A-AB2", raw, relaxed, status="failed")
+
+    library = RelaxedLibrary([os.path.join(root, "runs")])
+    assert len(library) == 2
+    entry, distance = library.nearest(NAME)
+    assert (entry.cof_name, distance) == ("T3_BENZ_CHO_H-L2_BENZ_NH2_CH3_H-HCB_A-AA", 1)
+
+    atoms = raw.copy()
+    frac = atoms.get_scaled_positions()
+    transfer_cell(atoms, entry)
+    np.testing.assert_allclose(np.asarray(atoms.cell), np.asarray(relaxed.cell), atol=1e-6)
+    np.testing.assert_allclose(atoms.get_scaled_positions(), frac, atol=1e-9)
+
+    assert warm_start(raw.copy(), "T3_TRZN_CHO-T3_BENZ_CHO_H-HCB-AA", [os.path.join(root, "runs")]) == {
+        "reference": None}
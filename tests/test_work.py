@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+pytest.importorskip("pycofbuilder")
+pytest.importorskip("pandas")
+
+import work  # noqa: E402
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)          # library/failure caches land in the temporary directory
+    return work.COFGenerator(
+        L2_cores=work.L2_CORES,
+        T3_cores=work.T3_CORES,
+        S4_cores=work.S4_CORES,
+        H6_cores=work.H6_CORES,
+        q_connectors=work.Q_CONNECTORS,
+        r_groups=work.R_GROUPS,
+        out_dir=str(tmp_path / "out"),
+        seed=7,
+    )
+
+
+def test_parallel_batch_stops_at_the_target(generator):
+    df = generator.batch_generate(n_structures=3, max_attempts=15, topology="HCB", workers=2)
+    ok = df[df["status"] == "ok"]
+    assert len(ok) <= 3
+    assert len(df) <= 15
+    assert set(df["status"]) <= {"ok", "error"}
+    for name in ok["cof_name"]:
+        assert os.path.exists(os.path.join(generator.out_dir, f"{name}.cif"))
+
+
+def _crash_first_build(cof_name, out_dir, targets, compress=False, keep_structure=False):
+    """Stands in for work._timed_build_and_save: the first build kills its worker, like an OOM kill."""
+    marker = os.path.join(out_dir, "crashed")
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(9)
+    return True, None, {}, None
+
+
+def test_parallel_batch_survives_a_dead_worker(generator, monkeypatch):
+    monkeypatch.setattr(work, "_timed_build_and_save", _crash_first_build)
+    names = [f"T3_BENZ_CHO_H-T3_BENZ_NH2_H-HCB_A-AA{k}" for k in range(10)]
+    df = generator.batch_generate(n_structures=4, max_attempts=10, workers=2, names=names)
+    assert (df["status"] == "ok").sum() == 4
+    crashed = df[df["error"].fillna("").str.startswith("Worker crashed")]
+    assert len(crashed) >= 1
+    assert not any(generator.failure_cache.is_known_bad(name) for name in df["cof_name"])
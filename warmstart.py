@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Warm-start relaxations from the nearest structure already relaxed.
+
+Generated COFs often differ from one already relaxed only by an R-group,
+a connector or the stacking, yet every relaxation starts from
+pyCOFBuilder's raw cell. RelaxedLibrary indexes the converged jobs of a
+relax.py queue by (net, building-block cores) and finds the closest one
+for a COF name:
+
+  - same net and the same two cores (BB order as failure_cache.canonical_key),
+  - distance = number of differing building-block tokens (connector,
+    R-groups) + 2 if the stacking differs; the smallest wins.
+
+The reference's relaxation is transferred as a deformation of the cell,
+F = raw_cell^-1 @ relaxed_cell (rows are lattice vectors), applied to
+the new raw cell with the atoms scaled along. With the same cores and
+connectors the raw cells match, so this is exactly the reference's
+relaxed cell parameters and interlayer spacing; otherwise it carries
+over the relative change of each.
+
+relax.py applies it with `submit --warm-start` before any pre-relaxation.
+`benchmark` relaxes each CIF cold first, then warm-started from the
+other cold results, and compares xTB steps:
+
+    python warmstart.py benchmark generated_cofs/*.cif --workers 4 --threads 4
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from failure_cache import canonical_key
+
+STACKING_PENALTY = 2
+
+
+class RelaxedEntry(NamedTuple):
+    cof_name: str
+    job_dir: str
+    raw_cell: np.ndarray       # (3, 3) cell of the submitted structure
+    relaxed_cell: np.ndarray   # (3, 3) cell after relaxation
+
+
+def parse_cof_name(cof_name: Optional[str]) -> Optional[Tuple[Tuple[str, str, str], Tuple[List[str], List[str]], str]]:
+    """
+    ((net, core1, core2), (tokens of BB1, tokens of BB2), stacking) for a
+    BB1-BB2-NET-STACKING name, or None if it is not one.
+    """
+    if not cof_name or cof_name.count("-") != 3:
+        return None
+    bb1, bb2, net, stacking = canonical_key(cof_name)
+    t1, t2 = bb1.split("_"), bb2.split("_")
+    if len(t1) < 3 or len(t2) < 3:
+        return None
+    return (net, "_".join(t1[:2]), "_".join(t2[:2])), (t1, t2), stacking
+
+
+def name_distance(a: str, b: str) -> Optional[int]:
+    """Differing building-block tokens plus a stacking penalty; None if net or cores differ."""
+    pa, pb = parse_cof_name(a), parse_cof_name(b)
+    if pa is None or pb is None or pa[0] != pb[0]:
+        return None
+    distance = 0
+    for ta, tb in zip(pa[1], pb[1]):
+        distance += sum(x != y for x, y in zip(ta, tb)) + abs(len(ta) - len(tb))
+    return distance + (STACKING_PENALTY if pa[2] != pb[2] else 0)
+
+
+class RelaxedLibrary:
+    """Converged relax.py jobs with a COF name, bucketed by (net, cores)."""
+
+    def __init__(self, roots: List[str]):
+        self.entries: Dict[Tuple[str, str, str], List[RelaxedEntry]] = {}
+        for root in roots:
+            self._scan(root)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.entries.values())
+
+    def _scan(self, root: str):
+        from cif_reader import read_cif
+        from relax import JOB_FILE, RELAXED_FILE, _read_json, job_dirs
+
+        for job_dir in job_dirs(root):
+            job = _read_json(os.path.join(job_dir, JOB_FILE))
+            parsed = parse_cof_name(job.get("cof_name"))
+            relaxed = os.path.join(job_dir, RELAXED_FILE)
+            if job["status"] != "converged" or parsed is None or not os.path.exists(relaxed):
+                continue
+            try:
+                raw_cell = read_cif(os.path.join(job_dir, job["input"])).cell
+                relaxed_cell = read_cif(relaxed).cell
+            except Exception:
+                continue
+            self.entries.setdefault(parsed[0], []).append(
+                RelaxedEntry(job["cof_name"], job_dir, raw_cell, relaxed_cell))
+
+    def nearest(self, cof_name: str, exclude_self: bool = True) -> Optional[Tuple[RelaxedEntry, int]]:
+        """Closest relaxed entry and its name distance, or None if nothing shares the net and cores."""
+        parsed = parse_cof_name(cof_name)
+        if parsed is None:
+            return None
+        best = None
+        for entry in self.entries.get(parsed[0], ()):
+            if exclude_self and entry.cof_name == cof_name:
+                continue
+            distance = name_distance(cof_name, entry.cof_name)
+            if best is None or distance < best[1]:
+                best = (entry, distance)
+        return best
+
+
+def transfer_cell(atoms, entry: RelaxedEntry) -> Dict[str, object]:
+    """Apply the reference's relaxation deformation to atoms' cell (in place, atoms scaled along)."""
+    deformation = np.linalg.solve(entry.raw_cell, entry.relaxed_cell)
+    before = atoms.cell.cellpar()
+    atoms.set_cell(np.asarray(atoms.cell) @ deformation, scale_atoms=True)
+    return {
+        "cellpar_before": np.round(before, 4).tolist(),
+        "cellpar_after": np.round(atoms.cell.cellpar(), 4).tolist(),
+    }
+
+
+def warm_start(atoms, cof_name: Optional[str], roots: List[str], exclude_self: bool = True) -> Dict[str, object]:
+    """Seed atoms with the nearest relaxed cell from the queues in roots; returns what was done."""
+    found = RelaxedLibrary(roots).nearest(cof_name, exclude_self) if parse_cof_name(cof_name) else None
+    if found is None:
+        return {"reference": None}
+    entry, distance = found
+    return {"reference": entry.cof_name, "job": entry.job_dir, "distance": distance, **transfer_cell(atoms, entry)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-started xTB relaxations from the nearest relaxed COF.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_near = sub.add_parser("nearest", help="Show the nearest relaxed structure for COF names.")
+    p_near.add_argument("names", nargs="+")
+    p_near.add_argument("--root", action="append", help="relax.py queue(s) to search (default: relax_runs).")
+    p_bench = sub.add_parser("benchmark", help="xTB steps cold vs warm-started.")
+    p_bench.add_argument("cifs", nargs="+", help="CIFs named BB1-BB2-NET-STACKING.cif")
+    p_bench.add_argument("--root", default="relax_compare", help="Job queue directory for the benchmark.")
+    p_bench.add_argument("--workers", type=int, default=1)
+    p_bench.add_argument("--threads", type=int)
+    p_bench.add_argument("--max-steps", type=int, default=1000)
+    p_bench.add_argument("-o", "--output", help="CSV file (default: print to stdout).")
+    args = parser.parse_args()
+
+    if args.cmd == "nearest":
+        from relax import RELAX_DIR
+
+        library = RelaxedLibrary(args.root or [RELAX_DIR])
+        for name in args.names:
+            found = library.nearest(name)
+            print(f"{name}: {found[0].cof_name} (distance {found[1]})" if found else f"{name}: -")
+        return
+
+    import pandas as pd
+
+    from relax import compare_variants
+
+    # Cold runs first, so the warm runs find each other's relaxed cells in the same queue
+    cold = compare_variants(args.cifs, args.root, {"cold": {}}, args.workers, args.threads, max_steps=args.max_steps)
+    warm = compare_variants(args.cifs, args.root, {"warm": {"warm_start": True}}, args.workers, args.threads,
+                            max_steps=args.max_steps)
+    df = pd.DataFrame(cold).merge(pd.DataFrame(warm), on="path")
+    if len(df):
+        df["steps_saved"] = df["cold_steps"] - df["warm_steps"]
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f">>> {len(df)} structures saved to {args.output}", file=sys.stderr)
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,51 @@ Requirements:
 
 This script will:
   1. Query pyCOFBuilder for available building blocks.
-  2. Filter them according to user-defined cores (L2/T3/S4/H6), connectors (Q) and R-groups.
-  3. Build random HCB and SQL COFs with valid connectivity.
-  4. Save CIFs and a CSV log of what succeeded or failed.
+  2. Filter them according to user-defined cores (L2/T3/S4/H6), connectors (Q) and R-groups
+     (the filtered library is cached in .cof_cache/ so warm starts skip this step).
+  3. Build random HCB and SQL COFs with valid connectivity, skipping combinations
+     that already failed in earlier runs (.cof_cache/failed_cofs.jsonl).
+  4. Save CIFs and a CSV log of what succeeded or failed (and optionally append
+     every built structure to a structure_store.StructureStore, and flag
+     near-duplicates of structures already in a fingerprint.FingerprintIndex).
 """
 
+import hashlib
+import importlib.metadata
+import json
 import os
 import random
 import time
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Tuple, Optional, Union
 
+import numpy as np
 import pandas as pd
 import pycofbuilder as pcb
 from pycofbuilder.building_block import BuildingBlock
 
+from design_space import DesignSpace
+from failure_cache import FAILURE_CACHE, FailureCache
+from neighbors import check_clashes
+from fingerprint import FingerprintIndex, file_stamp, fingerprint
+from rng_streams import candidate_rng
+from stage_timer import STAGES, StageTimer, format_summary, summarize
+from structure_export import export_framework
+from structure_store import StructureStore
+
+try:
+    PCB_VERSION = importlib.metadata.version("pycofbuilder")
+except importlib.metadata.PackageNotFoundError:
+    PCB_VERSION = getattr(pcb, "__version__", "unknown")
+
+# Where the filtered building-block library is cached between runs
+CACHE_DIR = ".cof_cache"
+BLOCK_LIBRARY_CACHE = os.path.join(CACHE_DIR, "block_library.json")
+
+# How many times to redraw a name that is a known failure before giving up
+MAX_RESAMPLES = 1000
+
 
 # ============================
 # USER FILTERS (YOUR LISTS)
@@ -57,6 +88,112 @@ R_GROUPS = [
 ]
 
 
+# =======================================
+# BUILD HELPERS
+# =======================================
+
+def build_and_save(
+    cof_name: str,
+    out_dir: str,
+    fmt: str = "cif",
+    supercell: Tuple[int, int, int] = (1, 1, 1),
+    timer: Optional[StageTimer] = None,
+    targets: Optional[List] = None,
+    compress: bool = False,
+    structure_out: Optional[dict] = None,
+    screen: bool = True,
+    bonds: bool = True,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Build a COF from its name string and save it to out_dir.
+    Returns (success, error_message_or_None).
+
+    targets: several (fmt, supercell) outputs, e.g. [("cif", (1, 1, 1)),
+    ("cif", (2, 2, 1)), ("vasp", (1, 1, 1))], written from a single build
+    (see structure_export); default [(fmt, supercell)]. A 1x1x1 CIF first
+    target is saved by pyCOFBuilder with its bond table (unless
+    bonds=False); every other target is streamed to disk, so memory stays
+    bounded by the unit cell. compress=True writes them gzipped.
+    With screen=True the built cell is checked for atom clashes across
+    periodic boundaries (neighbors.check_clashes) before anything is
+    written; a clash fails the build like pyCOFBuilder's "Atoms too close".
+    If a StageTimer is given, the "framework" (pcb.Framework assembly),
+    "screen", "save", "serialize" and "write" stages are timed.
+    If a dict is given as structure_out, it receives the built unit cell
+    ("cell", "atom_types", "atom_pos") and the written "paths", e.g. for a
+    StructureStore.
+
+    Kept at module level (not a method) so it can be pickled and sent to
+    worker processes by COFGenerator.batch_generate(workers=N).
+    """
+    timer = timer or StageTimer()
+    try:
+        with timer.stage("framework"):
+            cof = pcb.Framework(cof_name, out_dir=out_dir, save_bb=False, log_level="warning")
+        if screen:
+            with timer.stage("screen"):
+                check_clashes(cof.cellMatrix, cof.atom_types, positions=cof.atom_pos)
+        paths = export_framework(
+            cof, targets or [(fmt, supercell)], out_dir, timer=timer, compress=compress, bonds=bonds
+        )
+        if structure_out is not None:
+            structure_out.update(cell=cof.cellMatrix, atom_types=cof.atom_types, atom_pos=cof.atom_pos, paths=paths)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def _timed_build_and_save(cof_name, out_dir, targets, compress=False, keep_structure=False):
+    """
+    Worker-process entry point: build_and_save plus its stage timings and,
+    with keep_structure, the built unit cell (else None).
+    """
+    timer = StageTimer()
+    structure = {} if keep_structure else None
+    ok, err = build_and_save(
+        cof_name, out_dir, timer=timer, targets=targets, compress=compress, structure_out=structure
+    )
+    return ok, err, timer.as_record(), structure or None
+
+
+def _check_duplicate(fingerprints: Optional[FingerprintIndex], record: dict, structure: Optional[dict]):
+    """
+    Fingerprint a successful build, set record["duplicate_of"] to the closest
+    near-duplicate already indexed (or None) and index it under its main file.
+    """
+    if fingerprints is None or not structure:
+        return
+    cell = np.asarray(structure["cell"], dtype=float)
+    frac = np.linalg.solve(cell.T, np.asarray(structure["atom_pos"], dtype=float).T).T
+    fp = fingerprint(cell, structure["atom_types"], frac)
+    path = structure["paths"][0]
+    record["duplicate_of"] = fingerprints.duplicate_of(fp, exclude=path)
+    fingerprints.add(path, fp, stamp=file_stamp(path))
+
+
+def _store_structure(store: Optional[StructureStore], record: dict, structure: Optional[dict]):
+    """Append a successful build to the store, with its topology and candidate index."""
+    if store is None or not structure:
+        return
+    metadata = {"topology": record["topology"], "index": record["index"]}
+    if record.get("duplicate_of"):
+        metadata["duplicate_of"] = record["duplicate_of"]
+    store.append_cartesian(
+        record["cof_name"],
+        structure["cell"],
+        structure["atom_types"],
+        structure["atom_pos"],
+        metadata=metadata,
+    )
+
+
+def _merge_timings(record: dict, timings: dict):
+    """Add build-stage timings to a record that already holds the sampling time."""
+    total = record.get("t_total", 0.0) + timings.get("t_total", 0.0)
+    record.update(timings)
+    record["t_total"] = round(total, 6)
+
+
 # =======================================
 # COF GENERATOR CLASS (ROBUST VERSION)
 # =======================================
@@ -82,12 +219,30 @@ class COFGenerator:
         r_groups: List[str],
         out_dir: str = "generated_cofs",
         seed: Optional[int] = None,
+        cache_path: Optional[str] = BLOCK_LIBRARY_CACHE,
+        failure_cache_path: Optional[str] = FAILURE_CACHE,
+        failure_ttl_s: Optional[float] = None,
     ):
+        """
+        cache_path: JSON file holding the filtered building-block library.
+            It is reused when pyCOFBuilder version and whitelists are unchanged;
+            pass None to always rebuild from pyCOFBuilder.
+        failure_cache_path: JSON-lines file of combinations that already failed
+            to build; they are skipped when sampling. None keeps it in memory.
+        failure_ttl_s: forget cached failures older than this (None = never).
+        seed: root seed. batch_generate() derives an independent random
+            stream for every candidate index from it, so candidate k is the
+            same however the run is ordered, parallelised or resumed.
+        """
         if seed is not None:
             random.seed(seed)
+        self.seed = seed
 
         self.out_dir = out_dir
         os.makedirs(self.out_dir, exist_ok=True)
+        self.cache_path = cache_path
+        self.failure_cache = FailureCache(failure_cache_path, ttl_s=failure_ttl_s)
+        self.n_skipped_known_bad = 0
 
         # Save whitelists
         self.core_whitelist: Dict[str, List[str]] = {
@@ -103,9 +258,9 @@ class COFGenerator:
         self.bb_helper = BuildingBlock()
         self.framework_helper = pcb.Framework()  # used for available nets & stacking
 
-        # Filled in by _build_block_library()
-        # name -> BuildingBlock object
-        self.blocks: Dict[str, BuildingBlock] = {}
+        # Filled in by _build_block_library() (or loaded from the cache)
+        # name -> metadata {symmetry, core, connector, r_groups, connectivity}
+        self.blocks: Dict[str, dict] = {}
         # connectivity (2,3,4,6,...) -> [names]
         self.blocks_by_connectivity: Dict[int, List[str]] = {}
 
@@ -124,8 +279,12 @@ class COFGenerator:
             for top in self.topology_rules.keys()
         }
 
-        print(">>> Building library of allowed building blocks ...")
-        self._build_block_library()
+        if self._load_block_library_cache():
+            print(f">>> Loaded building block library from {self.cache_path}")
+        else:
+            print(">>> Building library of allowed building blocks ...")
+            self._build_block_library()
+            self._save_block_library_cache()
         self._summary()
 
     # -----------------------------
@@ -212,12 +371,79 @@ class COFGenerator:
                     if conn is None:
                         continue
 
-                    self.blocks[name] = bb
+                    self.blocks[name] = {
+                        "symmetry": symm,
+                        "core": core,
+                        "connector": connector,
+                        "r_groups": r_parts,
+                        "connectivity": conn,
+                    }
                     self.blocks_by_connectivity.setdefault(conn, []).append(name)
 
         if not self.blocks:
             raise RuntimeError("No building blocks passed the filters – nothing to generate with.")
 
+    def _library_cache_key(self) -> str:
+        """
+        Hash of everything the filtered library depends on: the pyCOFBuilder
+        version, the core/Q/R whitelists, and the building-block files that
+        get_buildingblock_list() scans.
+        """
+        bb_dir = self.bb_helper.bb_out_path
+        payload = {
+            "pycofbuilder": PCB_VERSION,
+            "cores": {sym: sorted(cores) for sym, cores in self.core_whitelist.items()},
+            "q": sorted(self.q_whitelist),
+            "r": sorted(self.r_whitelist),
+            "bb_files": sorted(os.listdir(bb_dir)) if os.path.isdir(bb_dir) else [],
+        }
+        blob = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _load_block_library_cache(self) -> bool:
+        """Fill blocks / blocks_by_connectivity from cache_path if it is still valid."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  Ignoring unreadable library cache {self.cache_path} ({e})")
+            return False
+
+        if cached.get("key") != self._library_cache_key() or not cached.get("blocks"):
+            return False
+
+        self.blocks = cached["blocks"]
+        # JSON object keys are strings; connectivity is an int everywhere else
+        self.blocks_by_connectivity = {
+            int(conn): names for conn, names in cached["blocks_by_connectivity"].items()
+        }
+        return True
+
+    def _save_block_library_cache(self):
+        if not self.cache_path:
+            return
+
+        payload = {
+            "key": self._library_cache_key(),
+            "pycofbuilder": PCB_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "blocks": self.blocks,
+            "blocks_by_connectivity": self.blocks_by_connectivity,
+        }
+
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # Write to a temp file first so an interrupted run never leaves half a cache
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.cache_path)
+
     def _summary(self):
         print(">>> Building block summary")
         total = len(self.blocks)
@@ -239,14 +465,16 @@ class COFGenerator:
     # Random generation
     # -----------------------------
 
-    def random_cof_name(self, topology: Optional[str] = None) -> str:
+    def random_cof_name(self, topology: Optional[str] = None, rng=None) -> str:
         """
         Create a random COF name string that pyCOFBuilder understands:
             BB1-BB2-TOPOLOGY-STACKING
         where BB1 and BB2 already exist and match the connectivity required.
+        rng: random.Random to draw from (default: the global random module).
         """
+        rng = rng or random
         if topology is None:
-            topology = random.choice(list(self.topology_rules.keys()))
+            topology = rng.choice(list(self.topology_rules.keys()))
         if topology not in self.topology_rules:
             raise ValueError(f"Unknown topology {topology}")
 
@@ -261,36 +489,57 @@ class COFGenerator:
                 f"for topology {topology}."
             )
 
-        bb1_name = random.choice(bb1_list)
-        bb2_name = random.choice(bb2_list)
+        bb1_name = rng.choice(bb1_list)
+        bb2_name = rng.choice(bb2_list)
 
         # Avoid trivial duplicates BB1 == BB2 when c1 == c2
         if c1 == c2 and len(bb1_list) > 1:
             while bb2_name == bb1_name:
-                bb2_name = random.choice(bb2_list)
+                bb2_name = rng.choice(bb2_list)
 
         stacking_options = self.stacking_by_topology[topology]
-        stacking = random.choice(stacking_options)
+        stacking = rng.choice(stacking_options)
 
         cof_name = f"{bb1_name}-{bb2_name}-{topology}-{stacking}"
         return cof_name
 
+    def design_space(self, topologies: Optional[List[str]] = None) -> DesignSpace:
+        """
+        Exact, lazily decoded space of every name this generator can produce
+        (optionally restricted to some topologies). Use it to enumerate, shard
+        across machines, or sample without replacement, e.g.
+            gen.batch_generate(100, names=gen.design_space(["SQL"]).shard(3, 32, seed=1))
+        """
+        return DesignSpace(
+            self.blocks_by_connectivity,
+            self.topology_rules,
+            self.stacking_by_topology,
+            topologies=topologies,
+        )
+
     def try_build_and_save(
         self,
         cof_name: str,
         fmt: str = "cif",
         supercell: Tuple[int, int, int] = (1, 1, 1),
+        timer: Optional[StageTimer] = None,
+        targets: Optional[List] = None,
+        compress: bool = False,
+        structure_out: Optional[dict] = None,
+        screen: bool = True,
     ) -> Tuple[bool, Optional[str]]:
         """
         Try to build and save a COF from its name string.
         Returns (success, error_message_or_None).
+        targets: several (fmt, supercell) outputs from one build (overrides fmt/supercell).
+        compress: gzip the written files.
+        structure_out: dict that receives the built unit cell.
+        screen: reject builds with clashing atoms before writing them.
         """
-        try:
-            cof = pcb.Framework(cof_name, out_dir=self.out_dir, save_bb=False, log_level="warning")
-            cof.save(fmt=fmt, supercell=list(supercell), save_dir=self.out_dir)
-            return True, None
-        except Exception as e:
-            return False, str(e)
+        return build_and_save(
+            cof_name, self.out_dir, fmt=fmt, supercell=supercell, timer=timer, targets=targets,
+            compress=compress, structure_out=structure_out, screen=screen,
+        )
 
     def batch_generate(
         self,
@@ -299,75 +548,269 @@ class COFGenerator:
         fmt: str = "cif",
         supercell: Tuple[int, int, int] = (1, 1, 1),
         topology: Optional[str] = None,
+        workers: int = 1,
+        names: Optional[Iterable[str]] = None,
+        start_index: int = 0,
+        targets: Optional[List] = None,
+        compress: bool = False,
+        store: Optional[Union[str, StructureStore]] = None,
+        fingerprints: Optional[Union[str, FingerprintIndex]] = None,
     ) -> pd.DataFrame:
         """
         Generate many random COFs, robustly:
         - Keep sampling until we get n_structures successes or hit max_attempts.
         - Log name, success/failure, error message.
 
+        With workers > 1 the pyCOFBuilder builds run in a process pool.
+        Names are still sampled here in the parent process, and at most
+        (n_structures - successes) builds are in flight at any time, so we
+        never build more than n_structures good COFs or more than
+        max_attempts candidates. If a worker dies (e.g. OOM-killed), the
+        builds in flight are logged as errors but not added to the failure
+        cache, and the batch continues in a fresh pool.
+
+        names: take candidates from this iterable (e.g. a DesignSpace shard or
+        permutation) instead of sampling with random.choice; generation also
+        stops when it runs out.
+
+        targets: write every structure to several (fmt, supercell) outputs
+        from a single build, e.g. [("cif", (1, 1, 1)), ("cif", (2, 2, 1))];
+        overrides fmt/supercell. compress=True gzips the written files.
+
+        store: also append every built structure (unit cell, with its
+        topology and candidate index as metadata) to this StructureStore,
+        given as an open store or a path. Appends happen in this process,
+        so the store has a single writer even with workers > 1.
+
+        fingerprints: check every built structure against this
+        FingerprintIndex (or the index cached at this path) and log the
+        closest near-duplicate in a 'duplicate_of' column; new structures
+        are indexed as they are built, so repeats within the run are caught too.
+
+        Candidate k draws from its own random stream, derived from the
+        generator's seed and k (see rng_streams.candidate_rng), so a seeded
+        run yields the same candidates in serial and parallel mode. To resume
+        an interrupted run, pass start_index = number of attempts it logged.
+        (Known-bad redraws depend on the failure cache contents; use
+        failure_cache_path=None for bit-for-bit repeats.)
+
         Returns:
-            pandas.DataFrame with columns:
-                ['cof_name', 'topology', 'status', 'error']
+            pandas.DataFrame sorted by candidate index, with columns:
+                ['index', 'cof_name', 'topology', 'status', 'error']
+            plus per-stage timings in seconds ('t_sample', 't_framework',
+            't_serialize', 't_write', 't_total'); p50/p95/p99 per stage are
+            printed at the end.
         """
         if max_attempts is None:
             max_attempts = n_structures * 10
-
-        records = []
-        n_success = 0
-        attempts = 0
+        targets = targets or [(fmt, supercell)]
+        owns_store = isinstance(store, str)
+        if owns_store:
+            store = StructureStore(store, mode="a")
+        if isinstance(fingerprints, str):
+            fingerprints = FingerprintIndex(fingerprints)
 
         print(
             f">>> Starting batch generation: target={n_structures}, "
-            f"max_attempts={max_attempts}"
+            f"max_attempts={max_attempts}, workers={workers}"
         )
 
         start_time = time.time()
+        skipped_before = self.n_skipped_known_bad
+
+        if names is not None:
+            names_iter = iter(names)
+
+            def draw(rng):
+                return next(names_iter)
+        else:
+            def draw(rng):
+                return self.random_cof_name(topology=topology, rng=rng)
+
+        try:
+            if workers > 1:
+                records, n_success, attempts = self._batch_generate_parallel(
+                    n_structures, max_attempts, targets, compress, store, fingerprints, topology, workers, draw,
+                    start_index,
+                )
+            else:
+                records, n_success, attempts = self._batch_generate_serial(
+                    n_structures, max_attempts, targets, compress, store, fingerprints, topology, draw, start_index
+                )
+        finally:
+            if owns_store:
+                store.close()
+        records.sort(key=lambda record: record["index"])
+
+        elapsed = time.time() - start_time
+        print(
+            f">>> Done. Successes: {n_success}/{n_structures} "
+            f"in {attempts} attempts (elapsed {elapsed:.1f} s)"
+        )
+        print(
+            f"    Skipped {self.n_skipped_known_bad - skipped_before} known-bad draws "
+            f"({len(self.failure_cache)} combinations in the failure cache)"
+        )
+        print(format_summary(summarize(records), title=">>> Stage timings"))
+
+        df = pd.DataFrame(records)
+        base_cols = ["index", "cof_name", "topology", "status", "error"]
+        if fingerprints is not None:
+            base_cols.append("duplicate_of")
+        time_cols = [f"t_{stage}" for stage in STAGES + ["total"] if f"t_{stage}" in df.columns]
+        df = df.reindex(columns=base_cols + time_cols)
+        return df
+
+    def _sample_candidate(
+        self, topology: Optional[str], draw, index: int
+    ) -> Tuple[Optional[str], Optional[str], dict]:
+        """
+        Draw candidate number `index` for batch generation from its own
+        random stream. Returns (cof_name, topology, record); cof_name is None
+        on a name error and the record is then already complete.
+        StopIteration from draw() (an exhausted names iterable) is passed through.
+        """
+        timer = StageTimer()
+        rng = candidate_rng(self.seed, index)
+        try:
+            with timer.stage("sample"):
+                for _ in range(MAX_RESAMPLES):
+                    cof_name = draw(rng)
+                    if not self.failure_cache.is_known_bad(cof_name):
+                        break
+                    self.n_skipped_known_bad += 1
+                else:
+                    raise RuntimeError(
+                        f"{MAX_RESAMPLES} draws in a row were known failures; "
+                        "the design space looks exhausted."
+                    )
+            topo = cof_name.split("-")[2]
+        except StopIteration:
+            raise
+        except Exception as e:
+            return None, topology, {
+                "index": index,
+                "cof_name": None,
+                "topology": topology,
+                "status": "name_error",
+                "error": str(e),
+                **timer.as_record(),
+            }
+        return cof_name, topo, {"index": index, "cof_name": cof_name, "topology": topo, **timer.as_record()}
+
+    def _batch_generate_serial(
+        self, n_structures, max_attempts, targets, compress, store, fingerprints, topology, draw, start_index
+    ):
+        records = []
+        n_success = 0
+        attempts = 0
 
         while n_success < n_structures and attempts < max_attempts:
+            try:
+                cof_name, topo, record = self._sample_candidate(topology, draw, start_index + attempts)
+            except StopIteration:
+                break
             attempts += 1
 
-            try:
-                cof_name = self.random_cof_name(topology=topology)
-                topo = cof_name.split("-")[2]
-            except Exception as e:
-                records.append(
-                    {
-                        "cof_name": None,
-                        "topology": topology,
-                        "status": "name_error",
-                        "error": str(e),
-                    }
-                )
+            if cof_name is None:
+                records.append(record)
                 continue
 
-            ok, err = self.try_build_and_save(cof_name, fmt=fmt, supercell=supercell)
+            timer = StageTimer()
+            structure = {} if store is not None or fingerprints is not None else None
+            ok, err = self.try_build_and_save(
+                cof_name, timer=timer, targets=targets, compress=compress, structure_out=structure
+            )
+            _merge_timings(record, timer.as_record())
             if ok:
                 print(f"Structure num: {n_success}")
                 n_success += 1
-                status = "ok"
+                _check_duplicate(fingerprints, record, structure)
+                _store_structure(store, record, structure)
             else:
-                status = "error"
-
-            records.append(
-                {
-                    "cof_name": cof_name,
-                    "topology": topo,
-                    "status": status,
-                    "error": err,
-                }
-            )
+                self.failure_cache.record(cof_name, err)
+
+            record.update({"status": "ok" if ok else "error", "error": err})
+            records.append(record)
 
             if attempts % 10 == 0:
                 print(f"  Attempts: {attempts} | Successes: {n_success}")
 
-        elapsed = time.time() - start_time
-        print(
-            f">>> Done. Successes: {n_success}/{n_structures} "
-            f"in {attempts} attempts (elapsed {elapsed:.1f} s)"
-        )
+        return records, n_success, attempts
 
-        df = pd.DataFrame(records)
-        return df
+    def _batch_generate_parallel(
+        self, n_structures, max_attempts, targets, compress, store, fingerprints, topology, workers, draw,
+        start_index,
+    ):
+        records = []
+        n_success = 0
+        attempts = 0
+        exhausted = False
+        in_flight = {}  # future -> partially filled record
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                # Top up the pool without over-committing successes or attempts
+                while (
+                    not exhausted
+                    and len(in_flight) < workers
+                    and n_success + len(in_flight) < n_structures
+                    and attempts < max_attempts
+                ):
+                    try:
+                        cof_name, topo, record = self._sample_candidate(topology, draw, start_index + attempts)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    attempts += 1
+                    if cof_name is None:
+                        records.append(record)
+                        continue
+                    job = (cof_name, self.out_dir, targets, compress, store is not None or fingerprints is not None)
+                    try:
+                        future = pool.submit(_timed_build_and_save, *job)
+                    except BrokenProcessPool:
+                        # A worker died (e.g. OOM-killed): the pool refuses new work, carry on in a fresh one
+                        pool.shutdown(wait=False)
+                        pool = ProcessPoolExecutor(max_workers=workers)
+                        future = pool.submit(_timed_build_and_save, *job)
+                    in_flight[future] = record
+
+                    if attempts % 10 == 0:
+                        print(f"  Attempts: {attempts} | Successes: {n_success}")
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = in_flight.pop(future)
+                    structure = None
+                    crashed = False
+                    try:
+                        ok, err, timings, structure = future.result()
+                        _merge_timings(record, timings)
+                    except BrokenProcessPool as e:
+                        # The worker died (e.g. OOM-killed), taking every build in flight with it.
+                        # Those candidates are skipped, not blamed: no failure-cache entry.
+                        ok, err, crashed = False, f"Worker crashed: {e}", True
+                    except Exception as e:  # failed outside build_and_save (e.g. pickling): not the candidate either
+                        ok, err, crashed = False, str(e), True
+                    if ok:
+                        print(f"Structure num: {n_success}")
+                        n_success += 1
+                        _check_duplicate(fingerprints, record, structure)
+                        _store_structure(store, record, structure)
+                    elif not crashed:
+                        self.failure_cache.record(record["cof_name"], err)
+
+                    record.update({"status": "ok" if ok else "error", "error": err})
+                    records.append(record)
+        finally:
+            pool.shutdown()
+
+        return records, n_success, attempts
 
 
 # ============================
@@ -379,6 +822,7 @@ if __name__ == "__main__":
     N_STRUCTURES = 30
     OUTPUT_DIR = "generated_cofs"
     RANDOM_SEED = 42
+    N_WORKERS = 1  # >1 builds candidates in parallel worker processes
 
     generator = COFGenerator(
         L2_cores=L2_CORES,
@@ -398,6 +842,7 @@ if __name__ == "__main__":
         fmt="cif",
         supercell=(1, 1, 1),
         topology=None,  # or "HCB" or "SQL" if you want to force one
+        workers=N_WORKERS,
     )
 
     # Save a CSV report of what happened